@@ -0,0 +1,5 @@
+import os
+
+# Benchmarks write throwaway file databases, which refuse to store keys
+# without a fingerprint secret. Set before src.config reads the environment.
+os.environ.setdefault("DB_KEY_FINGERPRINT_SECRET", "benchmark")
@@ -0,0 +1,62 @@
+"""Deterministic synthetic members, guilds, titles and keys for benchmarks.
+
+Everything is derived from the row count, the number of keys, so datasets from
+1k to 1M rows keep the same shape. Rows are generated lazily and never held in
+memory all at once.
+"""
+import random
+from collections.abc import Iterator
+
+from src.apps.games.domain.models import Platform
+
+# One key in ten per member, a title per five keys and a guild per thousand
+KEYS_PER_MEMBER = 10
+KEYS_PER_TITLE = 5
+KEYS_PER_GUILD = 1000
+
+
+class Dataset:
+    def __init__(self, rows: int, seed: int = 0) -> None:
+        self.rows = rows
+        self.seed = seed
+        self.members = max(10, rows // KEYS_PER_MEMBER)
+        self.titles = max(10, rows // KEYS_PER_TITLE)
+        self.guilds = max(1, rows // KEYS_PER_GUILD)
+
+    def __repr__(self) -> str:
+        return (
+            f"Dataset(rows={self.rows}, members={self.members}, "
+            f"titles={self.titles}, guilds={self.guilds})"
+        )
+
+    @staticmethod
+    def member_id(i: int) -> str:
+        return f"member-{i}"
+
+    @staticmethod
+    def guild_id(i: int) -> str:
+        return f"guild-{i}"
+
+    @staticmethod
+    def title_name(i: int) -> str:
+        return f"Title {i}"
+
+    @staticmethod
+    def key(i: int) -> str:
+        """A steam-shaped key that is unique for every ``i``."""
+        digits = f"{i:015X}"
+        return "-".join(digits[j : j + 5] for j in range(0, 15, 5))
+
+    def memberships(self) -> Iterator[tuple[int, int]]:
+        """``(member, guild)`` pairs; every member is in one or two guilds."""
+        for member in range(self.members):
+            home = member % self.guilds
+            yield member, home
+            if member % 3 == 0 and (away := (member * 7 + 1) % self.guilds) != home:
+                yield member, away
+
+    def keys(self) -> Iterator[tuple[int, int, Platform, str]]:
+        """``(owner, title, platform, key)`` for every row."""
+        rng = random.Random(self.seed)
+        for i in range(self.rows):
+            yield i % self.members, rng.randrange(self.titles), "steam", self.key(i)
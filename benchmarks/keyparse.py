@@ -0,0 +1,76 @@
+"""Compare the single-pass key classifier with the old per-pattern loop.
+
+Run with ``python -m benchmarks.keyparse``.
+"""
+import random
+import re
+import string
+import timeit
+
+from src.apps.games.domain.models import Platform
+from src.apps.games.utils.keyparse import BadKeyFormatError, keyspace, parse_keys
+
+N_KEYS = 100_000
+SHAPES = [[5] * 4, [5] * 3, [5] * 5, [4] * 3, [4] * 5, [4] * 4, [3, 4, 4, 4, 4]]
+
+_compiled: dict[Platform, list[re.Pattern[str]]] = {
+    k: [re.compile(r) for r in v] for k, v in keyspace.items()
+}
+
+
+def loop_parse_key(key: str) -> Platform:
+    for k, v in _compiled.items():
+        for r in v:
+            if r.match(key):
+                return k
+
+    raise BadKeyFormatError
+
+
+def loop_parse_keys(keys: list[str]) -> list[Platform | BadKeyFormatError]:
+    results: list[Platform | BadKeyFormatError] = []
+    for key in keys:
+        try:
+            results.append(loop_parse_key(key))
+        except BadKeyFormatError as e:
+            results.append(e)
+    return results
+
+
+def make_keys(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    alphabet = string.ascii_uppercase + string.digits
+
+    def segment(length: int) -> str:
+        return "".join(rng.choices(alphabet, k=length))
+
+    keys: list[str] = []
+    for _ in range(n):
+        kind = rng.randrange(len(SHAPES) + 2)
+        if kind < len(SHAPES):
+            keys.append("-".join(segment(length) for length in SHAPES[kind]))
+        elif kind == len(SHAPES):
+            keys.append(f"https://store.example.com/redeem/{segment(12)}")
+        else:
+            keys.append(segment(16))
+    return keys
+
+
+def main() -> None:
+    keys = make_keys(N_KEYS)
+
+    def summary(results: list[Platform | BadKeyFormatError]) -> list[str]:
+        return [r if isinstance(r, str) else "bad" for r in results]
+
+    assert summary(parse_keys(keys)) == summary(loop_parse_keys(keys))
+
+    loop = min(timeit.repeat(lambda: loop_parse_keys(keys), number=1, repeat=5))
+    single = min(timeit.repeat(lambda: parse_keys(keys), number=1, repeat=5))
+    print(f"{N_KEYS} mixed keys")
+    print(f"  per-pattern loop: {loop * 1000:8.1f} ms")
+    print(f"  single pass:      {single * 1000:8.1f} ms")
+    print(f"  speedup:          {loop / single:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
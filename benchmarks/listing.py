@@ -0,0 +1,76 @@
+"""Compare listing games through full models against projected read rows.
+
+``models`` loads ``GameInDB`` entities with their titles and builds validated
+``Game`` models from them, which is what listing cost before read models.
+``rows`` selects the three columns a listing shows into ``GameRow`` tuples.
+Run with ``python -m benchmarks.listing --rows 100000``.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from sqlalchemy.orm import joinedload
+from sqlmodel import Session, select
+
+from src.apps.games.domain.models import Game, GameRow, Title
+from src.apps.games.repositories.db.models import GameInDB, TitleInDB
+
+from .data import Dataset
+from .repositories import sqlmodel_backend
+
+
+def list_models(session: Session) -> list[Game]:
+    statement = select(GameInDB).options(joinedload(GameInDB.title))
+    return [
+        Game(
+            platform=game.platform,
+            title=Title(name=game.title.name),
+            key=game.key,
+            owner_id=game.owner_id,
+        )
+        for game in session.exec(statement)
+    ]
+
+
+def list_rows(session: Session) -> list[GameRow]:
+    statement = select(TitleInDB.name, GameInDB.platform, GameInDB.owner_id).join(
+        TitleInDB
+    )
+    return list(map(GameRow._make, session.execute(statement)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    listings: dict[str, Callable[[Session], list[object]]] = {
+        "models": list_models,  # type: ignore[dict-item]
+        "rows": list_rows,  # type: ignore[dict-item]
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = Dataset(args.rows)
+        backend = sqlmodel_backend(dataset, Path(tmp) / "listing.db")
+
+        medians: dict[str, float] = {}
+        for name, listing in listings.items():
+            timings: list[float] = []
+            for _ in range(args.repeat):
+                # A fresh session each time, so nothing is served from the
+                # identity map of an earlier run
+                with backend.games() as uow:
+                    started = time.perf_counter()
+                    listed = listing(uow.session)
+                    timings.append(time.perf_counter() - started)
+            medians[name] = statistics.median(timings)
+            print(f"{name:7} {len(listed):>8} games  {medians[name] * 1000:8.1f} ms")
+
+    print(f"rows are {medians['models'] / medians['rows']:.1f}x faster than models")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""Time the hot repository operations on the fake and SQLModel backends.
+
+Each backend is seeded with a synthetic dataset, then every operation runs
+``--ops`` times, each in its own unit of work. SQLModel runs against a
+file-backed SQLite database. Results go to JSON, and ``--baseline`` prints the
+change against an earlier run:
+
+    python -m benchmarks.repositories --rows 1000 100000 --output new.json
+    python -m benchmarks.repositories --baseline old.json --output new.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session, SQLModel
+
+from src.apps.core.db import create_engine_from_settings
+from src.apps.core.iterables import chunked
+from src.apps.discord.domain.models import Member
+from src.apps.discord.domain.services import join_guild, leave_guild
+from src.apps.discord.repositories.db.models import (
+    GuildInDB,
+    MemberInDB,
+    MemberToGuildLink,
+)
+from src.apps.discord.repositories.fake.repo import FakeSession as DiscordFakeSession
+from src.apps.discord.unit_of_work.db import DBUnitOfWork as DiscordDBUnitOfWork
+from src.apps.discord.unit_of_work.fake import FakeUnitOfWork as DiscordFakeUnitOfWork
+from src.apps.games.domain.models import Game, Title
+from src.apps.games.domain.services import add_key, remove_key
+from src.apps.games.repositories.db.cache import TITLE_CACHE
+from src.apps.games.repositories.db.counters import rebuild_counters
+from src.apps.games.repositories.db.models import GameInDB, TitleInDB
+from src.apps.games.repositories.db.search import TITLE_INDEX
+from src.apps.games.repositories.fake.repo import FakeSession
+from src.apps.games.unit_of_work.db import DBUnitOfWork
+from src.apps.games.unit_of_work.fake import FakeUnitOfWork
+from src.apps.games.utils.fingerprint import fingerprint_key, fingerprint_secret
+from src.apps.games.utils.titlesearch import title_key
+from src.config import DatabaseSettings
+
+from .data import Dataset
+
+SEED_CHUNK = 10_000
+
+UnitOfWorkFactory = Callable[[], AbstractContextManager[Any]]
+
+
+class Backend:
+    def __init__(self, name: str, games: UnitOfWorkFactory, discord: UnitOfWorkFactory):
+        self.name = name
+        self.games = games
+        self.discord = discord
+
+
+def fake_backend(dataset: Dataset) -> Backend:
+    games = FakeUnitOfWork(session_factory=FakeSession).__enter__()
+    titles = [Title(name=dataset.title_name(i)) for i in range(dataset.titles)]
+    games.repo.titles.update((title_key(title.name), title) for title in titles)
+    games.repo.games.update(
+        Game(
+            platform=game_platform,
+            title=titles[title],
+            key=key,
+            owner_id=dataset.member_id(owner),
+        )
+        for owner, title, game_platform, key in dataset.keys()
+    )
+
+    discord = DiscordFakeUnitOfWork(session_factory=DiscordFakeSession).__enter__()
+    for member, guild in dataset.memberships():
+        discord.repo.guilds.setdefault(dataset.guild_id(guild), set()).add(
+            Member(id=dataset.member_id(member))
+        )
+
+    # Every unit of work shares the seeded repositories
+    return Backend("fake", lambda: nullcontext(games), lambda: nullcontext(discord))
+
+
+def _insert(session: Session, model: Any, rows: Iterator[dict[str, Any]]) -> None:
+    for chunk in chunked(rows, SEED_CHUNK):
+        session.execute(insert(model.__table__), chunk)
+
+
+def sqlmodel_backend(dataset: Dataset, path: Path) -> Backend:
+    engine = create_engine_from_settings(DatabaseSettings(url=f"sqlite:///{path}"))
+    SQLModel.metadata.create_all(engine)
+    TITLE_CACHE.clear()
+    TITLE_INDEX.clear()
+    session_factory = sessionmaker(bind=engine, class_=Session)
+    secret = fingerprint_secret(engine)
+
+    # Seeded with plain bulk inserts and explicit pks, which is much faster
+    # than going through the repositories at a million rows
+    with session_factory() as session:
+        _insert(
+            session,
+            MemberInDB,
+            ({"pk": i + 1, "id": dataset.member_id(i)} for i in range(dataset.members)),
+        )
+        _insert(
+            session,
+            GuildInDB,
+            ({"pk": i + 1, "id": dataset.guild_id(i)} for i in range(dataset.guilds)),
+        )
+        _insert(
+            session,
+            MemberToGuildLink,
+            (
+                {"member_pk": member + 1, "guild_pk": guild + 1}
+                for member, guild in dataset.memberships()
+            ),
+        )
+        _insert(
+            session,
+            TitleInDB,
+            (
+                {
+                    "pk": i + 1,
+                    "name": (name := dataset.title_name(i)),
+                    "normalized_name": title_key(name),
+                }
+                for i in range(dataset.titles)
+            ),
+        )
+        _insert(
+            session,
+            GameInDB,
+            (
+                {
+                    "owner_id": dataset.member_id(owner),
+                    "title_pk": title + 1,
+                    "platform": game_platform,
+                    "key": key,
+                    "fingerprint": fingerprint_key(key, secret),
+                }
+                for owner, title, game_platform, key in dataset.keys()
+            ),
+        )
+        rebuild_counters(session)
+        session.commit()
+
+    return Backend(
+        "sqlmodel",
+        lambda: DBUnitOfWork(session_factory=session_factory),
+        lambda: DiscordDBUnitOfWork(session_factory=session_factory),
+    )
+
+
+def _time(calls: Iterator[Callable[[], object]]) -> list[float]:
+    timings: list[float] = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _summary(timings: list[float]) -> dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "ops": len(ordered),
+        "total_s": sum(ordered),
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "p50_us": statistics.median(ordered) * 1e6,
+        "p99_us": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e6,
+    }
+
+
+def run_operations(
+    backend: Backend, dataset: Dataset, ops: int
+) -> dict[str, dict[str, float]]:
+    new_keys = [
+        (dataset.member_id(i % dataset.members), dataset.key(dataset.rows + i))
+        for i in range(ops)
+    ]
+    # Half of the lookups hit a seeded key, half miss
+    lookups = [
+        (dataset.member_id(i % dataset.members), dataset.key(i))
+        if i % 2
+        else (dataset.member_id(i % dataset.members), dataset.key(dataset.rows * 2 + i))
+        for i in range(ops)
+    ]
+    joiners = [
+        (f"bench-member-{i}", dataset.guild_id(i % dataset.guilds)) for i in range(ops)
+    ]
+
+    def in_games_uow(fn: Callable[[Any], object]) -> Callable[[], object]:
+        def call() -> object:
+            with backend.games() as uow:
+                return fn(uow)
+
+        return call
+
+    def in_discord_uow(fn: Callable[[Any], object]) -> Callable[[], object]:
+        def call() -> object:
+            with backend.discord() as uow:
+                return fn(uow)
+
+        return call
+
+    title = dataset.title_name(0)
+    operations: dict[str, Iterator[Callable[[], object]]] = {
+        "add_key": (
+            in_games_uow(
+                lambda uow, owner_id=owner_id, key=key: add_key(
+                    owner_id=owner_id,
+                    title_name=title,
+                    platform="steam",
+                    key=key,
+                    uow=uow,
+                )
+            )
+            for owner_id, key in new_keys
+        ),
+        "check_key_exists": (
+            in_games_uow(
+                lambda uow, owner_id=owner_id, key=key: uow.repo.check_key_exists(
+                    key=key, owner_id=owner_id
+                )
+            )
+            for owner_id, key in lookups
+        ),
+        "remove_key": (
+            in_games_uow(
+                lambda uow, owner_id=owner_id, key=key: remove_key(
+                    owner_id=owner_id, key=key, uow=uow
+                )
+            )
+            for owner_id, key in new_keys
+        ),
+        "join_guild": (
+            in_discord_uow(
+                lambda uow, member_id=member_id, guild_id=guild_id: join_guild(
+                    member_id=member_id, guild_id=guild_id, uow=uow
+                )
+            )
+            for member_id, guild_id in joiners
+        ),
+        "list_games": (
+            in_games_uow(
+                lambda uow, member_id=member_id: len(
+                    uow.repo.list_games(member_id=member_id)
+                )
+            )
+            for member_id, _ in lookups
+        ),
+        "get_guild_members": (
+            in_discord_uow(
+                lambda uow, guild_id=guild_id: len(uow.repo.get_guild_members(guild_id))
+            )
+            for _, guild_id in joiners
+        ),
+        "leave_guild": (
+            in_discord_uow(
+                lambda uow, member_id=member_id, guild_id=guild_id: leave_guild(
+                    member_id=member_id, guild_id=guild_id, uow=uow
+                )
+            )
+            for member_id, guild_id in joiners
+        ),
+    }
+    return {name: _summary(_time(calls)) for name, calls in operations.items()}
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(rows: list[int], backends: list[str], ops: int) -> dict[str, Any]:
+    results: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for row_count in rows:
+            dataset = Dataset(row_count)
+            for name in backends:
+                started = time.perf_counter()
+                if name == "fake":
+                    backend = fake_backend(dataset)
+                else:
+                    backend = sqlmodel_backend(dataset, Path(tmp) / f"{row_count}.db")
+                seed_s = time.perf_counter() - started
+                print(f"{name} {dataset} seeded in {seed_s:.1f} s")
+
+                for operation, summary in run_operations(backend, dataset, ops).items():
+                    results.append(
+                        {
+                            "backend": name,
+                            "rows": row_count,
+                            "operation": operation,
+                            **summary,
+                        }
+                    )
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+
+
+def _key(result: dict[str, Any]) -> tuple[str, int, str]:
+    return result["backend"], result["rows"], result["operation"]
+
+
+def report(run: dict[str, Any], baseline: dict[str, Any] | None = None) -> None:
+    before = {_key(result): result for result in (baseline or {}).get("results", [])}
+    print(f"{'backend':9} {'rows':>8} {'operation':18} {'p50 us':>10} {'p99 us':>10}")
+    for result in run["results"]:
+        line = (
+            f"{result['backend']:9} {result['rows']:>8} {result['operation']:18} "
+            f"{result['p50_us']:>10.1f} {result['p99_us']:>10.1f}"
+        )
+        if old := before.get(_key(result)):
+            line += f"  {result['p50_us'] / old['p50_us']:6.2f}x p50 vs baseline"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=["fake", "sqlmodel"],
+        default=["fake", "sqlmodel"],
+    )
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    parser.add_argument("--baseline", type=Path)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.backends, args.ops)
+    args.output.write_text(json.dumps(results, indent=2))
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    report(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Measure event throughput of the guild-sharded workers by worker count.
+
+A synthetic stream of joins and leaves is replayed against a fresh
+file-backed SQLite database per run. A third of the events come from one huge
+guild, the rest are spread over the others. Throughput only counts the time
+from the first event submitted until every worker has drained its queue:
+
+    python -m benchmarks.sharding --workers 1 2 4 --events 5000
+"""
+import argparse
+import random
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from sqlmodel import SQLModel
+
+from src.apps.core.db import create_engine_from_settings
+from src.apps.core.sharding import GuildEvent
+from src.config import DatabaseSettings
+from src.workers import start_workers
+
+from .data import Dataset
+
+GUILDS = 50
+HOT_GUILD_SHARE = 1 / 3
+
+
+def events(count: int, seed: int = 0) -> Iterator[GuildEvent]:
+    rng = random.Random(seed)
+    for _ in range(count):
+        guild = 0 if rng.random() < HOT_GUILD_SHARE else rng.randrange(1, GUILDS)
+        guild_id = Dataset.guild_id(guild)
+        member_id = Dataset.member_id(rng.randrange(count // 10 + 1))
+        service = "discord.join_guild" if rng.random() < 0.7 else "discord.leave_guild"
+        yield GuildEvent(
+            guild_id, service, {"member_id": member_id, "guild_id": guild_id}
+        )
+
+
+def run(workers: int, count: int, path: Path) -> float:
+    db = DatabaseSettings(url=f"sqlite:///{path}")
+    engine = create_engine_from_settings(db)
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    with start_workers(workers, db) as router:
+        started = time.perf_counter()
+        for event in events(count):
+            router.submit(event)
+        stats = router.close()
+        seconds = time.perf_counter() - started
+
+    if errors := [worker.errors for worker in stats if worker.errors]:
+        print(f"  errors: {errors}")
+    return count / seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--events", type=int, default=5000)
+    args = parser.parse_args()
+
+    baseline: float | None = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            throughput = run(workers, args.events, Path(tmp) / f"{workers}.db")
+            baseline = baseline or throughput
+            print(
+                f"{workers:>3} workers  {throughput:8.0f} events/s  "
+                f"{throughput / baseline:5.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure autocomplete latency of the in-memory title index.
+
+Every keystroke of a title typed out, with the odd typo, becomes one search.
+Run with ``python -m benchmarks.titlesearch``.
+"""
+import random
+import statistics
+import time
+
+from src.apps.games.utils.titlesearch import TitleIndex
+
+N_TITLES = 100_000
+N_TYPED = 300
+
+WORDS = (
+    "the of and dark legend souls star wars space age empire city night "
+    "knight dragon quest final fantasy tales hollow super mario kart racing "
+    "world war craft call duty battle field front line dead red redemption "
+    "grand theft auto witcher wild hunt half life portal counter strike "
+    "sims farming simulator crusader kings total frontier islands lost"
+).split()
+
+
+def make_titles(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    titles: set[str] = set()
+    while len(titles) < n:
+        words = rng.choices(WORDS, k=rng.randint(2, 5))
+        title = " ".join(word.capitalize() for word in words)
+        if rng.random() < 0.3:
+            title += f" {rng.randint(2, 9)}"
+        titles.add(title)
+    return sorted(titles)
+
+
+def typos(title: str, rng: random.Random) -> str:
+    if len(title) < 4 or rng.random() < 0.5:
+        return title
+    i = rng.randrange(1, len(title) - 2)
+    return title[:i] + title[i + 1] + title[i] + title[i + 2 :]
+
+
+def main() -> None:
+    titles = make_titles(N_TITLES)
+
+    started = time.perf_counter()
+    index = TitleIndex(titles)
+    built = time.perf_counter() - started
+
+    rng = random.Random(1)
+    timings: list[float] = []
+    for title in rng.sample(titles, N_TYPED):
+        typed = typos(title, rng)
+        for end in range(1, len(typed) + 1):
+            started = time.perf_counter()
+            index.search(typed[:end])
+            timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"{N_TITLES} titles indexed in {built:.2f} s")
+    print(f"{len(timings)} keystroke searches")
+    print(f"  p50: {statistics.median(timings) * 1000:6.2f} ms")
+    print(f"  p99: {p99 * 1000:6.2f} ms")
+    print(f"  max: {timings[-1] * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+
+class CooldownTracker:
+    """Tracks when each key may act again, without touching the database.
+
+    Expiry times live in a dict for O(1) lookups and in a min-heap so expired
+    entries can be evicted in order; memory is bounded by the keys currently
+    cooling down rather than by every key ever seen.
+    """
+
+    def __init__(
+        self,
+        period: timedelta,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.period = period
+        self.clock = clock
+        self._expiries: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._expiries)
+
+    def start(self, key: str, at: datetime | None = None) -> None:
+        """Start the cooldown for ``key`` at ``at`` (naive UTC), or now."""
+        started = (
+            self.clock() if at is None else at.replace(tzinfo=timezone.utc).timestamp()
+        )
+        expiry = started + self.period.total_seconds()
+        self.evict_expired()
+        if expiry <= self.clock():
+            return
+        self._expiries[key] = expiry
+        heapq.heappush(self._heap, (expiry, key))
+
+    def remaining(self, key: str) -> float:
+        """Seconds until ``key`` may act again, 0 if it already can."""
+        if (expiry := self._expiries.get(key)) is None:
+            return 0.0
+        if (remaining := expiry - self.clock()) > 0:
+            return remaining
+        del self._expiries[key]
+        return 0.0
+
+    def ready(self, key: str) -> bool:
+        return not self.remaining(key)
+
+    def evict_expired(self) -> int:
+        now = self.clock()
+        evicted = 0
+        while self._heap and self._heap[0][0] <= now:
+            expiry, key = heapq.heappop(self._heap)
+            # Entries superseded by a later start are left in the heap
+            if self._expiries.get(key) == expiry:
+                del self._expiries[key]
+                evicted += 1
+        return evicted
@@ -0,0 +1,184 @@
+"""Process-wide engines and session factories shared by every app.
+
+Engines are only created the first time a unit of work asks for one, so
+importing an app (or its fakes) never touches the database.
+"""
+from __future__ import annotations
+
+from threading import Lock
+from typing import Any, Literal
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm import (
+    joinedload,
+    raiseload,
+    selectinload,
+    sessionmaker,
+)
+from sqlalchemy.orm.strategy_options import Load
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlalchemy.sql.dml import Insert
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import DatabaseSettings, settings
+
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+Loading = Literal["joined", "selectin", "raise"]
+_LOADERS = {"joined": joinedload, "selectin": selectinload, "raise": raiseload}
+
+_lock = Lock()
+_engines: dict[str, Engine] = {}
+_async_engines: dict[str, AsyncEngine] = {}
+_session_factories: dict[str, sessionmaker[Session]] = {}
+_async_session_factories: dict[str, sessionmaker[AsyncSession]] = {}
+
+
+def is_in_memory(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _engine_kwargs(db: DatabaseSettings, url: str, *, is_async: bool) -> dict[str, Any]:
+    kwargs: dict[str, Any] = {"echo": db.echo}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        kwargs["connect_args"] = {"check_same_thread": False}
+        if is_in_memory(parsed):
+            # Every connection to :memory: is a new database, so share one
+            kwargs["poolclass"] = StaticPool
+            return kwargs
+        kwargs["poolclass"] = AsyncAdaptedQueuePool if is_async else QueuePool
+
+    kwargs.update(
+        pool_size=db.pool_size,
+        max_overflow=db.max_overflow,
+        pool_pre_ping=db.pool_pre_ping,
+        pool_recycle=db.pool_recycle,
+    )
+    return kwargs
+
+
+def _set_sqlite_pragmas(engine: Engine, db: DatabaseSettings) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        if db.sqlite_wal:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={db.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(db.sqlite_busy_timeout)}")
+        cursor.close()
+
+
+def create_engine_from_settings(db: DatabaseSettings) -> Engine:
+    engine = create_engine(db.url, **_engine_kwargs(db, db.url, is_async=False))
+    _set_sqlite_pragmas(engine, db)
+    return engine
+
+
+def create_async_engine_from_settings(db: DatabaseSettings) -> AsyncEngine:
+    engine = create_async_engine(
+        db.async_url, **_engine_kwargs(db, db.async_url, is_async=True)
+    )
+    _set_sqlite_pragmas(engine.sync_engine, db)
+    return engine
+
+
+def get_engine(db: DatabaseSettings | None = None) -> Engine:
+    db = db or settings.db
+    if (engine := _engines.get(db.url)) is None:
+        with _lock:
+            if (engine := _engines.get(db.url)) is None:
+                engine = _engines[db.url] = create_engine_from_settings(db)
+    return engine
+
+
+def get_async_engine(db: DatabaseSettings | None = None) -> AsyncEngine:
+    db = db or settings.db
+    if (engine := _async_engines.get(db.url)) is None:
+        with _lock:
+            if (engine := _async_engines.get(db.url)) is None:
+                engine = _async_engines[db.url] = create_async_engine_from_settings(db)
+    return engine
+
+
+def get_session_factory(db: DatabaseSettings | None = None) -> sessionmaker[Session]:
+    db = db or settings.db
+    if (factory := _session_factories.get(db.url)) is None:
+        factory = sessionmaker(bind=get_engine(db), class_=Session)
+        _session_factories[db.url] = factory
+    return factory
+
+
+def get_async_session_factory(
+    db: DatabaseSettings | None = None,
+) -> sessionmaker[AsyncSession]:
+    db = db or settings.db
+    if (factory := _async_session_factories.get(db.url)) is None:
+        # Expiring on commit would make the next attribute access lazy load
+        # outside the greenlet, so committed objects keep their loaded state
+        factory = sessionmaker(
+            bind=get_async_engine(db), class_=AsyncSession, expire_on_commit=False
+        )
+        _async_session_factories[db.url] = factory
+    return factory
+
+
+def dispose_engines() -> None:
+    """Close every pooled connection, e.g. on shutdown or after forking."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _session_factories.clear()
+
+
+async def dispose_async_engines() -> None:
+    with _lock:
+        engines = list(_async_engines.values())
+        _async_engines.clear()
+        _async_session_factories.clear()
+    for engine in engines:
+        await engine.dispose()
+
+
+def insert_or_ignore(
+    session: Session, model: type[SQLModel], *index_elements: str
+) -> Insert:
+    """An INSERT that skips rows conflicting on the given unique columns."""
+    dialect = session.get_bind().dialect.name
+    return _DIALECT_INSERTS[dialect](model).on_conflict_do_nothing(
+        index_elements=index_elements
+    )
+
+
+def loading_options(*relationships: Any, loading: Loading | None = None) -> list[Load]:
+    """Loader options for a query returning entities with these relationships.
+
+    ``loading`` picks how the given relationships come back with the query.
+    Every other relationship, and these when ``loading`` is None, falls back to
+    ``relationship_loading``, which tests set to "raise" so a lazy load nobody
+    asked for fails instead of quietly costing a query.
+    """
+    options = [] if loading is None else [_LOADERS[loading](r) for r in relationships]
+    if settings.db.relationship_loading == "raise":
+        options.append(raiseload("*"))
+    return options
+
+
+def insert_or_add(
+    session: Session, model: type[SQLModel], column: str, *index_elements: str
+) -> Insert:
+    """An INSERT that adds ``column`` onto rows conflicting on the unique columns."""
+    dialect = session.get_bind().dialect.name
+    statement = _DIALECT_INSERTS[dialect](model)
+    return statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: statement.table.c[column] + statement.excluded[column]},
+    )
@@ -0,0 +1,12 @@
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import TypeVar
+
+_T = TypeVar("_T")
+
+
+def chunked(iterable: Iterable[_T], size: int) -> Iterator[list[_T]]:
+    """Yield lists of up to ``size`` items without materialising the input."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,226 @@
+"""Statement counts and database time per unit of work and per service call.
+
+A unit of work binds a ``UnitOfWorkMetrics`` to its session. Engine events then
+charge every statement run on the session's connection to it, and to the
+service currently running inside it when that service is wrapped in
+``traced``. When the unit of work ends its numbers are added to a process wide
+``MetricsRegistry`` that ``METRICS.snapshot()`` reads.
+"""
+import copy
+import functools
+import inspect
+import logging
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, TypeVar, cast
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlmodel import SQLModel
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+_METRICS = "uow_metrics"
+_STARTED = "uow_metrics_started"
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+class QueryMetrics(SQLModel):
+    """Totals for a unit of work or a service.
+
+    ``rows`` counts ORM objects loaded plus rows changed by writes; rows read
+    through plain column selects are not visible to engine events.
+    """
+
+    calls: int = 0
+    statements: int = 0
+    max_statements: int = 0
+    db_seconds: float = 0.0
+    rows: int = 0
+    commit_seconds: float = 0.0
+    n_plus_one: int = 0
+
+    def add(self, other: "QueryMetrics") -> None:
+        self.calls += other.calls
+        self.statements += other.statements
+        self.max_statements = max(self.max_statements, other.statements)
+        self.db_seconds += other.db_seconds
+        self.rows += other.rows
+        self.commit_seconds += other.commit_seconds
+        self.n_plus_one += other.n_plus_one
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, QueryMetrics] = {}
+        self._lock = Lock()
+
+    def record(self, name: str, metrics: QueryMetrics) -> None:
+        with self._lock:
+            self._metrics.setdefault(name, QueryMetrics()).add(metrics)
+
+    def snapshot(self) -> dict[str, QueryMetrics]:
+        with self._lock:
+            return copy.deepcopy(self._metrics)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+
+METRICS = MetricsRegistry()
+
+
+class UnitOfWorkMetrics:
+    """What one unit of work ran, in total and broken down by service.
+
+    Running the same statement more than ``n_plus_one_threshold`` times logs a
+    warning once, as that is usually a query in a loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        registry: MetricsRegistry = METRICS,
+        n_plus_one_threshold: int | None = None,
+    ) -> None:
+        self.name = name
+        self.registry = registry
+        self.n_plus_one_threshold = (
+            settings.db.n_plus_one_threshold
+            if n_plus_one_threshold is None
+            else n_plus_one_threshold
+        )
+        self.total = QueryMetrics(calls=1)
+        self.services: dict[str, QueryMetrics] = {}
+        self.active = True
+        self._running: list[QueryMetrics] = []
+        self._statements: Counter[str] = Counter()
+
+    def _charged(self) -> list[QueryMetrics]:
+        return [self.total, *self._running[-1:]]
+
+    @contextmanager
+    def service(self, name: str) -> Iterator[None]:
+        metrics = self.services.setdefault(name, QueryMetrics())
+        metrics.calls += 1
+        self._running.append(metrics)
+        try:
+            yield
+        finally:
+            self._running.pop()
+
+    def statement(self, statement: str, seconds: float, rows: int) -> None:
+        for metrics in self._charged():
+            metrics.statements += 1
+            metrics.db_seconds += seconds
+            metrics.rows += rows
+
+        self._statements[statement] += 1
+        if self._statements[statement] == self.n_plus_one_threshold + 1:
+            for metrics in self._charged():
+                metrics.n_plus_one += 1
+            logger.warning(
+                "%s ran the same statement more than %d times, possible N+1: %s",
+                self.name,
+                self.n_plus_one_threshold,
+                statement,
+            )
+
+    def loaded(self) -> None:
+        for metrics in self._charged():
+            metrics.rows += 1
+
+    def committed(self, seconds: float) -> None:
+        for metrics in self._charged():
+            metrics.commit_seconds += seconds
+
+    def finish(self) -> None:
+        if not self.active:
+            return
+        self.active = False
+        self.registry.record(self.name, self.total)
+        for name, metrics in self.services.items():
+            self.registry.record(name, metrics)
+
+
+def bind_metrics(session: Session, metrics: UnitOfWorkMetrics) -> None:
+    session.info[_METRICS] = metrics
+
+
+def traced(fn: _F) -> _F:
+    """Charge what a service runs to its own name, such as ``games.add_key``."""
+    app = fn.__module__.removeprefix("src.apps.").split(".")[0]
+    name = f"{app}.{fn.__name__}"
+
+    def metrics_of(kwargs: dict[str, Any]) -> UnitOfWorkMetrics | None:
+        return getattr(kwargs.get("uow"), "metrics", None)
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def run_async(*args: Any, **kwargs: Any) -> Any:
+            if (metrics := metrics_of(kwargs)) is None:
+                return await fn(*args, **kwargs)
+            with metrics.service(name):
+                return await fn(*args, **kwargs)
+
+        return cast(_F, run_async)
+
+    @functools.wraps(fn)
+    def run(*args: Any, **kwargs: Any) -> Any:
+        if (metrics := metrics_of(kwargs)) is None:
+            return fn(*args, **kwargs)
+        with metrics.service(name):
+            return fn(*args, **kwargs)
+
+    return cast(_F, run)
+
+
+@event.listens_for(Session, "after_begin")
+def _bind_connection(
+    session: Session, transaction: Any, connection: Connection
+) -> None:
+    # The connection info outlives the checkout, so every transaction rebinds
+    # it and finished metrics ignore anything run after them
+    connection.info[_METRICS] = session.info.get(_METRICS)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn: Connection, cursor: Any, statement: str, *args: Any) -> None:
+    if (metrics := conn.info.get(_METRICS)) is not None and metrics.active:
+        conn.info[_STARTED] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement(conn: Connection, cursor: Any, statement: str, *args: Any) -> None:
+    if (metrics := conn.info.get(_METRICS)) is not None and metrics.active:
+        seconds = time.perf_counter() - conn.info.pop(_STARTED, time.perf_counter())
+        rows = cursor.rowcount if cursor.description is None else 0
+        metrics.statement(statement, seconds, max(rows, 0))
+
+
+@event.listens_for(Session, "loaded_as_persistent")
+def _count_loaded(session: Session, instance: Any) -> None:
+    if (metrics := session.info.get(_METRICS)) is not None and metrics.active:
+        metrics.loaded()
+
+
+@event.listens_for(Session, "before_commit")
+def _start_commit(session: Session) -> None:
+    session.info[_STARTED] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _end_commit(session: Session) -> None:
+    started = session.info.pop(_STARTED, None)
+    if (metrics := session.info.get(_METRICS)) is not None and started is not None:
+        metrics.committed(time.perf_counter() - started)
@@ -0,0 +1,213 @@
+"""Route guild events to worker processes, each serving a fixed shard of guilds.
+
+Every event names the guild it came from, and ``shard_for`` sends all of a
+guild's events to the same worker, in order. A burst in one huge guild then
+only queues behind its own shard instead of every guild in the process. Each
+worker builds its own handler, so unit of work factories, engines and caches
+are never shared between processes.
+
+Events are fire and forget: nothing a handler returns makes it back to the
+caller, so only writes whose result nobody waits on belong here.
+"""
+import logging
+import multiprocessing
+import time
+import zlib
+from collections import Counter
+from collections.abc import Callable, Collection
+from multiprocessing.context import BaseContext
+from multiprocessing.queues import Queue
+from queue import Empty, Full
+from types import TracebackType
+from typing import Any, NamedTuple
+
+from pydantic import Field
+from sqlmodel import SQLModel
+from typing_extensions import Self
+
+from .db import dispose_engines
+
+logger = logging.getLogger(__name__)
+
+
+# How long to block on a queue before checking the workers are still alive
+POLL_SECONDS = 0.5
+
+
+class WorkerDied(Exception):
+    pass
+
+
+class GuildEvent(NamedTuple):
+    guild_id: str
+    service: str
+    kwargs: dict[str, Any]
+
+
+Handler = Callable[[GuildEvent], None]
+# Called with the shard number inside the worker; has to be picklable
+HandlerFactory = Callable[[int], Handler]
+
+
+class WorkerStats(SQLModel):
+    shard: int
+    events: int = 0
+    errors: dict[str, int] = Field(default_factory=dict)
+    busy_seconds: float = 0.0
+
+
+def shard_for(guild_id: str, shards: int) -> int:
+    # hash() is salted per process, so routing needs a stable hash
+    return zlib.crc32(guild_id.encode()) % shards
+
+
+def _work(
+    shard: int,
+    handler_factory: HandlerFactory,
+    events: "Queue[GuildEvent | None]",
+    results: "Queue[int | WorkerStats]",
+) -> None:
+    # A forked worker must not reuse the parent's pooled connections
+    dispose_engines()
+    handler = handler_factory(shard)
+    results.put(shard)
+
+    stats = WorkerStats(shard=shard)
+    errors: Counter[str] = Counter()
+    while (event := events.get()) is not None:
+        started = time.perf_counter()
+        try:
+            handler(event)
+        except Exception as error:
+            errors[type(error).__name__] += 1
+            logger.warning("Shard %d failed to run %s: %r", shard, event.service, error)
+        stats.events += 1
+        stats.busy_seconds += time.perf_counter() - started
+
+    stats.errors = dict(errors)
+    results.put(stats)
+
+
+class ShardRouter:
+    """Hashes each event's guild to one of ``workers`` processes.
+
+    Every worker reads its own bounded queue, so ``submit`` blocks once a
+    shard is ``queue_size`` events behind. When ``services`` is given,
+    ``submit`` refuses any other service. ``close`` drains every queue and
+    returns what each worker ran.
+    """
+
+    def __init__(
+        self,
+        handler_factory: HandlerFactory,
+        *,
+        workers: int,
+        queue_size: int = 1000,
+        services: Collection[str] | None = None,
+        context: BaseContext | None = None,
+    ) -> None:
+        self.handler_factory = handler_factory
+        self.workers = workers
+        self.queue_size = queue_size
+        self.services = services
+        self.context = context or multiprocessing.get_context("spawn")
+        self._queues: list[Queue[GuildEvent | None]] = []
+        self._processes: list[Any] = []
+        self._results: Queue[int | WorkerStats] = self.context.Queue()
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        if self._processes:
+            self.close()
+
+    def start(self) -> None:
+        """Start every worker and wait until each has built its handler.
+
+        Raises ``WorkerDied`` if a worker exits first, e.g. because its
+        handler factory failed.
+        """
+        for shard in range(self.workers):
+            queue = self.context.Queue(self.queue_size)
+            process = self.context.Process(
+                target=_work,
+                args=(shard, self.handler_factory, queue, self._results),
+                name=f"shard-{shard}",
+                daemon=True,
+            )
+            process.start()
+            self._queues.append(queue)
+            self._processes.append(process)
+
+        try:
+            self._collect()
+        except BaseException:
+            self._stop()
+            raise
+
+    def submit(self, event: GuildEvent) -> None:
+        if self.services is not None and event.service not in self.services:
+            raise ValueError(f"{event.service} cannot run in a worker")
+        self._put(shard_for(event.guild_id, self.workers), event)
+
+    def close(self) -> list[WorkerStats]:
+        """Raises ``WorkerDied`` if a worker exited without reporting its stats."""
+        try:
+            for shard in range(self.workers):
+                self._put(shard, None)
+            stats = self._collect()
+        finally:
+            self._stop()
+        return sorted(stats.values(), key=lambda worker: worker.shard)  # type: ignore
+
+    def _put(self, shard: int, event: GuildEvent | None) -> None:
+        # A dead worker never makes room in its queue
+        while True:
+            try:
+                return self._queues[shard].put(event, timeout=POLL_SECONDS)
+            except Full:
+                if (process := self._processes[shard]).exitcode is not None:
+                    raise WorkerDied(
+                        f"{process.name} exited with code {process.exitcode}"
+                    ) from None
+
+    def _collect(self) -> dict[int, int | WorkerStats]:
+        """Wait for the next result from every worker, by shard."""
+        results: dict[int, int | WorkerStats] = {}
+        dead: set[int] = set()
+        while len(results) < self.workers:
+            try:
+                result = self._results.get(timeout=POLL_SECONDS)
+            except Empty:
+                # What a worker put just before exiting can still be in the
+                # pipe, so it only counts as lost after one more empty poll
+                if lost := dead - results.keys():
+                    process = self._processes[min(lost)]
+                    raise WorkerDied(
+                        f"{process.name} exited with code {process.exitcode}"
+                    ) from None
+                dead = {
+                    shard
+                    for shard, process in enumerate(self._processes)
+                    if process.exitcode is not None
+                }
+            else:
+                shard = result if isinstance(result, int) else result.shard
+                results[shard] = result
+        return results
+
+    def _stop(self) -> None:
+        for process in self._processes:
+            process.join(timeout=POLL_SECONDS)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._queues.clear()
+        self._processes.clear()
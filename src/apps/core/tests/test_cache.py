@@ -0,0 +1,27 @@
+from src.apps.core.cache import LRUCache
+from src.apps.core.tests.test_cooldown import FakeClock
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache: LRUCache[str, int] = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats().hit_rate == 0.75
+
+
+def test_entries_expire_after_ttl() -> None:
+    clock = FakeClock()
+    cache: LRUCache[str, int] = LRUCache(ttl=10, clock=clock)
+    cache.put("a", 1)
+
+    clock.now += 9
+    assert cache.get("a") == 1
+
+    clock.now += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
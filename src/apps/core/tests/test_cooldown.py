@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from src.apps.core.cooldown import CooldownTracker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cooldown_expires() -> None:
+    clock = FakeClock()
+    cooldowns = CooldownTracker(timedelta(minutes=1), clock=clock)
+
+    cooldowns.start("1")
+
+    assert not cooldowns.ready("1")
+    assert cooldowns.remaining("1") == 60
+    assert cooldowns.ready("2")
+
+    clock.now += 60
+
+    assert cooldowns.ready("1")
+    assert len(cooldowns) == 0
+
+
+def test_expired_cooldowns_are_evicted() -> None:
+    clock = FakeClock()
+    cooldowns = CooldownTracker(timedelta(minutes=1), clock=clock)
+
+    for i in range(100):
+        cooldowns.start(str(i))
+    clock.now += 30
+    cooldowns.start("late")
+    clock.now += 30
+
+    assert cooldowns.evict_expired() == 100
+    assert len(cooldowns) == 1
+
+
+def test_cooldown_from_past_claim() -> None:
+    clock = FakeClock()
+    cooldowns = CooldownTracker(timedelta(minutes=1), clock=clock)
+    now = datetime.utcfromtimestamp(clock.now)
+
+    cooldowns.start("recent", at=now - timedelta(seconds=15))
+    cooldowns.start("old", at=now - timedelta(minutes=5))
+
+    assert cooldowns.remaining("recent") == 45
+    assert len(cooldowns) == 1
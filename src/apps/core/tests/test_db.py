@@ -0,0 +1,35 @@
+from pathlib import Path
+
+from sqlalchemy import text
+
+from src.apps.core import db
+from src.config import DatabaseSettings
+
+
+def test_engines_are_shared_and_built_lazily(tmp_path: Path) -> None:
+    settings = DatabaseSettings(url=f"sqlite:///{tmp_path / 'keybot.db'}")
+    assert settings.url not in db._engines
+
+    engine = db.get_engine(settings)
+
+    assert db.get_engine(settings) is engine
+    assert db.get_session_factory(settings).kw["bind"] is engine
+
+    db.dispose_engines()
+    assert settings.url not in db._engines
+
+
+def test_sqlite_pragmas_are_applied(tmp_path: Path) -> None:
+    engine = db.create_engine_from_settings(
+        DatabaseSettings(
+            url=f"sqlite:///{tmp_path / 'keybot.db'}",
+            sqlite_busy_timeout=1234,
+        )
+    )
+
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+
+    engine.dispose()
@@ -0,0 +1,55 @@
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session
+
+from src.apps.core import db
+from src.apps.core.metrics import (
+    MetricsRegistry,
+    UnitOfWorkMetrics,
+    bind_metrics,
+    traced,
+)
+from src.config import DatabaseSettings
+
+
+class UnitOfWork:
+    def __init__(self, metrics: UnitOfWorkMetrics) -> None:
+        self.metrics = metrics
+
+
+@traced
+def lookup(*, times: int, session: Session, uow: UnitOfWork) -> None:
+    for i in range(times):
+        session.execute(text("SELECT :i"), {"i": i})
+
+
+def test_statements_are_charged_to_unit_of_work_and_service(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    engine = db.create_engine_from_settings(DatabaseSettings(url="sqlite://"))
+    registry = MetricsRegistry()
+    metrics = UnitOfWorkMetrics("core.test", registry=registry, n_plus_one_threshold=3)
+
+    with Session(engine) as session, caplog.at_level(logging.WARNING):
+        bind_metrics(session, metrics)
+        session.execute(text("SELECT 1"))
+        lookup(times=5, session=session, uow=UnitOfWork(metrics))
+        session.commit()
+        metrics.finish()
+
+        # Nothing is charged once the unit of work has finished
+        session.execute(text("SELECT 1"))
+
+    snapshot = registry.snapshot()
+    assert snapshot["core.test"].statements == 6
+    assert snapshot["core.test"].commit_seconds > 0
+    assert snapshot["core.lookup"].calls == 1
+    assert snapshot["core.lookup"].statements == 5
+    assert snapshot["core.lookup"].n_plus_one == 1
+    assert len(caplog.records) == 1
+    assert "possible N+1" in caplog.records[0].getMessage()
+
+    snapshot["core.test"].statements = 0
+    assert registry.snapshot()["core.test"].statements == 6
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from src.apps.core.sharding import (
+    GuildEvent,
+    Handler,
+    ShardRouter,
+    WorkerDied,
+    shard_for,
+)
+
+WORKERS = 2
+
+
+def routed_handler(shard: int) -> Handler:
+    def handle(event: GuildEvent) -> None:
+        if shard_for(event.guild_id, WORKERS) != shard:
+            raise AssertionError(f"{event.guild_id} reached shard {shard}")
+        if event.service == "fail":
+            raise ValueError()
+        if event.service == "exit":
+            os._exit(1)
+
+    return handle
+
+
+def broken_handler(shard: int) -> Handler:
+    raise RuntimeError("no database")
+
+
+def test_guilds_always_map_to_the_same_shard() -> None:
+    shards = {shard_for(f"guild-{i}", 4) for i in range(100)}
+
+    assert shards == {0, 1, 2, 3}
+    assert shard_for("guild-1", 4) == shard_for("guild-1", 4)
+
+
+def test_events_reach_the_worker_of_their_guild() -> None:
+    with ShardRouter(routed_handler, workers=WORKERS) as router:
+        for i in range(50):
+            router.submit(GuildEvent(f"guild-{i % 10}", "ok", {}))
+        router.submit(GuildEvent("guild-1", "fail", {}))
+        stats = router.close()
+
+    assert [worker.shard for worker in stats] == [0, 1]
+    assert sum(worker.events for worker in stats) == 51
+    assert all(worker.events for worker in stats)
+    assert [worker.errors for worker in stats if worker.errors] == [{"ValueError": 1}]
+
+
+def test_a_worker_that_cannot_start_is_reported() -> None:
+    router = ShardRouter(broken_handler, workers=WORKERS)
+
+    with pytest.raises(WorkerDied):
+        router.start()
+
+
+def test_a_worker_dying_mid_stream_is_reported() -> None:
+    with ShardRouter(routed_handler, workers=WORKERS) as router:
+        router.submit(GuildEvent("guild-1", "exit", {}))
+
+        with pytest.raises(WorkerDied):
+            router.close()
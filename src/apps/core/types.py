@@ -62,3 +62,61 @@ class BaseUnitOfWork(Protocol[_S]):
 
     def commit(self) -> None:
         ...
+
+
+class BaseAsyncSession(Protocol):
+    def add(self, instance: Any, *args: Any, **kwargs: Any) -> None:
+        ...
+
+    async def refresh(self, instance: Any, *args: Any, **kwargs: Any) -> None:
+        ...
+
+    async def commit(self) -> None:
+        ...
+
+
+_AS_co = TypeVar("_AS_co", bound=BaseAsyncSession, covariant=True)
+
+
+class BaseAsyncRepository(Protocol[_AS_co]):
+    def __init__(
+        self,
+        session: _AS_co,
+        *args: Any,
+        **kwargs: Any,
+    ) -> None:
+        ...
+
+
+_AS = TypeVar("_AS", bound=BaseAsyncSession)
+AsyncSessionFactory = Callable[..., _AS]
+
+
+class BaseAsyncUnitOfWork(Protocol[_AS]):
+    repo: BaseAsyncRepository[_AS]
+    session_factory: AsyncSessionFactory[_AS]
+
+    def __init__(
+        self,
+        session_factory: AsyncSessionFactory[_AS],
+        *args: Any,
+        **kwargs: Any,
+    ) -> None:
+        ...
+
+    async def __aenter__(self) -> Self:
+        ...
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        ...
+
+    async def rollback(self) -> None:
+        ...
+
+    async def commit(self) -> None:
+        ...
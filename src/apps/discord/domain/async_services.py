@@ -0,0 +1,55 @@
+"""Async counterparts of ``services`` for use inside the bot's event loop."""
+from collections.abc import Iterable
+from datetime import datetime
+
+from src.apps.core.cooldown import CooldownTracker
+from src.apps.core.metrics import traced
+from src.apps.core.types import BaseAsyncSession
+
+from ..unit_of_work.types import AsyncDiscordUnitOfWork
+from .models import RosterChanges
+
+
+@traced
+async def join_guild(
+    *,
+    member_id: str,
+    guild_id: str,
+    uow: AsyncDiscordUnitOfWork[BaseAsyncSession],
+) -> None:
+    await uow.repo.add_member_to_guild(member_id=member_id, guild_id=guild_id)
+
+
+@traced
+async def leave_guild(
+    *,
+    member_id: str,
+    guild_id: str,
+    uow: AsyncDiscordUnitOfWork[BaseAsyncSession],
+) -> None:
+    await uow.repo.remove_member_from_guild(member_id=member_id, guild_id=guild_id)
+
+
+@traced
+async def load_cooldowns(
+    *,
+    cooldowns: CooldownTracker,
+    uow: AsyncDiscordUnitOfWork[BaseAsyncSession],
+) -> None:
+    since = datetime.utcnow() - cooldowns.period
+    for member_id, last_claim in await uow.repo.get_claims_since(since=since):
+        cooldowns.start(member_id, at=last_claim)
+
+
+@traced
+async def sync_guild_members(
+    *,
+    guild_id: str,
+    member_ids: Iterable[str],
+    uow: AsyncDiscordUnitOfWork[BaseAsyncSession],
+) -> RosterChanges:
+    changes = await uow.repo.sync_guild_members(
+        guild_id=guild_id, member_ids=member_ids
+    )
+    await uow.commit()
+    return changes
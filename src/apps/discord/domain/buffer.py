@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import time
+from threading import Lock
+from types import TracebackType
+from typing import Callable, Literal
+
+from sqlmodel import SQLModel
+from typing_extensions import Self
+
+from src.apps.core.types import BaseSession
+
+from ..unit_of_work.types import DiscordUnitOfWork
+from .expections import FailedToJoin, FailedToLeave
+from .services import join_guild, leave_guild
+
+Membership = Literal["join", "leave"]
+
+
+class BufferStats(SQLModel):
+    events: int = 0
+    coalesced: int = 0
+    flushes: int = 0
+    last_batch_size: int = 0
+    max_batch_size: int = 0
+    last_flush_seconds: float = 0.0
+    total_flush_seconds: float = 0.0
+
+
+class MembershipBuffer:
+    """Collects join/leave events and writes them in grouped transactions.
+
+    Events are coalesced per ``(member_id, guild_id)``: a repeated event is kept
+    once and an opposite event cancels the pending one, since the gateway only
+    reports a leave for a member and a join for a non-member. The buffer is
+    flushed in one unit of work once it holds ``max_size`` pairs or its oldest
+    event is ``max_age`` seconds old; call ``flush_if_due`` from a periodic task
+    so a quiet guild's events still go out, and ``close`` on shutdown.
+    """
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], DiscordUnitOfWork[BaseSession]],
+        *,
+        max_size: int = 500,
+        max_age: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.uow_factory = uow_factory
+        self.max_size = max_size
+        self.max_age = max_age
+        self.clock = clock
+        self.stats = BufferStats()
+        self._pending: dict[tuple[str, str], Membership] = {}
+        self._oldest: float | None = None
+        self._lock = Lock()
+        # Serialises flushes so batches for the same pair commit in order
+        self._flush_lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def join(self, *, member_id: str, guild_id: str) -> None:
+        self._add((member_id, guild_id), "join")
+
+    def leave(self, *, member_id: str, guild_id: str) -> None:
+        self._add((member_id, guild_id), "leave")
+
+    def _add(self, pair: tuple[str, str], event: Membership) -> None:
+        with self._lock:
+            self.stats.events += 1
+            if not self._merge(pair, event):
+                self.stats.coalesced += 1
+
+        self.flush_if_due()
+
+    def _merge(self, pair: tuple[str, str], event: Membership) -> bool:
+        """Add an event to the pending batch, False if it was coalesced."""
+        if (pending := self._pending.get(pair)) is None:
+            self._pending[pair] = event
+            if self._oldest is None:
+                self._oldest = self.clock()
+            return True
+
+        if pending != event:
+            del self._pending[pair]
+        return False
+
+    def is_due(self) -> bool:
+        return len(self._pending) >= self.max_size or (
+            self._oldest is not None and self.clock() - self._oldest >= self.max_age
+        )
+
+    def flush_if_due(self) -> int:
+        return self.flush() if self.is_due() else 0
+
+    def flush(self) -> int:
+        """Write every pending event in one transaction, returning how many."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._oldest = None
+
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self._write(batch)
+            except Exception:
+                # Put the batch back in front of anything buffered since
+                with self._lock:
+                    newer, self._pending = self._pending, {}
+                    for pair, event in [*batch.items(), *newer.items()]:
+                        self._merge(pair, event)
+                raise
+            elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.stats.flushes += 1
+            self.stats.last_batch_size = len(batch)
+            self.stats.max_batch_size = max(self.stats.max_batch_size, len(batch))
+            self.stats.last_flush_seconds = elapsed
+            self.stats.total_flush_seconds += elapsed
+
+        return len(batch)
+
+    def _write(self, batch: dict[tuple[str, str], Membership]) -> None:
+        with self.uow_factory() as uow:
+            for (member_id, guild_id), event in batch.items():
+                try:
+                    if event == "join":
+                        join_guild(member_id=member_id, guild_id=guild_id, uow=uow)
+                    else:
+                        leave_guild(member_id=member_id, guild_id=guild_id, uow=uow)
+                except (FailedToJoin, FailedToLeave):
+                    # Already in the requested state
+                    pass
+
+    def close(self) -> None:
+        self.flush()
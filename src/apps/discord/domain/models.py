@@ -27,3 +27,8 @@ class Member(SQLModel):
         if isinstance(other, Member):
             return self.id == other.id
         return NotImplemented
+
+
+class RosterChanges(SQLModel):
+    joined: int = 0
+    left: int = 0
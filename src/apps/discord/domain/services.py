@@ -1,8 +1,15 @@
+from collections.abc import Iterable
+from datetime import datetime
+
+from src.apps.core.cooldown import CooldownTracker
+from src.apps.core.metrics import traced
 from src.apps.core.types import BaseSession
 
 from ..unit_of_work.types import DiscordUnitOfWork
+from .models import RosterChanges
 
 
+@traced
 def join_guild(
     *,
     member_id: str,
@@ -12,6 +19,7 @@ def join_guild(
     uow.repo.add_member_to_guild(member_id=member_id, guild_id=guild_id)
 
 
+@traced
 def leave_guild(
     *,
     member_id: str,
@@ -19,3 +27,32 @@ def leave_guild(
     uow: DiscordUnitOfWork[BaseSession],
 ) -> None:
     uow.repo.remove_member_from_guild(member_id=member_id, guild_id=guild_id)
+
+
+@traced
+def load_cooldowns(
+    *,
+    cooldowns: CooldownTracker,
+    uow: DiscordUnitOfWork[BaseSession],
+) -> None:
+    """Warm a cooldown tracker with every member still inside the wait period."""
+    since = datetime.utcnow() - cooldowns.period
+    for member_id, last_claim in uow.repo.get_claims_since(since=since):
+        cooldowns.start(member_id, at=last_claim)
+
+
+@traced
+def sync_guild_members(
+    *,
+    guild_id: str,
+    member_ids: Iterable[str],
+    uow: DiscordUnitOfWork[BaseSession],
+) -> RosterChanges:
+    """Make the stored roster of a guild match ``member_ids`` in one transaction.
+
+    ``member_ids`` is consumed in chunks, so a generator over a streamed
+    GUILD_CREATE payload never needs the whole roster in memory twice.
+    """
+    changes = uow.repo.sync_guild_members(guild_id=guild_id, member_ids=member_ids)
+    uow.commit()
+    return changes
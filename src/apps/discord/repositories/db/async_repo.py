@@ -0,0 +1,116 @@
+from collections.abc import AsyncIterator, Iterable
+from datetime import datetime
+from typing import Any, Callable, TypeVar
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.apps.core.cache import CacheStats
+
+from ...domain.models import RosterChanges
+from ..types import AsyncDiscordRepository
+from .models import GuildInDB, MemberInDB
+from .repo import SQLModelRepository
+
+_T = TypeVar("_T")
+
+
+class AsyncSQLModelRepository(AsyncDiscordRepository[AsyncSession]):
+    """Runs SQLModelRepository inside the async session's greenlet.
+
+    The queries are shared with the sync backend while the driver I/O is
+    awaited on the event loop, without handing work to a thread pool.
+    """
+
+    def __init__(self, session: AsyncSession, *args: Any, **kwargs: Any):
+        self.session = session
+        self.repo = SQLModelRepository(session.sync_session, *args, **kwargs)
+
+    async def _run(self, fn: Callable[[], _T]) -> _T:
+        return await self.session.run_sync(lambda _: fn())
+
+    def stats(self) -> CacheStats | None:
+        return self.repo.stats()
+
+    async def get_member(self, *, id: str) -> MemberInDB:
+        def get_member() -> MemberInDB:
+            member = self.repo.get_member(id=id)
+            # A member served from the identity cache reads last_claim lazily,
+            # which only works inside the greenlet
+            member.last_claim
+            return member
+
+        return await self._run(get_member)
+
+    async def get_guild(self, *, id: str) -> GuildInDB:
+        return await self._run(lambda: self.repo.get_guild(id=id))
+
+    async def add_member_to_guild(
+        self,
+        *,
+        member_id: str,
+        guild_id: str,
+    ) -> None:
+        await self._run(
+            lambda: self.repo.add_member_to_guild(
+                member_id=member_id, guild_id=guild_id
+            )
+        )
+
+    async def remove_member_from_guild(
+        self,
+        *,
+        member_id: str,
+        guild_id: str,
+    ) -> None:
+        await self._run(
+            lambda: self.repo.remove_member_from_guild(
+                member_id=member_id, guild_id=guild_id
+            )
+        )
+
+    async def get_guild_members(self, guild_id: str) -> list[MemberInDB]:
+        # Lazy relationships can only load inside the greenlet
+        return await self._run(lambda: list(self.repo.get_guild_members(guild_id)))
+
+    async def get_guild_members_page(
+        self,
+        guild_id: str,
+        *,
+        after: str | None = None,
+        limit: int = 100,
+    ) -> list[MemberInDB]:
+        return await self._run(
+            lambda: self.repo.get_guild_members_page(guild_id, after=after, limit=limit)
+        )
+
+    async def iter_guild_members(
+        self,
+        guild_id: str,
+        *,
+        page_size: int = 100,
+    ) -> AsyncIterator[list[MemberInDB]]:
+        after: str | None = None
+        while page := await self.get_guild_members_page(
+            guild_id, after=after, limit=page_size
+        ):
+            yield page
+            after = page[-1].id
+
+    async def count_guild_members(self, guild_id: str) -> int:
+        return await self._run(lambda: self.repo.count_guild_members(guild_id))
+
+    async def get_claims_since(self, *, since: datetime) -> list[tuple[str, datetime]]:
+        return await self._run(lambda: self.repo.get_claims_since(since=since))
+
+    async def sync_guild_members(
+        self,
+        *,
+        guild_id: str,
+        member_ids: Iterable[str],
+        chunk_size: int = 1000,
+    ) -> RosterChanges:
+        return await self._run(
+            lambda: self.repo.sync_guild_members(
+                guild_id=guild_id, member_ids=member_ids, chunk_size=chunk_size
+            )
+        )
@@ -0,0 +1,57 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.apps.core.cache import LRUCache
+from src.config import settings
+
+# ("members" | "guilds", id)
+IdentityKey = tuple[str, str]
+
+# Member and guild primary keys by table and id, shared by every unit of work in
+# the process that opts in. Rows are never renumbered, so only what the other
+# columns hold has to be read from the database.
+IDENTITY_CACHE: LRUCache[IdentityKey, int] = LRUCache(
+    maxsize=settings.discord.identity_cache_size,
+    ttl=settings.discord.identity_cache_ttl,
+)
+
+_CACHE = "identity_cache"
+_PENDING = "pending_identity_pks"
+
+
+def bind_identity_cache(session: Session, cache: LRUCache[IdentityKey, int]) -> None:
+    session.info[_CACHE] = cache
+
+
+def get_identity_cache(session: Session) -> LRUCache[IdentityKey, int] | None:
+    return session.info.get(_CACHE)
+
+
+def stage_identity_pk(session: Session, key: IdentityKey, pk: int) -> None:
+    """Hold a pk back from the cache until its transaction commits.
+
+    A member or guild created inside a transaction that is later rolled back
+    must never reach the shared cache.
+    """
+    if _CACHE in session.info:
+        session.info.setdefault(_PENDING, {})[key] = pk
+
+
+def get_identity_pk(session: Session, key: IdentityKey) -> int | None:
+    if (pk := session.info.get(_PENDING, {}).get(key)) is not None:
+        return pk
+    if (cache := session.info.get(_CACHE)) is not None:
+        return cache.get(key)
+    return None
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_identity_pks(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if pending and (cache := session.info.get(_CACHE)) is not None:
+        cache.update(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_identity_pks(session: Session) -> None:
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,36 @@
+"""Let other apps follow members joining and leaving guilds.
+
+Hooks run inside the transaction that changes the links, so whatever they
+write commits or rolls back with the membership change.
+"""
+from typing import Any, Protocol
+
+from sqlmodel import Session
+
+
+class MembershipHook(Protocol):
+    def __call__(
+        self, session: Session, *, guild_pk: Any, members: Any, sign: int = 1
+    ) -> None:
+        ...
+
+
+MEMBERSHIP_HOOKS: list[MembershipHook] = []
+
+
+def on_membership_change(hook: MembershipHook) -> MembershipHook:
+    """Run ``hook`` whenever members join (``sign`` 1) or leave (-1) a guild.
+
+    ``guild_pk`` may be a scalar subquery and ``members`` is a condition on
+    ``MemberInDB``. Hooks see joins after the links are made and leaves before
+    they are deleted.
+    """
+    MEMBERSHIP_HOOKS.append(hook)
+    return hook
+
+
+def membership_changed(
+    session: Session, *, guild_pk: Any, members: Any, sign: int = 1
+) -> None:
+    for hook in MEMBERSHIP_HOOKS:
+        hook(session, guild_pk=guild_pk, members=members, sign=sign)
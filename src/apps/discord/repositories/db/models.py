@@ -1,4 +1,4 @@
-from __future__ import annotations
+from datetime import datetime
 
 from sqlmodel import Field, Relationship, SQLModel
 
@@ -7,12 +7,15 @@ from src.apps.discord.domain.models import Guild, Member
 
 class MemberToGuildLink(SQLModel, table=True):
     member_pk: int | None = Field(None, foreign_key="members.pk", primary_key=True)
-    guild_pk: int | None = Field(None, foreign_key="guilds.pk", primary_key=True)
+    guild_pk: int | None = Field(
+        None, foreign_key="guilds.pk", primary_key=True, index=True
+    )
 
 
 class GuildInDB(Guild, table=True):
     __tablename__ = "guilds"
     pk: int | None = Field(default=None, primary_key=True)
+    id: str = Field(index=True, unique=True)
     members: list["MemberInDB"] = Relationship(  # type: ignore
         back_populates="guilds", link_model=MemberToGuildLink
     )
@@ -21,6 +24,8 @@ class GuildInDB(Guild, table=True):
 class MemberInDB(Member, table=True):
     __tablename__ = "members"
     pk: int | None = Field(default=None, primary_key=True)
+    id: str = Field(index=True, unique=True)
+    last_claim: datetime | None = Field(default=None, index=True)
     guilds: list["GuildInDB"] = Relationship(  # type: ignore
         back_populates="members", link_model=MemberToGuildLink
     )
@@ -1,38 +1,132 @@
-from typing import Any
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from typing import Any, TypeVar
 
-from sqlmodel import Session, select
+from sqlalchemy import delete, func, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+from sqlmodel import Session, col, select
+from sqlmodel.sql.expression import SelectOfScalar
+
+from src.apps.core.cache import CacheStats, LRUCache
+from src.apps.core.db import Loading, insert_or_ignore, loading_options
+from src.apps.core.iterables import chunked
+from src.apps.discord.domain.models import RosterChanges
 
 from ..types import DiscordRepository
-from .models import GuildInDB, MemberInDB
+from .cache import (
+    IdentityKey,
+    bind_identity_cache,
+    get_identity_cache,
+    get_identity_pk,
+    stage_identity_pk,
+)
+from .hooks import membership_changed
+from .models import GuildInDB, MemberInDB, MemberToGuildLink
+
+_M = TypeVar("_M", GuildInDB, MemberInDB)
 
 
 class SQLModelRepository(DiscordRepository[Session]):
-    def __init__(self, session: Session, *args: Any, **kwargs: Any):
+    def __init__(
+        self,
+        session: Session,
+        *args: Any,
+        identity_cache: LRUCache[IdentityKey, int] | None = None,
+        **kwargs: Any,
+    ):
         self.session = session
+        if identity_cache is not None:
+            bind_identity_cache(session, identity_cache)
+
+    @staticmethod
+    def _relationship(model: type[_M]) -> Any:
+        return GuildInDB.members if model is GuildInDB else MemberInDB.guilds
+
+    def _attach_cached(self, model: type[_M], id: str) -> _M | None:
+        """The instance behind a cached pk, attached to the session without a SELECT.
+
+        Only ``pk`` and ``id`` are known up front; every other column, such as
+        ``last_claim``, is expired and read from the database when accessed.
+        """
+        if (pk := get_identity_pk(self.session, (model.__tablename__, id))) is None:
+            return None
+        if instance := self.session.identity_map.get(identity_key(model, pk)):
+            return instance
+
+        instance = model(pk=pk, id=id)
+        make_transient_to_detached(instance)
+        self.session.add(instance)
+        if columns := [
+            column.key
+            for column in inspect(model).column_attrs
+            if column.key not in ("pk", "id")
+        ]:
+            self.session.expire(instance, columns)
+        return instance
+
+    def _get_or_create(
+        self, model: type[_M], id: str, loading: Loading | None = None
+    ) -> _M:
+        # Relationships asked for up front need the query anyway
+        if loading is None and (instance := self._attach_cached(model, id)):
+            return instance
+
+        statement = (
+            select(model)
+            .where(model.id == id)
+            .options(*loading_options(self._relationship(model), loading=loading))
+        )
 
-    def get_member(self, *, id: str) -> MemberInDB:
-        statement = select(MemberInDB).where(MemberInDB.id == id)
+        if not (instance := self.session.exec(statement).first()):
+            # A concurrent insert of the same id is ignored and then read back
+            self.session.execute(
+                insert_or_ignore(self.session, model, "id").values(id=id)
+            )
+            instance = self.session.exec(statement).one()
 
-        if member := self.session.exec(statement).first():
-            return member
+        stage_identity_pk(self.session, (model.__tablename__, id), instance.pk)
+        return instance
 
-        new_member = MemberInDB(id=id)
-        self.session.add(new_member)
-        return new_member
+    def _get_or_create_pk(self, model: type[_M], id: str) -> int:
+        key = (model.__tablename__, id)
+        if (pk := get_identity_pk(self.session, key)) is not None:
+            return pk
+
+        statement = select(model.pk).where(model.id == id)
+        if (pk := self.session.exec(statement).first()) is None:
+            self.session.execute(
+                insert_or_ignore(self.session, model, "id").values(id=id)
+            )
+            pk = self.session.exec(statement).one()
+
+        stage_identity_pk(self.session, key, pk)
+        return pk
+
+    def _pk(self, model: type[_M], id: str) -> Any:
+        """The cached pk, or else a subquery for it that creates nothing."""
+        if (pk := get_identity_pk(self.session, (model.__tablename__, id))) is not None:
+            return pk
+        return select(model.pk).where(model.id == id).scalar_subquery()
+
+    def stats(self) -> CacheStats | None:
+        """Hit rate of the identity cache, if this repository uses one."""
+        if (cache := get_identity_cache(self.session)) is not None:
+            return cache.stats()
+        return None
+
+    def get_member(self, *, id: str, loading: Loading | None = None) -> MemberInDB:
+        """``loading`` is how the member's guilds are loaded with it."""
+        return self._get_or_create(MemberInDB, id, loading)
 
     def get_guild(
         self,
         *,
         id: str,
+        loading: Loading | None = None,
     ) -> GuildInDB:
-        statement = select(GuildInDB).where(GuildInDB.id == id)
-
-        if guild := self.session.exec(statement).first():
-            return guild
-
-        new_guild = GuildInDB(id=id)
-        self.session.add(new_guild)
-        return new_guild
+        """``loading`` is how the guild's members are loaded with it."""
+        return self._get_or_create(GuildInDB, id, loading)
 
     def add_member_to_guild(
         self,
@@ -40,11 +134,19 @@ class SQLModelRepository(DiscordRepository[Session]):
         member_id: str,
         guild_id: str,
     ) -> None:
-        member = self.get_member(id=member_id)
-        guild = self.get_guild(id=guild_id)
-        if member not in guild.members:
-            member.guilds.append(guild)
-            self.session.add(member)
+        # The link's primary key makes joining twice a no-op, so joining costs
+        # the same handful of indexed statements however big the guild is
+        member_pk = self._get_or_create_pk(MemberInDB, member_id)
+        guild_pk = self._get_or_create_pk(GuildInDB, guild_id)
+        joined = self.session.execute(
+            insert_or_ignore(
+                self.session, MemberToGuildLink, "member_pk", "guild_pk"
+            ).values(member_pk=member_pk, guild_pk=guild_pk)
+        )
+        if joined.rowcount:
+            membership_changed(
+                self.session, guild_pk=guild_pk, members=MemberInDB.pk == member_pk
+            )
 
     def remove_member_from_guild(
         self,
@@ -52,11 +154,152 @@ class SQLModelRepository(DiscordRepository[Session]):
         member_id: str,
         guild_id: str,
     ) -> None:
-        member = self.get_member(id=member_id)
-        guild = self.get_guild(id=guild_id)
-        if member in guild.members:
-            member.guilds.remove(guild)
-            self.session.add(member)
-
-    def get_guild_members(self, guild_id: str) -> list[MemberInDB]:
-        return self.get_guild(id=guild_id).members
+        member_pk = self._pk(MemberInDB, member_id)
+        guild_pk = self._pk(GuildInDB, guild_id)
+        left = self.session.execute(
+            delete(MemberToGuildLink)
+            .where(
+                col(MemberToGuildLink.member_pk) == member_pk,
+                col(MemberToGuildLink.guild_pk) == guild_pk,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if left.rowcount:
+            membership_changed(
+                self.session,
+                guild_pk=guild_pk,
+                members=MemberInDB.pk == member_pk,
+                sign=-1,
+            )
+
+    def _guild_members(
+        self, guild_id: str, loading: Loading | None = None
+    ) -> SelectOfScalar[MemberInDB]:
+        return (
+            select(MemberInDB)
+            .join(MemberToGuildLink, MemberToGuildLink.member_pk == MemberInDB.pk)
+            .join(GuildInDB, GuildInDB.pk == MemberToGuildLink.guild_pk)
+            .where(GuildInDB.id == guild_id)
+            .options(*loading_options(MemberInDB.guilds, loading=loading))
+        )
+
+    def get_guild_members(
+        self, guild_id: str, *, loading: Loading | None = None
+    ) -> list[MemberInDB]:
+        """``loading`` is how each member's guilds are loaded with them."""
+        return self.session.exec(self._guild_members(guild_id, loading)).all()
+
+    def get_guild_members_page(
+        self,
+        guild_id: str,
+        *,
+        after: str | None = None,
+        limit: int = 100,
+        loading: Loading | None = None,
+    ) -> list[MemberInDB]:
+        statement = (
+            self._guild_members(guild_id, loading).order_by(MemberInDB.id).limit(limit)
+        )
+        if after is not None:
+            statement = statement.where(MemberInDB.id > after)
+        return self.session.exec(statement).all()
+
+    def iter_guild_members(
+        self,
+        guild_id: str,
+        *,
+        page_size: int = 100,
+        loading: Loading | None = None,
+    ) -> Iterator[list[MemberInDB]]:
+        after: str | None = None
+        while page := self.get_guild_members_page(
+            guild_id, after=after, limit=page_size, loading=loading
+        ):
+            yield page
+            after = page[-1].id
+
+    def count_guild_members(self, guild_id: str) -> int:
+        statement = (
+            select(func.count())
+            .select_from(MemberToGuildLink)
+            .join(GuildInDB, GuildInDB.pk == MemberToGuildLink.guild_pk)
+            .where(GuildInDB.id == guild_id)
+        )
+        return self.session.exec(statement).one()
+
+    def get_claims_since(self, *, since: datetime) -> list[tuple[str, datetime]]:
+        statement = select(MemberInDB.id, MemberInDB.last_claim).where(
+            col(MemberInDB.last_claim) > since
+        )
+        return self.session.exec(statement).all()
+
+    def sync_guild_members(
+        self,
+        *,
+        guild_id: str,
+        member_ids: Iterable[str],
+        chunk_size: int = 1000,
+    ) -> RosterChanges:
+        guild_pk = self._get_or_create_pk(GuildInDB, guild_id)
+        statement = (
+            select(MemberInDB.id, MemberInDB.pk)
+            .join(MemberToGuildLink, MemberToGuildLink.member_pk == MemberInDB.pk)
+            .where(MemberToGuildLink.guild_pk == guild_pk)
+        )
+        # Whatever is left here once the roster is consumed has left the guild
+        stale: dict[str, int] = dict(self.session.exec(statement).all())
+
+        # A member listed twice, even in different chunks, only joins once
+        seen: set[str] = set()
+        changes = RosterChanges()
+        for chunk in chunked(member_ids, chunk_size):
+            new_ids = {
+                member_id
+                for member_id in chunk
+                if member_id not in seen and stale.pop(member_id, None) is None
+            }
+            seen.update(chunk)
+            if not new_ids:
+                continue
+
+            self.session.execute(
+                insert_or_ignore(self.session, MemberInDB, "id"),
+                [{"id": member_id} for member_id in new_ids],
+            )
+            member_pks = self.session.exec(
+                select(MemberInDB.pk).where(col(MemberInDB.id).in_(new_ids))
+            ).all()
+            self.session.execute(
+                insert_or_ignore(
+                    self.session, MemberToGuildLink, "member_pk", "guild_pk"
+                ),
+                [
+                    {"member_pk": member_pk, "guild_pk": guild_pk}
+                    for member_pk in member_pks
+                ],
+            )
+            membership_changed(
+                self.session,
+                guild_pk=guild_pk,
+                members=col(MemberInDB.pk).in_(member_pks),
+            )
+            changes.joined += len(new_ids)
+
+        for member_pks in chunked(stale.values(), chunk_size):
+            membership_changed(
+                self.session,
+                guild_pk=guild_pk,
+                members=col(MemberInDB.pk).in_(member_pks),
+                sign=-1,
+            )
+            self.session.execute(
+                delete(MemberToGuildLink)
+                .where(
+                    MemberToGuildLink.guild_pk == guild_pk,
+                    col(MemberToGuildLink.member_pk).in_(member_pks),
+                )
+                .execution_options(synchronize_session=False)
+            )
+        changes.left = len(stale)
+
+        return changes
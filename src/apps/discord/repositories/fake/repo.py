@@ -1,9 +1,11 @@
+from collections.abc import Iterable, Iterator
+from datetime import datetime
 from typing import Any
 
 from pydantic import BaseModel
 
 from src.apps.discord.domain.expections import FailedToJoin, FailedToLeave
-from src.apps.discord.domain.models import Guild, Member
+from src.apps.discord.domain.models import Guild, Member, RosterChanges
 from src.apps.discord.repositories.types import BaseSession, DiscordRepository
 
 
@@ -73,4 +75,61 @@ class FakeRepository(DiscordRepository[FakeSession]):
             raise FailedToLeave()
 
     def get_guild_members(self, guild_id: str) -> set[Member]:
-        return self.guilds[guild_id]
+        return set(self.guilds.get(guild_id, ()))
+
+    def get_guild_members_page(
+        self,
+        guild_id: str,
+        *,
+        after: str | None = None,
+        limit: int = 100,
+    ) -> list[Member]:
+        members = sorted(self.guilds.get(guild_id, ()), key=lambda member: member.id)
+        if after is not None:
+            members = [member for member in members if member.id > after]
+        return members[:limit]
+
+    def iter_guild_members(
+        self,
+        guild_id: str,
+        *,
+        page_size: int = 100,
+    ) -> Iterator[list[Member]]:
+        after: str | None = None
+        while page := self.get_guild_members_page(
+            guild_id, after=after, limit=page_size
+        ):
+            yield page
+            after = page[-1].id
+
+    def count_guild_members(self, guild_id: str) -> int:
+        return len(self.guilds.get(guild_id, ()))
+
+    def get_claims_since(self, *, since: datetime) -> list[tuple[str, datetime]]:
+        return [
+            (member.id, member.last_claim)
+            for member in set().union(*self.guilds.values())
+            if member.last_claim and member.last_claim > since
+        ]
+
+    def sync_guild_members(
+        self,
+        *,
+        guild_id: str,
+        member_ids: Iterable[str],
+        chunk_size: int = 1000,
+    ) -> RosterChanges:
+        self.get_guild(id=guild_id)
+        stale = set(self.guilds[guild_id])
+        changes = RosterChanges()
+        for member_id in member_ids:
+            member = self.get_member(id=member_id)
+            if member in stale:
+                stale.remove(member)
+            elif member not in self.guilds[guild_id]:
+                self.guilds[guild_id].add(member)
+                changes.joined += 1
+
+        self.guilds[guild_id] -= stale
+        changes.left = len(stale)
+        return changes
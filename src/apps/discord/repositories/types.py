@@ -1,14 +1,21 @@
 from __future__ import annotations
 
-from collections.abc import Collection
+from collections.abc import AsyncIterator, Collection, Iterable, Iterator
+from datetime import datetime
 from typing import TYPE_CHECKING, Protocol, TypeVar
 
-from src.apps.core.types import BaseRepository, BaseSession
+from src.apps.core.types import (
+    BaseAsyncRepository,
+    BaseAsyncSession,
+    BaseRepository,
+    BaseSession,
+)
 
 if TYPE_CHECKING:
-    from src.apps.discord.domain.models import Guild, Member
+    from src.apps.discord.domain.models import Guild, Member, RosterChanges
 
 _S_co = TypeVar("_S_co", bound=BaseSession, covariant=True)
+_AS_co = TypeVar("_AS_co", bound=BaseAsyncSession, covariant=True)
 
 
 class DiscordRepository(BaseRepository[_S_co], Protocol):
@@ -47,3 +54,102 @@ class DiscordRepository(BaseRepository[_S_co], Protocol):
 
     def get_guild_members(self, guild_id: str) -> Collection[Member]:
         ...
+
+    def get_guild_members_page(
+        self,
+        guild_id: str,
+        *,
+        after: str | None = ...,
+        limit: int = ...,
+    ) -> list[Member]:
+        ...
+
+    def iter_guild_members(
+        self,
+        guild_id: str,
+        *,
+        page_size: int = ...,
+    ) -> Iterator[list[Member]]:
+        ...
+
+    def count_guild_members(self, guild_id: str) -> int:
+        ...
+
+    def get_claims_since(self, *, since: datetime) -> list[tuple[str, datetime]]:
+        ...
+
+    def sync_guild_members(
+        self,
+        *,
+        guild_id: str,
+        member_ids: Iterable[str],
+        chunk_size: int = ...,
+    ) -> RosterChanges:
+        ...
+
+
+class AsyncDiscordRepository(BaseAsyncRepository[_AS_co], Protocol):
+    async def get_member(
+        self,
+        *,
+        id: str,
+    ) -> Member:
+        ...
+
+    async def get_guild(
+        self,
+        *,
+        id: str,
+    ) -> Guild:
+        ...
+
+    async def add_member_to_guild(
+        self,
+        *,
+        member_id: str,
+        guild_id: str,
+    ) -> None:
+        ...
+
+    async def remove_member_from_guild(
+        self,
+        *,
+        member_id: str,
+        guild_id: str,
+    ) -> None:
+        ...
+
+    async def get_guild_members(self, guild_id: str) -> Collection[Member]:
+        ...
+
+    async def get_guild_members_page(
+        self,
+        guild_id: str,
+        *,
+        after: str | None = ...,
+        limit: int = ...,
+    ) -> list[Member]:
+        ...
+
+    def iter_guild_members(
+        self,
+        guild_id: str,
+        *,
+        page_size: int = ...,
+    ) -> AsyncIterator[list[Member]]:
+        ...
+
+    async def count_guild_members(self, guild_id: str) -> int:
+        ...
+
+    async def get_claims_since(self, *, since: datetime) -> list[tuple[str, datetime]]:
+        ...
+
+    async def sync_guild_members(
+        self,
+        *,
+        guild_id: str,
+        member_ids: Iterable[str],
+        chunk_size: int = ...,
+    ) -> RosterChanges:
+        ...
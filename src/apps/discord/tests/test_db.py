@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session, SQLModel
+
+from src.apps.core.cache import LRUCache
+from src.apps.core.db import create_engine_from_settings
+from src.apps.core.sharding import GuildEvent
+from src.apps.discord.domain.buffer import MembershipBuffer
+from src.apps.discord.domain.services import (
+    join_guild,
+    leave_guild,
+    sync_guild_members,
+)
+from src.apps.discord.repositories.db.cache import IdentityKey
+from src.apps.discord.unit_of_work.db import DBUnitOfWork
+from src.config import DatabaseSettings
+from src.workers import start_workers
+
+
+@pytest.fixture
+def engine() -> Iterator[Engine]:
+    engine = create_engine_from_settings(DatabaseSettings(url="sqlite://"))
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine: Engine) -> sessionmaker[Session]:
+    return sessionmaker(bind=engine, class_=Session)
+
+
+def _count_statements(engine: Engine, fn: Callable[[], None]) -> int:
+    statements: list[str] = []
+
+    def count(*args: object) -> None:
+        statements.append(str(args[2]))
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return len(statements)
+
+
+def test_member_can_join_and_leave_guild(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="1", guild_id="test", uow=uow)
+        join_guild(member_id="1", guild_id="test", uow=uow)
+        join_guild(member_id="2", guild_id="test", uow=uow)
+
+        assert {m.id for m in uow.repo.get_guild_members("test")} == {"1", "2"}
+
+        leave_guild(member_id="1", guild_id="test", uow=uow)
+        leave_guild(member_id="3", guild_id="test", uow=uow)
+
+        assert {m.id for m in uow.repo.get_guild_members("test")} == {"2"}
+
+
+def test_relationships_load_only_when_asked(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="1", guild_id="test", uow=uow)
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        with pytest.raises(InvalidRequestError):
+            uow.repo.get_member(id="1").guilds
+
+        guild = uow.repo.get_guild(id="test", loading="selectin")
+        assert [member.id for member in guild.members] == ["1"]
+
+
+def test_join_cost_does_not_grow_with_guild(
+    engine: Engine, session_factory: sessionmaker[Session]
+) -> None:
+    def join(member_id: str) -> None:
+        with DBUnitOfWork(session_factory=session_factory) as uow:
+            join_guild(member_id=member_id, guild_id="big", uow=uow)
+
+    def leave(member_id: str) -> None:
+        with DBUnitOfWork(session_factory=session_factory) as uow:
+            leave_guild(member_id=member_id, guild_id="big", uow=uow)
+
+    join("first")
+    small_join = _count_statements(engine, lambda: join("second"))
+    small_leave = _count_statements(engine, lambda: leave("second"))
+
+    for i in range(500):
+        join(str(i))
+
+    assert _count_statements(engine, lambda: join("last")) == small_join
+    assert _count_statements(engine, lambda: leave("last")) == small_leave
+
+
+def test_can_sync_guild_members(session_factory: sessionmaker[Session]) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        for i in range(10):
+            join_guild(member_id=str(i), guild_id="test", uow=uow)
+        join_guild(member_id="0", guild_id="other", uow=uow)
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        changes = uow.repo.sync_guild_members(
+            guild_id="test",
+            member_ids=(str(i) for i in range(5, 25)),
+            chunk_size=3,
+        )
+
+    assert (changes.joined, changes.left) == (15, 5)
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        members = {m.id for m in uow.repo.get_guild_members("test")}
+        assert members == {str(i) for i in range(5, 25)}
+        assert {m.id for m in uow.repo.get_guild_members("other")} == {"0"}
+
+        changes = sync_guild_members(guild_id="test", member_ids=[], uow=uow)
+        assert (changes.joined, changes.left) == (0, 20)
+
+
+def test_sync_counts_repeated_members_once(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="9", guild_id="test", uow=uow)
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        changes = uow.repo.sync_guild_members(
+            guild_id="test", member_ids=["1", "9", "1", "9"], chunk_size=1
+        )
+
+    assert (changes.joined, changes.left) == (1, 0)
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert uow.repo.count_guild_members("test") == 2
+
+
+def test_guild_members_are_paged_in_id_order(
+    session_factory: sessionmaker[Session],
+) -> None:
+    member_ids = [f"{i:03}" for i in range(25)]
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        uow.repo.sync_guild_members(guild_id="test", member_ids=reversed(member_ids))
+        join_guild(member_id="elsewhere", guild_id="other", uow=uow)
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        pages = [
+            [member.id for member in page]
+            for page in uow.repo.iter_guild_members("test", page_size=10)
+        ]
+
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert sum(pages, []) == member_ids
+        assert uow.repo.count_guild_members("test") == 25
+        assert uow.repo.count_guild_members("missing") == 0
+
+
+def test_membership_buffer_writes_one_transaction_per_flush(
+    engine: Engine, session_factory: sessionmaker[Session]
+) -> None:
+    commits: list[None] = []
+    event.listen(engine, "commit", lambda conn: commits.append(None))
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="leaves", guild_id="test", uow=uow)
+    commits.clear()
+
+    with MembershipBuffer(
+        lambda: DBUnitOfWork(session_factory=session_factory), max_size=1000
+    ) as buffer:
+        for i in range(50):
+            buffer.join(member_id=str(i), guild_id="test")
+        buffer.leave(member_id="leaves", guild_id="test")
+        buffer.leave(member_id="never-joined", guild_id="test")
+
+        assert not commits
+
+    assert len(commits) == 1
+    assert buffer.stats.last_batch_size == 52
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert uow.repo.count_guild_members("test") == 50
+
+
+def test_membership_buffer_keeps_events_when_flush_fails(
+    session_factory: sessionmaker[Session],
+) -> None:
+    def broken() -> DBUnitOfWork:
+        raise RuntimeError("database unavailable")
+
+    buffer = MembershipBuffer(broken)
+    buffer.join(member_id="1", guild_id="test")
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+
+    assert len(buffer) == 1
+
+    buffer.uow_factory = lambda: DBUnitOfWork(session_factory=session_factory)
+    assert buffer.flush() == 1
+
+
+def test_identity_cache_skips_repeated_pk_lookups(
+    engine: Engine, session_factory: sessionmaker[Session]
+) -> None:
+    cache: LRUCache[IdentityKey, int] = LRUCache(maxsize=10, ttl=60)
+
+    def join() -> None:
+        with DBUnitOfWork(session_factory=session_factory, identity_cache=cache) as uow:
+            join_guild(member_id="1", guild_id="test", uow=uow)
+
+    assert _count_statements(engine, join) > 1
+    # Only the link insert is left once both pks are cached
+    assert _count_statements(engine, join) == 1
+    assert len(cache) == 2
+
+    def lookup() -> None:
+        with DBUnitOfWork(session_factory=session_factory, identity_cache=cache) as uow:
+            uow.repo.get_member(id="1")
+            uow.repo.get_guild(id="test")
+
+    assert _count_statements(engine, lookup) == 0
+
+    with DBUnitOfWork(session_factory=session_factory, identity_cache=cache) as uow:
+        uow.repo.get_member(id="1").last_claim = datetime.now()
+
+    # Mutable columns are always read from the database
+    with DBUnitOfWork(session_factory=session_factory, identity_cache=cache) as uow:
+        assert uow.repo.get_member(id="1").last_claim is not None
+        stats = uow.repo.stats()
+        assert stats is not None and stats.hits > stats.misses
+
+    def leave() -> None:
+        with DBUnitOfWork(session_factory=session_factory, identity_cache=cache) as uow:
+            leave_guild(member_id="1", guild_id="test", uow=uow)
+
+    # The delete and the counter updates, with no pk lookups
+    assert _count_statements(engine, leave) == 3
+
+
+def test_identity_cache_only_keeps_committed_pks(
+    session_factory: sessionmaker[Session],
+) -> None:
+    cache: LRUCache[IdentityKey, int] = LRUCache(maxsize=10, ttl=60)
+
+    with DBUnitOfWork(session_factory=session_factory, identity_cache=cache) as uow:
+        uow.repo.add_member_to_guild(member_id="1", guild_id="test")
+        uow.rollback()
+
+    assert len(cache) == 0
+
+
+def test_sharded_workers_run_services(tmp_path: Path) -> None:
+    db = DatabaseSettings(url=f"sqlite:///{tmp_path / 'keybot.db'}")
+    engine = create_engine_from_settings(db)
+    SQLModel.metadata.create_all(engine)
+
+    with start_workers(2, db) as router:
+        for i in range(20):
+            guild_id = f"guild-{i % 4}"
+            router.submit(
+                GuildEvent(
+                    guild_id,
+                    "discord.join_guild",
+                    {"member_id": str(i), "guild_id": guild_id},
+                )
+            )
+        # Nobody would receive the claimed key or hear about a duplicate one
+        with pytest.raises(ValueError):
+            router.submit(GuildEvent("guild-0", "games.claim_key", {}))
+        with pytest.raises(ValueError):
+            router.submit(GuildEvent("guild-0", "games.add_key", {}))
+        stats = router.close()
+
+    assert sum(worker.events for worker in stats) == 20
+    assert not any(worker.errors for worker in stats)
+    with DBUnitOfWork(session_factory=sessionmaker(bind=engine, class_=Session)) as uow:
+        assert uow.repo.count_guild_members("guild-0") == 5
+    engine.dispose()
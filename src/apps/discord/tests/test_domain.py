@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta
 from typing import Callable
 
 import pytest
 
+from src.apps.core.cooldown import CooldownTracker
+from src.apps.discord.domain.buffer import MembershipBuffer
+from src.apps.discord.domain.models import Member
 from src.apps.discord.domain.services import (
     join_guild,
     leave_guild,
+    load_cooldowns,
+    sync_guild_members,
 )
 from src.apps.discord.repositories.fake.repo import FakeSession
 from src.apps.discord.unit_of_work.fake import FakeUnitOfWork
@@ -41,3 +47,88 @@ def test_member_can_join_and_leave_guild(
 
         assert member_1 not in uow.repo.get_guild_members(guild_id=guild.id)
         assert member_2 in uow.repo.get_guild_members(guild_id=guild.id)
+
+
+def test_can_load_cooldowns(session_factory: SessionFactory) -> None:
+    now = datetime.utcnow()
+    cooldowns = CooldownTracker(timedelta(minutes=60))
+
+    with FakeUnitOfWork(session_factory=session_factory) as uow:
+        uow.repo.guilds = {
+            "test": {
+                Member(id="recent", last_claim=now - timedelta(minutes=10)),
+                Member(id="old", last_claim=now - timedelta(minutes=90)),
+                Member(id="never"),
+            }
+        }
+
+        load_cooldowns(cooldowns=cooldowns, uow=uow)
+
+    assert 49 * 60 < cooldowns.remaining("recent") <= 50 * 60
+    assert cooldowns.ready("old")
+    assert cooldowns.ready("never")
+    assert len(cooldowns) == 1
+
+
+def test_can_sync_guild_members(session_factory: SessionFactory) -> None:
+    with FakeUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="stays", guild_id="test", uow=uow)
+        join_guild(member_id="leaves", guild_id="test", uow=uow)
+
+        changes = sync_guild_members(
+            guild_id="test", member_ids=iter(["stays", "joins"]), uow=uow
+        )
+
+        assert (changes.joined, changes.left) == (1, 1)
+        assert {m.id for m in uow.repo.get_guild_members(guild_id="test")} == {
+            "stays",
+            "joins",
+        }
+
+
+def test_guild_members_are_paged(session_factory: SessionFactory) -> None:
+    with FakeUnitOfWork(session_factory=session_factory) as uow:
+        for i in range(5):
+            join_guild(member_id=str(i), guild_id="test", uow=uow)
+
+        members = uow.repo.get_guild_members(guild_id="test")
+        members.clear()
+
+        pages = list(uow.repo.iter_guild_members("test", page_size=2))
+        assert [[m.id for m in page] for page in pages] == [
+            ["0", "1"],
+            ["2", "3"],
+            ["4"],
+        ]
+        assert uow.repo.count_guild_members("test") == 5
+
+
+def test_membership_buffer_coalesces_events(session_factory: SessionFactory) -> None:
+    now = [0.0]
+    buffer = MembershipBuffer(
+        lambda: FakeUnitOfWork(session_factory=session_factory),
+        max_size=3,
+        max_age=5,
+        clock=lambda: now[0],
+    )
+
+    buffer.join(member_id="1", guild_id="test")
+    buffer.join(member_id="1", guild_id="test")
+    buffer.join(member_id="2", guild_id="test")
+    buffer.leave(member_id="2", guild_id="test")
+
+    assert len(buffer) == 1
+    assert (buffer.stats.events, buffer.stats.coalesced) == (4, 2)
+    assert buffer.stats.flushes == 0
+
+    # Oldest pending event reaches max_age
+    now[0] = 5
+    assert buffer.flush_if_due() == 1
+    assert len(buffer) == 0
+
+    for i in range(3):
+        buffer.join(member_id=str(i), guild_id="test")
+
+    # Reaching max_size flushes straight away
+    assert len(buffer) == 0
+    assert (buffer.stats.flushes, buffer.stats.max_batch_size) == (2, 3)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from types import TracebackType
+
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.apps.core.cache import LRUCache
+from src.apps.core.db import get_async_session_factory
+from src.apps.core.metrics import UnitOfWorkMetrics, bind_metrics
+from src.apps.discord.repositories.db.async_repo import AsyncSQLModelRepository
+from src.apps.discord.repositories.db.cache import IdentityKey
+from src.apps.discord.unit_of_work.types import AsyncDiscordUnitOfWork
+
+
+class AsyncDBUnitOfWork(AsyncDiscordUnitOfWork[AsyncSession]):
+    repo: AsyncSQLModelRepository
+
+    def __init__(
+        self,
+        session_factory: sessionmaker[AsyncSession] | None = None,
+        identity_cache: LRUCache[IdentityKey, int] | None = None,
+    ):
+        super().__init__(session_factory=session_factory)
+        self.session_factory = session_factory
+        self.identity_cache = identity_cache
+
+    async def __aenter__(self):
+        session_factory = self.session_factory or get_async_session_factory()
+        self.session = session_factory()
+        self.metrics = UnitOfWorkMetrics("discord.unit_of_work")
+        bind_metrics(self.session.sync_session, self.metrics)
+        self.repo = AsyncSQLModelRepository(
+            self.session, identity_cache=self.identity_cache
+        )
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        try:
+            if exc_type:
+                await self.session.rollback()
+            else:
+                await self.session.commit()
+        finally:
+            await self.session.close()
+            self.metrics.finish()
+
+    async def commit(self) -> None:
+        await self.session.commit()
+
+    async def rollback(self) -> None:
+        await self.session.rollback()
@@ -3,28 +3,35 @@ from __future__ import annotations
 from types import TracebackType
 
 from sqlalchemy.orm import sessionmaker
-from sqlmodel import Session, create_engine
+from sqlmodel import Session
 
+from src.apps.core.cache import LRUCache
+from src.apps.core.db import get_session_factory
+from src.apps.core.metrics import UnitOfWorkMetrics, bind_metrics
+from src.apps.discord.repositories.db.cache import IdentityKey
 from src.apps.discord.repositories.db.repo import SQLModelRepository
 from src.apps.discord.unit_of_work.types import DiscordUnitOfWork
-from src.config import settings
-
-ENGINE = create_engine(settings.db.url, echo=settings.db.echo)
-DEFAULT_SESSION_FACTORY = sessionmaker(bind=ENGINE, class_=Session)
 
 
 class DBUnitOfWork(DiscordUnitOfWork[Session]):
     repo: SQLModelRepository
 
     def __init__(
-        self, session_factory: sessionmaker[Session] = DEFAULT_SESSION_FACTORY
+        self,
+        session_factory: sessionmaker[Session] | None = None,
+        identity_cache: LRUCache[IdentityKey, int] | None = None,
     ):
         super().__init__(session_factory=session_factory)
         self.session_factory = session_factory
+        self.identity_cache = identity_cache
 
     def __enter__(self):
-        self.session = self.session_factory()
-        self.repo = SQLModelRepository(self.session)
+        # The shared engine is only built once a unit of work is first used
+        session_factory = self.session_factory or get_session_factory()
+        self.session = session_factory()
+        self.metrics = UnitOfWorkMetrics("discord.unit_of_work")
+        bind_metrics(self.session, self.metrics)
+        self.repo = SQLModelRepository(self.session, identity_cache=self.identity_cache)
         return self
 
     def __exit__(
@@ -33,10 +40,13 @@ class DBUnitOfWork(DiscordUnitOfWork[Session]):
         exc_val: BaseException | None,
         exc_tb: TracebackType | None,
     ) -> None:
-        if exc_type:
-            self.session.rollback()
-        else:
-            self.session.commit()
+        try:
+            if exc_type:
+                self.session.rollback()
+            else:
+                self.session.commit()
+        finally:
+            self.metrics.finish()
 
     def commit(self) -> None:
         self.session.commit()
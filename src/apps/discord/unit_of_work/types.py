@@ -1,12 +1,21 @@
 from typing import Callable, Protocol, TypeVar
 
-from src.apps.core.types import BaseUnitOfWork
-from src.apps.discord.repositories.types import BaseSession, DiscordRepository
+from src.apps.core.types import BaseAsyncSession, BaseAsyncUnitOfWork, BaseUnitOfWork
+from src.apps.discord.repositories.types import (
+    AsyncDiscordRepository,
+    BaseSession,
+    DiscordRepository,
+)
 
 SessionFactory = Callable[..., Callable[..., BaseSession]]
 
 _S = TypeVar("_S", bound=BaseSession)
+_AS = TypeVar("_AS", bound=BaseAsyncSession)
 
 
 class DiscordUnitOfWork(BaseUnitOfWork[_S], Protocol):
     repo: DiscordRepository[_S]
+
+
+class AsyncDiscordUnitOfWork(BaseAsyncUnitOfWork[_AS], Protocol):
+    repo: AsyncDiscordRepository[_AS]
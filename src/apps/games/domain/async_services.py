@@ -0,0 +1,124 @@
+"""Async counterparts of ``services`` for use inside the bot's event loop."""
+from collections.abc import Iterable
+from datetime import timedelta
+
+from src.config import settings
+
+from ...core.cooldown import CooldownTracker
+from ...core.metrics import traced
+from ...core.types import BaseAsyncSession
+from ..unit_of_work.types import AsyncGameUnitOfWork
+from .expections import ClaimTooSoon
+from .models import AvailableTitle, Game, GameRow, KeyReport, Platform, Title
+from .services import classify_keys, mark_duplicates
+
+
+@traced
+async def add_key(
+    *,
+    owner_id: str,
+    title_name: str,
+    platform: Platform,
+    key: str,
+    uow: AsyncGameUnitOfWork[BaseAsyncSession],
+) -> Game:
+    return await uow.repo.add_key(
+        owner_id=owner_id, platform=platform, title_name=title_name, key=key
+    )
+
+
+@traced
+async def add_keys(
+    *,
+    owner_id: str,
+    keys: Iterable[tuple[str | None, str]],
+    uow: AsyncGameUnitOfWork[BaseAsyncSession],
+) -> list[KeyReport]:
+    reports, accepted = classify_keys(keys)
+    mark_duplicates(reports, await uow.repo.add_keys(owner_id=owner_id, keys=accepted))
+    return reports
+
+
+@traced
+async def remove_key(
+    *,
+    owner_id: str,
+    key: str,
+    uow: AsyncGameUnitOfWork[BaseAsyncSession],
+) -> tuple[Title, str]:
+    popped_key = await uow.repo.remove_key(owner_id=owner_id, key=key)
+    await uow.commit()
+    return popped_key
+
+
+@traced
+async def list_available_titles(
+    *,
+    member_id: str,
+    after: str | None = None,
+    limit: int = 25,
+    uow: AsyncGameUnitOfWork[BaseAsyncSession],
+) -> list[AvailableTitle]:
+    return await uow.repo.get_available_titles(
+        member_id=member_id, after=after, limit=limit
+    )
+
+
+@traced
+async def list_games(
+    *,
+    member_id: str,
+    uow: AsyncGameUnitOfWork[BaseAsyncSession],
+) -> list[GameRow]:
+    return await uow.repo.list_games(member_id=member_id)
+
+
+@traced
+async def count_available_keys(
+    *,
+    guild_id: str,
+    title_name: str | None = None,
+    uow: AsyncGameUnitOfWork[BaseAsyncSession],
+) -> dict[Platform, int]:
+    return await uow.repo.get_guild_availability(
+        guild_id=guild_id, title_name=title_name
+    )
+
+
+@traced
+async def search_titles(
+    *,
+    query: str,
+    limit: int = 25,
+    uow: AsyncGameUnitOfWork[BaseAsyncSession],
+) -> list[str]:
+    return await uow.repo.search_titles(query=query, limit=limit)
+
+
+@traced
+async def claim_key(
+    *,
+    member_id: str,
+    title_name: str,
+    platform: Platform | None = None,
+    wait_period: timedelta | None = None,
+    cooldowns: CooldownTracker | None = None,
+    uow: AsyncGameUnitOfWork[BaseAsyncSession],
+) -> Game:
+    if cooldowns is not None and not cooldowns.ready(member_id):
+        raise ClaimTooSoon()
+
+    if wait_period is None:
+        wait_period = timedelta(minutes=settings.discord.wait_period)
+
+    game = await uow.repo.claim_key(
+        member_id=member_id,
+        title_name=title_name,
+        platform=platform,
+        wait_period=wait_period,
+    )
+    await uow.commit()
+
+    if cooldowns is not None:
+        cooldowns.start(member_id)
+    return game
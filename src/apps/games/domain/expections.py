@@ -8,3 +8,11 @@ class KeyDoesNotExist(Exception):
 
 class TitleDoesNotExist(Exception):
     pass
+
+
+class NoKeyAvailable(Exception):
+    pass
+
+
+class ClaimTooSoon(Exception):
+    pass
@@ -1,43 +1,51 @@
-from typing import Any, Literal
+from dataclasses import dataclass
+from typing import Any, Literal, NamedTuple
 
 from pydantic import Field
 from sqlmodel import SQLModel
 
+from src.apps.games.utils.titlesearch import title_key
+
 Platform = Literal["steam", "epic", "url", "gog", "playstation", "origin", "uplay"]
+KeyStatus = Literal["added", "duplicate", "rejected"]
 
 
-class Title(SQLModel):
+class TitleBase(SQLModel):
     name: str
-    games: list["Game"] = Field(default_factory=list)
 
+    # Spellings of one game that only differ in case, accents or punctuation
+    # are the same title, and sort together
     def __lt__(self, other: Any) -> bool:
-        if isinstance(other, Title):
-            return self.name < other.name
+        if isinstance(other, TitleBase):
+            return title_key(self.name) < title_key(other.name)
         return NotImplemented
 
     def __hash__(self) -> int:
-        return hash(self.name)
+        return hash(title_key(self.name))
 
     def __eq__(self, other: Any) -> bool:
-        if isinstance(other, Title):
-            return self.name == other.name
+        if isinstance(other, TitleBase):
+            return title_key(self.name) == title_key(other.name)
         return NotImplemented
 
 
-class Game(SQLModel):
+class Title(TitleBase):
+    games: list["Game"] = Field(default_factory=list)
+
+
+class GameBase(SQLModel):
     platform: Platform
-    title: Title
     key: str
     owner_id: str
 
     def __hash__(self) -> int:
-        return hash(self.key) + hash(self.owner_id)
+        return hash((self.key, self.owner_id))
 
     def __eq__(self, other: Any) -> bool:
         # Keys are only identical if they have the same owner
         # This is to prevent testing for exiting keys by spam adding keys
         match other:
-            case Game(key=other_key, owner_id=other_owner_id):
+            case GameBase(key=other_key, owner_id=other_owner_id):
                 return self.key == other_key and self.owner_id == other_owner_id
             case str() as other_key, str() as other_owner_id:
                 return self.key == other_key and self.owner_id == other_owner_id
@@ -45,4 +53,47 @@ class Game(SQLModel):
                 return NotImplemented
 
 
+class Game(GameBase):
+    title: Title
+
+
+# Read models are filled straight from column projections, so they skip both
+# ORM hydration and pydantic validation
+
+
+class GameRow(NamedTuple):
+    title: str
+    platform: Platform
+    owner_id: str
+
+
+@dataclass(slots=True)
+class AvailableTitle:
+    name: str
+    copies: dict[Platform, int]
+
+
+class TitleMerge(SQLModel):
+    titles_merged: int = 0
+    games_moved: int = 0
+
+
+class CounterCheck(SQLModel):
+    counters: int = 0
+    drifted: int = 0
+
+
+class LibraryImport(SQLModel):
+    chunks: int = 0
+    records: int = 0
+    counters: int = 0
+
+
+class KeyReport(SQLModel):
+    title_name: str | None
+    key: str
+    platform: Platform | None = None
+    status: KeyStatus
+
+
 Title.update_forward_refs()
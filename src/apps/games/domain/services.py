@@ -1,9 +1,18 @@
+from collections.abc import Iterable
+from datetime import timedelta
+
+from src.config import settings
+
+from ...core.cooldown import CooldownTracker
+from ...core.metrics import traced
 from ...core.types import BaseSession
 from ..unit_of_work.types import GameUnitOfWork
-from .expections import KeyAlreadyExists
-from .models import Game, Platform, Title
+from ..utils.keyparse import parse_keys
+from .expections import ClaimTooSoon
+from .models import AvailableTitle, Game, GameRow, KeyReport, Platform, Title
 
 
+@traced
 def add_key(
     *,
     owner_id: str,
@@ -12,15 +21,65 @@ def add_key(
     key: str,
     uow: GameUnitOfWork[BaseSession],
 ) -> Game:
-    if not uow.repo.check_key_exists(key=key, owner_id=owner_id):
-        new_game = uow.repo.add_key(
-            owner_id=owner_id, platform=platform, title_name=title_name, key=key
+    # The repository relies on the (owner_id, key) uniqueness constraint and
+    # raises KeyAlreadyExists itself, so there is no separate existence check
+    return uow.repo.add_key(
+        owner_id=owner_id, platform=platform, title_name=title_name, key=key
+    )
+
+
+def classify_keys(
+    keys: Iterable[tuple[str | None, str]],
+) -> tuple[list[KeyReport], list[tuple[str, Platform, str]]]:
+    """Report bad keys as rejected and return the rest ready for ``add_keys``."""
+    items = list(keys)
+    platforms = parse_keys(key for _, key in items)
+
+    reports: list[KeyReport] = []
+    accepted: list[tuple[str, Platform, str]] = []
+    for (title_name, key), platform in zip(items, platforms):
+        if isinstance(platform, str) and title_name:
+            accepted.append((title_name, platform, key))
+            status = "added"
+        else:
+            platform = None
+            status = "rejected"
+        reports.append(
+            KeyReport(title_name=title_name, key=key, platform=platform, status=status)
         )
-        return new_game
-    else:
-        raise KeyAlreadyExists()
+
+    return reports, accepted
 
 
+def mark_duplicates(reports: list[KeyReport], added_keys: Iterable[str]) -> None:
+    added = set(added_keys)
+    for report in reports:
+        if report.status == "added":
+            if report.key in added:
+                added.remove(report.key)
+            else:
+                report.status = "duplicate"
+
+
+@traced
+def add_keys(
+    *,
+    owner_id: str,
+    keys: Iterable[tuple[str | None, str]],
+    uow: GameUnitOfWork[BaseSession],
+) -> list[KeyReport]:
+    """Import many ``(title_name, key)`` pairs for one owner in a single batch.
+
+    Keys are classified with ``parse_keys``; keys in an unknown format or
+    without a title are rejected, keys the owner already has (or that repeat
+    earlier in the batch) are reported as duplicates.
+    """
+    reports, accepted = classify_keys(keys)
+    mark_duplicates(reports, uow.repo.add_keys(owner_id=owner_id, keys=accepted))
+    return reports
+
+
+@traced
 def remove_key(
     *,
     owner_id: str,
@@ -30,3 +89,86 @@ def remove_key(
     popped_key = uow.repo.remove_key(owner_id=owner_id, key=key)
     uow.commit()
     return popped_key
+
+
+@traced
+def list_available_titles(
+    *,
+    member_id: str,
+    after: str | None = None,
+    limit: int = 25,
+    uow: GameUnitOfWork[BaseSession],
+) -> list[AvailableTitle]:
+    """Return a page of titles offered by members sharing a guild with ``member_id``.
+
+    Pages are ordered by title name; pass the last name of a page as ``after``
+    to fetch the next one.
+    """
+    return uow.repo.get_available_titles(member_id=member_id, after=after, limit=limit)
+
+
+@traced
+def list_games(
+    *,
+    member_id: str,
+    uow: GameUnitOfWork[BaseSession],
+) -> list[GameRow]:
+    """Every game ``member_id`` could claim, by title then platform."""
+    return uow.repo.list_games(member_id=member_id)
+
+
+@traced
+def count_available_keys(
+    *,
+    guild_id: str,
+    title_name: str | None = None,
+    uow: GameUnitOfWork[BaseSession],
+) -> dict[Platform, int]:
+    """Keys the members of ``guild_id`` offer by platform, read from counters."""
+    return uow.repo.get_guild_availability(guild_id=guild_id, title_name=title_name)
+
+
+@traced
+def search_titles(
+    *,
+    query: str,
+    limit: int = 25,
+    uow: GameUnitOfWork[BaseSession],
+) -> list[str]:
+    """Suggest up to ``limit`` title names for a partly typed ``query``."""
+    return uow.repo.search_titles(query=query, limit=limit)
+
+
+@traced
+def claim_key(
+    *,
+    member_id: str,
+    title_name: str,
+    platform: Platform | None = None,
+    wait_period: timedelta | None = None,
+    cooldowns: CooldownTracker | None = None,
+    uow: GameUnitOfWork[BaseSession],
+) -> Game:
+    """Hand one available copy of a title to ``member_id`` and start their wait.
+
+    Raises ClaimTooSoon inside the wait period and NoKeyAvailable when nobody
+    sharing a guild with the member offers the title. With ``cooldowns`` a
+    member still waiting is turned away without querying the database.
+    """
+    if cooldowns is not None and not cooldowns.ready(member_id):
+        raise ClaimTooSoon()
+
+    if wait_period is None:
+        wait_period = timedelta(minutes=settings.discord.wait_period)
+
+    game = uow.repo.claim_key(
+        member_id=member_id,
+        title_name=title_name,
+        platform=platform,
+        wait_period=wait_period,
+    )
+    uow.commit()
+
+    if cooldowns is not None:
+        cooldowns.start(member_id)
+    return game
@@ -0,0 +1,123 @@
+from collections.abc import Collection
+from datetime import timedelta
+from typing import Any, Callable, TypeVar
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ...domain.models import AvailableTitle, Game, GameRow, Platform
+from ..types import AsyncGameRepository
+from .models import GameInDB, TitleInDB
+from .repo import SQLModelRepository
+
+_T = TypeVar("_T")
+
+
+class AsyncSQLModelRepository(AsyncGameRepository[AsyncSession]):
+    """Runs SQLModelRepository inside the async session's greenlet.
+
+    The queries are shared with the sync backend while the driver I/O is
+    awaited on the event loop, without handing work to a thread pool.
+    """
+
+    def __init__(self, session: AsyncSession, *args: Any, **kwargs: Any):
+        self.session = session
+        self.repo = SQLModelRepository(session.sync_session, *args, **kwargs)
+
+    async def _run(self, fn: Callable[[], _T]) -> _T:
+        return await self.session.run_sync(lambda _: fn())
+
+    async def check_key_exists(self, *, key: str, owner_id: str) -> bool:
+        return await self._run(
+            lambda: self.repo.check_key_exists(key=key, owner_id=owner_id)
+        )
+
+    async def get_title(
+        self,
+        *,
+        name: str,
+        create: bool = True,
+    ) -> TitleInDB:
+        return await self._run(lambda: self.repo.get_title(name=name, create=create))
+
+    async def search_titles(self, *, query: str, limit: int = 25) -> list[str]:
+        return await self._run(
+            lambda: self.repo.search_titles(query=query, limit=limit)
+        )
+
+    async def add_key(
+        self,
+        *,
+        owner_id: str,
+        platform: Platform,
+        title_name: str,
+        key: str,
+    ) -> GameInDB:
+        # The title has to come back with the game, as nothing can lazy load
+        # it outside the greenlet
+        return await self._run(
+            lambda: self.repo.add_key(
+                owner_id=owner_id,
+                platform=platform,
+                title_name=title_name,
+                key=key,
+                loading="joined",
+            )
+        )
+
+    async def add_keys(
+        self,
+        *,
+        owner_id: str,
+        keys: Collection[tuple[str, Platform, str]],
+    ) -> list[str]:
+        return await self._run(lambda: self.repo.add_keys(owner_id=owner_id, keys=keys))
+
+    async def remove_key(
+        self,
+        *,
+        owner_id: str,
+        key: str,
+    ) -> tuple[TitleInDB, str]:
+        return await self._run(lambda: self.repo.remove_key(owner_id=owner_id, key=key))
+
+    async def get_available_titles(
+        self,
+        *,
+        member_id: str,
+        after: str | None = None,
+        limit: int = 25,
+    ) -> list[AvailableTitle]:
+        return await self._run(
+            lambda: self.repo.get_available_titles(
+                member_id=member_id, after=after, limit=limit
+            )
+        )
+
+    async def list_games(self, *, member_id: str) -> list[GameRow]:
+        return await self._run(lambda: self.repo.list_games(member_id=member_id))
+
+    async def get_guild_availability(
+        self, *, guild_id: str, title_name: str | None = None
+    ) -> dict[Platform, int]:
+        return await self._run(
+            lambda: self.repo.get_guild_availability(
+                guild_id=guild_id, title_name=title_name
+            )
+        )
+
+    async def claim_key(
+        self,
+        *,
+        member_id: str,
+        title_name: str,
+        platform: Platform | None = None,
+        wait_period: timedelta,
+    ) -> Game:
+        return await self._run(
+            lambda: self.repo.claim_key(
+                member_id=member_id,
+                title_name=title_name,
+                platform=platform,
+                wait_period=wait_period,
+            )
+        )
@@ -0,0 +1,60 @@
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from src.apps.core.cache import LRUCache
+from src.config import settings
+
+from .models import TitleInDB
+
+# Normalized title name to primary key, shared by every unit of work in the process
+TITLE_CACHE: LRUCache[str, int] = LRUCache(maxsize=settings.db.title_cache_size)
+
+_CACHE = "title_cache"
+_PENDING = "pending_title_pks"
+
+
+def bind_title_cache(session: Session, cache: LRUCache[str, int]) -> None:
+    session.info[_CACHE] = cache
+
+
+def stage_title_pks(session: Session, pks: dict[str, int]) -> None:
+    """Hold title pks seen in a transaction back from the cache until it commits.
+
+    A pk created inside a transaction that is later rolled back must never
+    reach the shared cache.
+    """
+    session.info.setdefault(_PENDING, {}).update(pks)
+
+
+def get_title_pk(session: Session, name: str) -> int | None:
+    if (pk := session.info.get(_PENDING, {}).get(name)) is not None:
+        return pk
+    if (cache := session.info.get(_CACHE)) is not None:
+        return cache.get(name)
+    return None
+
+
+def invalidate_title_pk(session: Session, name: str) -> None:
+    session.info.get(_PENDING, {}).pop(name, None)
+    if (cache := session.info.get(_CACHE)) is not None:
+        cache.invalidate(name)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_title_pks(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if pending and (cache := session.info.get(_CACHE)) is not None:
+        cache.update(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_title_pks(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+@event.listens_for(TitleInDB, "after_delete")
+def _invalidate_deleted_title(mapper: Any, connection: Any, target: TitleInDB) -> None:
+    if session := object_session(target):
+        invalidate_title_pk(session, target.normalized_name)
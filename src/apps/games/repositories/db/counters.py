@@ -0,0 +1,182 @@
+"""Per-guild counts of available keys, kept up to date as keys and members move.
+
+Every write that changes which keys a guild can see adjusts
+``guild_availability`` in its own transaction, so reading a guild's numbers is
+a primary key lookup. ``rebuild_counters`` recounts everything from the games
+and member links and reports the counters that had drifted. Run it after bulk
+changes made outside the repositories, or to check a live database, with
+``python -m src.apps.games.repositories.db.counters [--check]``.
+"""
+import argparse
+import logging
+from collections import Counter
+from collections.abc import Iterable
+from typing import Any
+
+from sqlalchemy import delete, func, literal
+from sqlmodel import Session, select
+
+from src.apps.core.db import get_engine, get_session_factory, insert_or_add
+from src.apps.discord.repositories.db.hooks import on_membership_change
+from src.apps.discord.repositories.db.models import MemberInDB, MemberToGuildLink
+from src.apps.games.domain.models import CounterCheck, Platform
+
+from .models import GameInDB, GuildAvailabilityInDB
+
+logger = logging.getLogger(__name__)
+
+ALL_TITLES = 0
+
+availability = GuildAvailabilityInDB.__table__
+COLUMNS = ["guild_pk", "platform", "title_pk", "copies"]
+
+# Counted once per title, and once more for the platform totals
+_GROUPINGS: list[tuple[Any, list[Any]]] = [
+    (GameInDB.title_pk, [GameInDB.title_pk]),
+    (literal(ALL_TITLES), []),
+]
+
+
+def _add(session: Session, rows: Iterable[dict[str, Any]]) -> None:
+    if rows := list(rows):
+        session.execute(
+            insert_or_add(
+                session, GuildAvailabilityInDB, "copies", *COLUMNS[:-1]
+            ).values(rows)
+        )
+
+
+def count_keys(
+    session: Session,
+    *,
+    owner_id: str,
+    keys: Counter[tuple[Platform, int]],
+    sign: int = 1,
+) -> None:
+    """Add (or with ``sign`` -1 take away) an owner's keys in each of their guilds.
+
+    ``keys`` counts the keys by ``(platform, title_pk)``.
+    """
+    if not keys:
+        return
+
+    counts = Counter(keys)
+    for (platform, _), copies in keys.items():
+        counts[platform, ALL_TITLES] += copies
+
+    guild_pks = session.exec(
+        select(MemberToGuildLink.guild_pk)
+        .join(MemberInDB, MemberInDB.pk == MemberToGuildLink.member_pk)
+        .where(MemberInDB.id == owner_id)
+    ).all()
+    _add(
+        session,
+        (
+            dict(zip(COLUMNS, (guild_pk, platform, title_pk, sign * copies)))
+            for guild_pk in guild_pks
+            for (platform, title_pk), copies in counts.items()
+        ),
+    )
+
+
+@on_membership_change
+def count_members(
+    session: Session, *, guild_pk: Any, members: Any, sign: int = 1
+) -> None:
+    """Add (or take away) every key of the ``members`` joining (or leaving) a guild.
+
+    Registered as a discord membership hook. ``guild_pk`` may be a scalar
+    subquery and ``members`` is a condition on ``MemberInDB``; the keys counted
+    come from the games table, not the links.
+    """
+    if isinstance(guild_pk, int):
+        guild_pk = literal(guild_pk)
+    for title_pk, by_title in _GROUPINGS:
+        keys = (
+            select(guild_pk, GameInDB.platform, title_pk, sign * func.count())
+            .join(MemberInDB, MemberInDB.id == GameInDB.owner_id)
+            .where(members)
+            .group_by(GameInDB.platform, *by_title)
+        )
+        session.execute(
+            insert_or_add(
+                session, GuildAvailabilityInDB, "copies", *COLUMNS[:-1]
+            ).from_select(COLUMNS, keys)
+        )
+
+
+def _recount(session: Session) -> dict[tuple[int, str, int], int]:
+    counts: dict[tuple[int, str, int], int] = {}
+    for title_pk, by_title in _GROUPINGS:
+        statement = (
+            select(
+                MemberToGuildLink.guild_pk, GameInDB.platform, title_pk, func.count()
+            )
+            .join(MemberInDB, MemberInDB.id == GameInDB.owner_id)
+            .join(MemberToGuildLink, MemberToGuildLink.member_pk == MemberInDB.pk)
+            .group_by(MemberToGuildLink.guild_pk, GameInDB.platform, *by_title)
+        )
+        counts.update(
+            ((guild_pk, platform, title), copies)
+            for guild_pk, platform, title, copies in session.execute(statement)
+        )
+    return counts
+
+
+def rebuild_counters(
+    session: Session, *, repair: bool = True, report: bool = False
+) -> CounterCheck:
+    """Recount every counter from scratch and report how many had drifted.
+
+    With ``repair`` the stored counters are replaced by the recount, and with
+    ``report`` each drifted counter is logged. Bulk loads rebuild quietly, since
+    their counters are expected to be behind. Nothing is committed.
+    """
+    expected = _recount(session)
+    stored = {
+        (guild_pk, platform, title_pk): copies
+        for guild_pk, platform, title_pk, copies in session.execute(
+            select(*(availability.c[column] for column in COLUMNS)).where(
+                availability.c.copies != 0
+            )
+        )
+    }
+
+    check = CounterCheck(counters=len(expected))
+    for counter in expected.keys() | stored.keys():
+        if (found := stored.get(counter, 0)) != (want := expected.get(counter, 0)):
+            check.drifted += 1
+            if report:
+                logger.warning("Counter %s is %d, should be %d", counter, found, want)
+
+    if repair:
+        session.execute(delete(availability))
+        if expected:
+            session.execute(
+                availability.insert(),
+                [
+                    dict(zip(COLUMNS, (*counter, copies)))
+                    for counter, copies in expected.items()
+                ],
+            )
+    return check
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--check", action="store_true", help="Only report drift, change nothing"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    availability.create(get_engine(), checkfirst=True)
+    with get_session_factory()() as session:
+        check = rebuild_counters(session, repair=not args.check, report=True)
+        session.commit()
+
+    print(f"{check.drifted} of {check.counters} counters had drifted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Merge titles that only differ in spelling into one row each.
+
+Databases created before titles had a ``normalized_name`` get the column, the
+duplicates sharing a normalized name are folded into the oldest of them and
+the unique index is built last. Run once with
+``python -m src.apps.games.repositories.db.dedupe``.
+
+Cached title pks are trusted without a check, and the merge deletes titles
+behind the ORM's back. Run it with the bot stopped, or restart every process
+afterwards, so none of them keeps a pk of a title that was merged away.
+"""
+from sqlalchemy import bindparam, delete, inspect, text, update
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, col, select
+
+from src.apps.core.db import get_engine, get_session_factory
+from src.apps.core.iterables import chunked
+from src.apps.games.domain.models import TitleMerge
+from src.apps.games.utils.titlesearch import title_key
+
+from .cache import TITLE_CACHE
+from .counters import rebuild_counters
+from .models import GameInDB, TitleInDB
+from .search import TITLE_INDEX
+
+titles = TitleInDB.__table__
+games = GameInDB.__table__
+
+
+def add_normalized_name_column(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("titles")}
+    if "normalized_name" not in columns:
+        connection.execute(
+            text("ALTER TABLE titles ADD COLUMN normalized_name VARCHAR")
+        )
+
+
+def create_normalized_name_index(connection: Connection) -> None:
+    for index in titles.indexes:
+        if index.name == "ix_titles_normalized_name":
+            index.create(connection, checkfirst=True)
+
+
+def merge_duplicate_titles(session: Session, *, chunk_size: int = 1000) -> TitleMerge:
+    """Fold every title into the oldest title with the same normalized name.
+
+    Games are moved over with one executemany per chunk, then the duplicates
+    are deleted and the survivors' normalized names stored. Nothing is
+    committed, so the whole merge lands or none of it does.
+    """
+    statement = (
+        select(TitleInDB.pk, TitleInDB.name, col(TitleInDB.normalized_name))
+        .order_by(TitleInDB.pk)
+        .execution_options(yield_per=chunk_size)
+    )
+    survivors: dict[str, int] = {}
+    moves: list[dict[str, int]] = []
+    renames: list[dict[str, object]] = []
+    for title_pk, name, normalized_name in session.execute(statement):
+        key = title_key(name)
+        if (survivor := survivors.setdefault(key, title_pk)) != title_pk:
+            moves.append({"duplicate": title_pk, "survivor": survivor})
+        elif normalized_name != key:
+            renames.append({"title": title_pk, "normalized": key})
+
+    merge = TitleMerge(titles_merged=len(moves))
+    for chunk in chunked(moves, chunk_size):
+        moved = session.execute(
+            update(games)
+            .where(games.c.title_pk == bindparam("duplicate"))
+            .values(title_pk=bindparam("survivor")),
+            chunk,
+        )
+        merge.games_moved += moved.rowcount
+        session.execute(
+            delete(titles).where(titles.c.pk.in_([move["duplicate"] for move in chunk]))
+        )
+
+    # Park changed names on a placeholder first, so a survivor taking over a
+    # name another one still holds never trips the unique index
+    for chunk in chunked(renames, chunk_size):
+        session.execute(
+            update(titles)
+            .where(titles.c.pk == bindparam("title"))
+            .values(normalized_name=bindparam("placeholder")),
+            [{**rename, "placeholder": f"\0{rename['title']}"} for rename in chunk],
+        )
+    for chunk in chunked(renames, chunk_size):
+        session.execute(
+            update(titles)
+            .where(titles.c.pk == bindparam("title"))
+            .values(normalized_name=bindparam("normalized")),
+            chunk,
+        )
+
+    return merge
+
+
+def main() -> None:
+    with get_engine().begin() as connection:
+        add_normalized_name_column(connection)
+
+    with get_session_factory()() as session:
+        merge = merge_duplicate_titles(session)
+        create_normalized_name_index(session.connection())
+        # Per title counters still count the games under the merged titles
+        check = rebuild_counters(session)
+        session.commit()
+
+    # Both were filled against the rows that were just merged away
+    TITLE_CACHE.clear()
+    TITLE_INDEX.clear()
+    print(
+        f"Merged {merge.titles_merged} titles, moved {merge.games_moved} games, "
+        f"{check.drifted} of {check.counters} counters recounted"
+    )
+
+
+if __name__ == "__main__":
+    main()
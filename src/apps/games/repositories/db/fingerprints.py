@@ -0,0 +1,90 @@
+"""Fill in key fingerprints for games stored before keys had them.
+
+The ``fingerprint`` column is added, every game's fingerprint computed chunk by
+chunk, and the ``(owner_id, fingerprint)`` index replaces the one on the raw
+key. Run once with ``python -m src.apps.games.repositories.db.fingerprints``.
+
+SQLite cannot add a NOT NULL column to a filled table, so in a migrated
+database ``fingerprint`` stays nullable even though the model says otherwise.
+Every insert fills it in, and the run fails rather than commit while any game
+is still missing its fingerprint.
+"""
+from collections.abc import Iterator
+
+from sqlalchemy import bindparam, func, inspect, text, update
+from sqlalchemy.engine import Connection, Row
+from sqlmodel import Session, col, select
+
+from src.apps.core.db import get_engine, get_session_factory
+from src.apps.games.utils.fingerprint import fingerprint_key, fingerprint_secret
+
+from .models import GameInDB
+
+games = GameInDB.__table__
+
+
+def add_fingerprint_column(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("games")}
+    if "fingerprint" not in columns:
+        connection.execute(text("ALTER TABLE games ADD COLUMN fingerprint BLOB"))
+
+
+def create_fingerprint_index(connection: Connection) -> None:
+    connection.execute(text("DROP INDEX IF EXISTS ix_games_owner_id_key"))
+    for index in games.indexes:
+        if index.name == "ix_games_owner_id_fingerprint":
+            index.create(connection, checkfirst=True)
+
+
+def _unfingerprinted(session: Session, chunk_size: int) -> Iterator[list[Row]]:
+    # Paged by pk rather than streamed through one cursor, so no read is
+    # left open on the table while its rows are updated
+    after = 0
+    while chunk := session.execute(
+        select(GameInDB.pk, GameInDB.key)
+        .where(games.c.fingerprint.is_(None), col(GameInDB.pk) > after)
+        .order_by(GameInDB.pk)
+        .limit(chunk_size)
+    ).all():
+        yield chunk
+        after = chunk[-1].pk
+
+
+def fill_fingerprints(session: Session, *, chunk_size: int = 1000) -> int:
+    """Fingerprint every game that has none yet and return how many there were.
+
+    Only one chunk of games is held at a time. Nothing is committed, so either
+    every game gets its fingerprint or none does.
+    """
+    secret = fingerprint_secret(session.connection())
+    filled = 0
+    for chunk in _unfingerprinted(session, chunk_size):
+        session.execute(
+            update(games)
+            .where(games.c.pk == bindparam("game"))
+            .values(fingerprint=bindparam("value")),
+            [{"game": pk, "value": fingerprint_key(key, secret)} for pk, key in chunk],
+        )
+        filled += len(chunk)
+    return filled
+
+
+def main() -> None:
+    with get_engine().begin() as connection:
+        add_fingerprint_column(connection)
+
+    with get_session_factory()() as session:
+        filled = fill_fingerprints(session)
+        missing = session.execute(
+            select(func.count()).where(games.c.fingerprint.is_(None))
+        ).scalar_one()
+        if missing:
+            raise RuntimeError(f"{missing} games are still missing a fingerprint")
+        create_fingerprint_index(session.connection())
+        session.commit()
+
+    print(f"Fingerprinted {filled} keys")
+
+
+if __name__ == "__main__":
+    main()
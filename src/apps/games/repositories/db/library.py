@@ -0,0 +1,269 @@
+"""Stream the whole key library to a file and back, for backups and moves.
+
+Titles, guilds, members, guild memberships and games are written one record
+per line, as JSONL or CSV, read through ``yield_per`` cursors. Imports insert
+chunk by chunk and commit after each one, so memory stays flat at any size.
+Every insert skips rows already present, and an interrupted import carries on
+from the chunk it reports last:
+
+    python -m src.apps.games.repositories.db.library export library.jsonl
+    python -m src.apps.games.repositories.db.library import library.jsonl --start 42
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Literal, TextIO
+
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session, col, select
+
+from src.apps.core.db import get_session_factory, insert_or_ignore
+from src.apps.core.iterables import chunked
+from src.apps.discord.repositories.db.models import (
+    GuildInDB,
+    MemberInDB,
+    MemberToGuildLink,
+)
+from src.apps.games.domain.models import LibraryImport
+from src.apps.games.utils.fingerprint import fingerprint_key, fingerprint_secret
+
+from .counters import rebuild_counters
+from .models import GameInDB, TitleInDB
+from .repo import SQLModelRepository
+
+logger = logging.getLogger(__name__)
+
+Record = dict[str, Any]
+Format = Literal["jsonl", "csv"]
+
+# Records of one kind only ever refer to kinds exported before them
+FIELDS = (
+    "type",
+    "title",
+    "guild_id",
+    "member_id",
+    "last_claim",
+    "owner_id",
+    "platform",
+    "key",
+)
+
+
+def export_records(session: Session, *, chunk_size: int = 1000) -> Iterator[Record]:
+    def stream(statement: Any) -> Iterator[Any]:
+        return session.execute(statement.execution_options(yield_per=chunk_size))
+
+    for (name,) in stream(select(TitleInDB.name).order_by(TitleInDB.pk)):
+        yield {"type": "title", "title": name}
+
+    for (guild_id,) in stream(select(GuildInDB.id).order_by(GuildInDB.pk)):
+        yield {"type": "guild", "guild_id": guild_id}
+
+    members = select(MemberInDB.id, MemberInDB.last_claim).order_by(MemberInDB.pk)
+    for member_id, last_claim in stream(members):
+        yield {
+            "type": "member",
+            "member_id": member_id,
+            "last_claim": last_claim and last_claim.isoformat(),
+        }
+
+    memberships = (
+        select(MemberInDB.id, GuildInDB.id)
+        .join(MemberToGuildLink, MemberToGuildLink.member_pk == MemberInDB.pk)
+        .join(GuildInDB, GuildInDB.pk == MemberToGuildLink.guild_pk)
+        .order_by(MemberToGuildLink.guild_pk, MemberToGuildLink.member_pk)
+    )
+    for member_id, guild_id in stream(memberships):
+        yield {"type": "membership", "member_id": member_id, "guild_id": guild_id}
+
+    games = (
+        select(TitleInDB.name, GameInDB.owner_id, GameInDB.platform, GameInDB.key)
+        .join(TitleInDB)
+        .order_by(GameInDB.pk)
+    )
+    for name, owner_id, platform, key in stream(games):
+        yield {
+            "type": "game",
+            "title": name,
+            "owner_id": owner_id,
+            "platform": platform,
+            "key": key,
+        }
+
+
+def write_records(records: Iterable[Record], file: TextIO, format: Format) -> int:
+    written = 0
+    if format == "csv":
+        writer = csv.DictWriter(file, FIELDS)
+        writer.writeheader()
+        for written, record in enumerate(records, 1):
+            writer.writerow(record)
+    else:
+        for written, record in enumerate(records, 1):
+            file.write(json.dumps(record) + "\n")
+    return written
+
+
+def read_records(file: TextIO, format: Format) -> Iterator[Record]:
+    if format == "csv":
+        # CSV has no nulls, so empty cells are fields the record does not have
+        for row in csv.DictReader(file):
+            yield {field: value for field, value in row.items() if value}
+    else:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _import_chunk(session: Session, records: list[Record]) -> None:
+    by_type: dict[str, list[Record]] = {}
+    for record in records:
+        by_type.setdefault(record["type"], []).append(record)
+
+    repo = SQLModelRepository(session)
+    # Dicts rather than sets keep rows in file order, so pks come out the same
+    names = dict.fromkeys(record["title"] for record in by_type.get("title", []))
+    names.update(dict.fromkeys(record["title"] for record in by_type.get("game", [])))
+    title_pks = repo.resolve_titles(names) if names else {}
+
+    members: dict[str, datetime | None] = {}
+    for record in by_type.get("member", []):
+        last_claim = record.get("last_claim")
+        members[record["member_id"]] = last_claim and datetime.fromisoformat(last_claim)
+    guild_ids = dict.fromkeys(record["guild_id"] for record in by_type.get("guild", []))
+    for record in by_type.get("membership", []):
+        members.setdefault(record["member_id"], None)
+        guild_ids.setdefault(record["guild_id"])
+
+    if members:
+        session.execute(
+            insert_or_ignore(session, MemberInDB, "id"),
+            [
+                {"id": member_id, "last_claim": last_claim}
+                for member_id, last_claim in members.items()
+            ],
+        )
+    if guild_ids:
+        session.execute(
+            insert_or_ignore(session, GuildInDB, "id"),
+            [{"id": guild_id} for guild_id in guild_ids],
+        )
+
+    if memberships := by_type.get("membership"):
+        member_pks = dict(
+            session.exec(
+                select(MemberInDB.id, MemberInDB.pk).where(
+                    col(MemberInDB.id).in_({r["member_id"] for r in memberships})
+                )
+            ).all()
+        )
+        guild_pks = dict(
+            session.exec(
+                select(GuildInDB.id, GuildInDB.pk).where(
+                    col(GuildInDB.id).in_({r["guild_id"] for r in memberships})
+                )
+            ).all()
+        )
+        session.execute(
+            insert_or_ignore(session, MemberToGuildLink, "member_pk", "guild_pk"),
+            [
+                {
+                    "member_pk": member_pks[record["member_id"]],
+                    "guild_pk": guild_pks[record["guild_id"]],
+                }
+                for record in memberships
+            ],
+        )
+
+    if games := by_type.get("game"):
+        secret = fingerprint_secret(session.connection())
+        session.execute(
+            insert_or_ignore(session, GameInDB, "owner_id", "fingerprint"),
+            [
+                {
+                    "owner_id": record["owner_id"],
+                    "platform": record["platform"],
+                    "title_pk": title_pks[record["title"]],
+                    "key": record["key"],
+                    "fingerprint": fingerprint_key(record["key"], secret),
+                }
+                for record in games
+            ],
+        )
+
+
+def import_records(
+    session_factory: sessionmaker[Session],
+    records: Iterable[Record],
+    *,
+    start: int = 0,
+    chunk_size: int = 1000,
+) -> LibraryImport:
+    """Insert ``records`` a chunk at a time, committing after each chunk.
+
+    The first ``start`` chunks are skipped, which resumes an import that
+    stopped after committing ``start`` chunks. Rows that already exist are left
+    as they are, so starting too early is harmless.
+    """
+    report = LibraryImport(chunks=start)
+    for chunk in islice(chunked(records, chunk_size), start, None):
+        with session_factory() as session:
+            _import_chunk(session, chunk)
+            session.commit()
+        report.chunks += 1
+        report.records += len(chunk)
+        logger.info("%d chunks committed", report.chunks)
+
+    # Chunks insert rows wholesale, so the availability counters are recounted
+    # once everything is in
+    with session_factory() as session:
+        report.counters = rebuild_counters(session).counters
+        session.commit()
+    return report
+
+
+def _format(path: Path, format: Format | None) -> Format:
+    return format or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=["jsonl", "csv"])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--start", type=int, default=0, help="Chunks to skip")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    format = _format(args.path, args.format)
+
+    if args.command == "export":
+        with get_session_factory()() as session, args.path.open(
+            "w", newline=""
+        ) as file:
+            records = export_records(session, chunk_size=args.chunk_size)
+            print(f"Exported {write_records(records, file, format)} records")
+        return
+
+    with args.path.open(newline="") as file:
+        report = import_records(
+            get_session_factory(),
+            read_records(file, format),
+            start=args.start,
+            chunk_size=args.chunk_size,
+        )
+    print(
+        f"Imported {report.records} records, {report.chunks} chunks committed, "
+        f"{report.counters} counters rebuilt"
+    )
+
+
+if __name__ == "__main__":
+    main()
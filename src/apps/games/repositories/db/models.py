@@ -1,16 +1,101 @@
-from __future__ import annotations
+import sqlite3
+from typing import Any
 
-from sqlmodel import Field, Relationship
+from sqlalchemy import DDL, Column, Index, LargeBinary, String, event
+from sqlmodel import Field, Relationship, SQLModel
 
-from src.apps.games.domain.models import Game, Title
+from src.apps.games.domain.models import GameBase, Platform, TitleBase
+from src.apps.games.utils.fingerprint import (
+    FINGERPRINT_SIZE,
+    fingerprint_key,
+    fingerprint_secret,
+)
+from src.apps.games.utils.titlesearch import title_key
 
 
-class TitleInDB(Title, table=True):
+class TitleInDB(TitleBase, table=True):
+    __tablename__ = "titles"
     pk: int | None = Field(default=None, primary_key=True)
-    games: list[GameInDB] = Relationship()  # type: ignore
+    name: str = Field(index=True)
+    normalized_name: str = Field(
+        default=None,
+        sa_column=Column(String, nullable=False, unique=True, index=True),
+    )
+    games: list["GameInDB"] = Relationship(back_populates="title")  # type: ignore
 
 
-class GameInDB(Game, table=True):
+class GameInDB(GameBase, table=True):
+    __tablename__ = "games"
+    # Keys are matched on a fixed width fingerprint, so the index stays small
+    # however long a URL key gets
+    __table_args__ = (
+        Index("ix_games_owner_id_fingerprint", "owner_id", "fingerprint", unique=True),
+    )
     pk: int | None = Field(default=None, primary_key=True)
+    fingerprint: bytes = Field(
+        default=None,
+        sa_column=Column(LargeBinary(FINGERPRINT_SIZE), nullable=False),
+    )
+    platform: Platform = Field(sa_column=Column(String, nullable=False))
     title_pk: int = Field(foreign_key="titles.pk")
     title: TitleInDB = Relationship(back_populates="games")
+
+
+class GuildAvailabilityInDB(SQLModel, table=True):
+    """Keys the members of a guild offer, per platform and per title.
+
+    ``title_pk`` 0 holds the platform's total over every title.
+    """
+
+    __tablename__ = "guild_availability"
+    guild_pk: int = Field(foreign_key="guilds.pk", primary_key=True)
+    platform: Platform = Field(sa_column=Column(String, primary_key=True))
+    title_pk: int = Field(primary_key=True)
+    copies: int = 0
+
+
+@event.listens_for(TitleInDB, "before_insert")
+@event.listens_for(TitleInDB, "before_update")
+def _normalize_title_name(mapper: Any, connection: Any, target: TitleInDB) -> None:
+    target.normalized_name = title_key(target.name)
+
+
+@event.listens_for(GameInDB, "before_insert")
+@event.listens_for(GameInDB, "before_update")
+def _fingerprint_game_key(mapper: Any, connection: Any, target: GameInDB) -> None:
+    target.fingerprint = fingerprint_key(target.key, fingerprint_secret(connection))
+
+
+# The trigram tokenizer arrived in SQLite 3.34
+_FTS_TRIGRAM = sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def _sqlite_with_trigrams(ddl: DDL, target: Any, bind: Any, **kw: Any) -> bool:
+    return bind.dialect.name == "sqlite" and _FTS_TRIGRAM
+
+
+# Mirrors titles into an FTS5 table so titles committed by other processes are
+# still found by substring when the in-memory index has not seen them yet
+for _ddl in (
+    "CREATE VIRTUAL TABLE titles_fts USING fts5("
+    "name, content='titles', content_rowid='pk', tokenize='trigram')",
+    "CREATE TRIGGER titles_fts_insert AFTER INSERT ON titles BEGIN "
+    "INSERT INTO titles_fts(rowid, name) VALUES (new.pk, new.name); END",
+    "CREATE TRIGGER titles_fts_delete AFTER DELETE ON titles BEGIN "
+    "INSERT INTO titles_fts(titles_fts, rowid, name) "
+    "VALUES ('delete', old.pk, old.name); END",
+    "CREATE TRIGGER titles_fts_update AFTER UPDATE OF name ON titles BEGIN "
+    "INSERT INTO titles_fts(titles_fts, rowid, name) "
+    "VALUES ('delete', old.pk, old.name); "
+    "INSERT INTO titles_fts(rowid, name) VALUES (new.pk, new.name); END",
+):
+    event.listen(
+        TitleInDB.__table__,
+        "after_create",
+        DDL(_ddl).execute_if(callable_=_sqlite_with_trigrams),
+    )
+event.listen(
+    TitleInDB.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS titles_fts").execute_if(callable_=_sqlite_with_trigrams),
+)
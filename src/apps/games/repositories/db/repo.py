@@ -1,34 +1,144 @@
+from collections import Counter
+from collections.abc import Collection
+from datetime import datetime, timedelta
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import delete, exists, func, or_, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select
+from sqlmodel import Session, col, select
 
-from ...domain.expections import TitleDoesNotExist
-from ...domain.models import Platform
+from src.apps.core.cache import LRUCache
+from src.apps.core.db import Loading, insert_or_ignore, loading_options
+from src.apps.discord.repositories.db.models import (
+    GuildInDB,
+    MemberInDB,
+    MemberToGuildLink,
+)
+from src.apps.games.utils.fingerprint import fingerprint_key, fingerprint_secret
+from src.apps.games.utils.titlesearch import TitleIndex, title_key
+
+from ...domain.expections import (
+    ClaimTooSoon,
+    KeyAlreadyExists,
+    NoKeyAvailable,
+    TitleDoesNotExist,
+)
+from ...domain.models import AvailableTitle, Game, GameRow, Platform, Title
 from ..types import GameRepository
-from .models import GameInDB, TitleInDB
+from .cache import (
+    TITLE_CACHE,
+    bind_title_cache,
+    get_title_pk,
+    invalidate_title_pk,
+    stage_title_pks,
+)
+from .counters import ALL_TITLES, count_keys
+from .models import GameInDB, GuildAvailabilityInDB, TitleInDB
+from .search import TITLE_INDEX, bind_title_index, search_titles, stage_title_names
 
 
 class SQLModelRepository(GameRepository[Session]):
-    def __init__(self, session: Session, *args: Any, **kwargs: Any):
+    def __init__(
+        self,
+        session: Session,
+        *args: Any,
+        title_cache: LRUCache[str, int] = TITLE_CACHE,
+        title_index: TitleIndex = TITLE_INDEX,
+        **kwargs: Any,
+    ):
         self.session = session
+        bind_title_cache(session, title_cache)
+        bind_title_index(session, title_index)
+        self._secret: bytes | None = None
+
+    def _fingerprint(self, key: str) -> bytes:
+        if self._secret is None:
+            self._secret = fingerprint_secret(self.session.get_bind())
+        return fingerprint_key(key, self._secret)
+
+    def check_key_exists(self, *, key: str, owner_id: str) -> bool:
+        statement = select(
+            exists().where(
+                GameInDB.owner_id == owner_id,
+                GameInDB.fingerprint == self._fingerprint(key),
+            )
+        )
+        return self.session.exec(statement).one()
 
     def get_title(
         self,
         *,
         name: str,
         create: bool = True,
+        loading: Loading | None = None,
     ) -> TitleInDB:
-        statement = select(TitleInDB).where(TitleInDB.name == name)
+        options = loading_options(TitleInDB.games, loading=loading)
+        key = title_key(name)
+        if (title_pk := get_title_pk(self.session, key)) is not None:
+            if title := self.session.get(TitleInDB, title_pk, options=options):
+                return title
+            invalidate_title_pk(self.session, key)
+
+        statement = (
+            select(TitleInDB).where(TitleInDB.normalized_name == key).options(*options)
+        )
 
         if title := self.session.exec(statement).first():
+            stage_title_pks(self.session, {key: title.pk})
             return title
 
         if create:
-            new_title = TitleInDB(name=name)
-            return new_title
+            title_pk = self.resolve_titles([name])[name]
+            return self.session.get(TitleInDB, title_pk, options=options)
 
         raise TitleDoesNotExist()
 
+    def search_titles(self, *, query: str, limit: int = 25) -> list[str]:
+        return search_titles(self.session, query, limit)
+
+    def resolve_titles(self, names: Collection[str]) -> dict[str, int]:
+        """Map each name to the pk of its title, creating titles that are missing.
+
+        Names are matched on their normalized form, and a new title keeps the
+        first spelling it was created with.
+        """
+        keys = {name: title_key(name) for name in names}
+        title_pks: dict[str, int] = {}
+        uncached: dict[str, str] = {}
+        for name, key in keys.items():
+            if (title_pk := get_title_pk(self.session, key)) is not None:
+                title_pks[key] = title_pk
+            else:
+                uncached.setdefault(key, name)
+
+        if uncached:
+            statement = select(TitleInDB.normalized_name, TitleInDB.pk).where(
+                col(TitleInDB.normalized_name).in_(uncached)
+            )
+            found: dict[str, int] = dict(self.session.exec(statement).all())
+
+            if missing := [key for key in uncached if key not in found]:
+                self.session.execute(
+                    insert_or_ignore(self.session, TitleInDB, "normalized_name"),
+                    [
+                        {"name": uncached[key], "normalized_name": key}
+                        for key in missing
+                    ],
+                )
+                created = self.session.exec(
+                    select(
+                        TitleInDB.normalized_name, TitleInDB.pk, TitleInDB.name
+                    ).where(col(TitleInDB.normalized_name).in_(missing))
+                ).all()
+                found.update((key, title_pk) for key, title_pk, _ in created)
+                stage_title_names(self.session, [name for *_, name in created])
+
+            stage_title_pks(self.session, found)
+            title_pks.update(found)
+
+        return {name: title_pks[key] for name, key in keys.items()}
+
     def add_key(
         self,
         *,
@@ -36,28 +146,256 @@ class SQLModelRepository(GameRepository[Session]):
         platform: Platform,
         title_name: str,
         key: str,
+        loading: Loading | None = "joined",
     ) -> GameInDB:
-        title = self.get_title(name=title_name)
-        new_game = GameInDB(
+        title_pk = self.resolve_titles([title_name])[title_name]
+        result = self.session.execute(
+            insert_or_ignore(self.session, GameInDB, "owner_id", "fingerprint").values(
+                owner_id=owner_id,
+                platform=platform,
+                title_pk=title_pk,
+                key=key,
+                fingerprint=self._fingerprint(key),
+            )
+        )
+        if not result.rowcount:
+            raise KeyAlreadyExists()
+        count_keys(
+            self.session, owner_id=owner_id, keys=Counter([(platform, title_pk)])
+        )
+
+        return self.session.get(
+            GameInDB,
+            result.inserted_primary_key[0],
+            options=loading_options(GameInDB.title, loading=loading),
+        )
+
+    def add_keys(
+        self,
+        *,
+        owner_id: str,
+        keys: Collection[tuple[str, Platform, str]],
+    ) -> list[str]:
+        fingerprints = {key: self._fingerprint(key) for _, _, key in keys}
+        statement = select(GameInDB.fingerprint).where(
+            GameInDB.owner_id == owner_id,
+            col(GameInDB.fingerprint).in_(fingerprints.values()),
+        )
+        seen = set(self.session.exec(statement).all())
+
+        new_keys: list[tuple[str, Platform, str]] = []
+        for title_name, platform, key in keys:
+            if fingerprints[key] not in seen:
+                seen.add(fingerprints[key])
+                new_keys.append((title_name, platform, key))
+
+        if not new_keys:
+            return []
+
+        title_pks = self.resolve_titles({title_name for title_name, _, _ in new_keys})
+        self.session.execute(
+            insert_or_ignore(self.session, GameInDB, "owner_id", "fingerprint"),
+            [
+                {
+                    "owner_id": owner_id,
+                    "platform": platform,
+                    "title_pk": title_pks[title_name],
+                    "key": key,
+                    "fingerprint": fingerprints[key],
+                }
+                for title_name, platform, key in new_keys
+            ],
+        )
+        count_keys(
+            self.session,
             owner_id=owner_id,
-            platform=platform,
-            title_pk=title.pk,
-            key=key,
+            keys=Counter(
+                (platform, title_pks[title_name])
+                for title_name, platform, _ in new_keys
+            ),
         )
-        self.session.add(new_game)
-        return new_game
+        return [key for _, _, key in new_keys]
 
     def remove_key(
         self,
         *,
         owner_id: str,
         key: str,
+        loading: Loading | None = "joined",
     ) -> tuple[TitleInDB, str]:
-        statement = select(GameInDB).where(
-            GameInDB.key == key, GameInDB.owner_id == owner_id
+        statement = (
+            select(GameInDB)
+            .where(
+                GameInDB.owner_id == owner_id,
+                GameInDB.fingerprint == self._fingerprint(key),
+            )
+            .options(*loading_options(GameInDB.title, loading=loading))
         )
         removed_game = self.session.exec(statement).one()
 
         self.session.delete(removed_game)
+        count_keys(
+            self.session,
+            owner_id=owner_id,
+            keys=Counter([(removed_game.platform, removed_game.title_pk)]),
+            sign=-1,
+        )
+        # Column-only queries such as check_key_exists do not autoflush
+        self.session.flush()
 
         return removed_game.title, removed_game.key
+
+    def _visible_owners(self, member_id: str) -> Select:
+        """Ids of the other members sharing at least one guild with ``member_id``."""
+        me, them = aliased(MemberInDB), aliased(MemberInDB)
+        my_link, their_link = aliased(MemberToGuildLink), aliased(MemberToGuildLink)
+        return (
+            select(them.id)
+            .join(their_link, their_link.member_pk == them.pk)
+            .join(my_link, my_link.guild_pk == their_link.guild_pk)
+            .join(me, me.pk == my_link.member_pk)
+            .where(me.id == member_id, them.id != member_id)
+        )
+
+    def get_available_titles(
+        self,
+        *,
+        member_id: str,
+        after: str | None = None,
+        limit: int = 25,
+    ) -> list[AvailableTitle]:
+        is_available = col(GameInDB.owner_id).in_(self._visible_owners(member_id))
+
+        page = (
+            select(TitleInDB.pk, TitleInDB.name)
+            .where(exists().where(GameInDB.title_pk == TitleInDB.pk, is_available))
+            .order_by(TitleInDB.name)
+            .limit(limit)
+        )
+        if after is not None:
+            page = page.where(TitleInDB.name > after)
+        page = page.subquery()
+
+        statement = (
+            select(page.c.name, GameInDB.platform, func.count())
+            .join(GameInDB, GameInDB.title_pk == page.c.pk)
+            .where(is_available)
+            .group_by(page.c.name, GameInDB.platform)
+            .order_by(page.c.name)
+        )
+
+        titles: dict[str, AvailableTitle] = {}
+        for name, platform, copies in self.session.exec(statement):
+            if not (title := titles.get(name)):
+                title = titles[name] = AvailableTitle(name=name, copies={})
+            title.copies[platform] = copies
+
+        return list(titles.values())
+
+    def list_games(self, *, member_id: str) -> list[GameRow]:
+        statement = (
+            select(TitleInDB.name, GameInDB.platform, GameInDB.owner_id)
+            .join(TitleInDB)
+            .where(col(GameInDB.owner_id).in_(self._visible_owners(member_id)))
+            .order_by(TitleInDB.name, GameInDB.platform, GameInDB.owner_id)
+        )
+        return list(map(GameRow._make, self.session.execute(statement)))
+
+    def get_guild_availability(
+        self, *, guild_id: str, title_name: str | None = None
+    ) -> dict[Platform, int]:
+        title_pk: Any = ALL_TITLES
+        if title_name is not None:
+            key = title_key(title_name)
+            if (title_pk := get_title_pk(self.session, key)) is None:
+                title_pk = (
+                    select(TitleInDB.pk)
+                    .where(TitleInDB.normalized_name == key)
+                    .scalar_subquery()
+                )
+
+        statement = (
+            select(GuildAvailabilityInDB.platform, GuildAvailabilityInDB.copies)
+            .join(GuildInDB, GuildInDB.pk == GuildAvailabilityInDB.guild_pk)
+            .where(
+                GuildInDB.id == guild_id,
+                GuildAvailabilityInDB.title_pk == title_pk,
+                GuildAvailabilityInDB.copies > 0,
+            )
+        )
+        return dict(self.session.exec(statement).all())
+
+    def claim_key(
+        self,
+        *,
+        member_id: str,
+        title_name: str,
+        platform: Platform | None = None,
+        wait_period: timedelta,
+    ) -> Game:
+        now = datetime.utcnow()
+        # Stamping last_claim first both enforces the wait period and takes the
+        # write lock, so a member racing themselves can only get one key
+        stamped = self.session.execute(
+            update(MemberInDB)
+            .where(
+                MemberInDB.id == member_id,
+                or_(
+                    col(MemberInDB.last_claim).is_(None),
+                    col(MemberInDB.last_claim) <= now - wait_period,
+                ),
+            )
+            .values(last_claim=now)
+        )
+        if not stamped.rowcount:
+            if self.session.exec(
+                select(exists().where(MemberInDB.id == member_id))
+            ).one():
+                raise ClaimTooSoon()
+            raise NoKeyAvailable()
+
+        candidates = (
+            select(
+                GameInDB.pk,
+                GameInDB.platform,
+                GameInDB.title_pk,
+                GameInDB.key,
+                GameInDB.owner_id,
+            )
+            .join(TitleInDB)
+            .where(
+                TitleInDB.normalized_name == title_key(title_name),
+                col(GameInDB.owner_id).in_(self._visible_owners(member_id)),
+            )
+            .order_by(GameInDB.pk)
+            .limit(1)
+        )
+        if platform is not None:
+            candidates = candidates.where(GameInDB.platform == platform)
+
+        # Whoever deletes the row wins it; a claimer that loses the race to
+        # another transaction moves on to the next candidate
+        lost: list[int] = []
+        while row := self.session.exec(
+            candidates.where(col(GameInDB.pk).not_in(lost))
+        ).first():
+            game_pk, game_platform, title_pk, key, owner_id = row
+            deleted = self.session.execute(
+                delete(GameInDB).where(GameInDB.pk == game_pk)
+            )
+            if deleted.rowcount:
+                count_keys(
+                    self.session,
+                    owner_id=owner_id,
+                    keys=Counter([(game_platform, title_pk)]),
+                    sign=-1,
+                )
+                return Game(
+                    platform=game_platform,
+                    title=Title(name=title_name),
+                    key=key,
+                    owner_id=owner_id,
+                )
+            lost.append(game_pk)
+
+        raise NoKeyAvailable()
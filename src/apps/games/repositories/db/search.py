@@ -0,0 +1,113 @@
+from collections.abc import Collection
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import event, func, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, object_session
+from sqlmodel import select
+
+from src.apps.games.utils.titlesearch import TitleIndex, normalize_title
+
+from .models import TitleInDB
+
+# Every title name, searchable in process, filled on first search
+TITLE_INDEX = TitleIndex()
+
+_INDEX = "title_index"
+_PENDING = "pending_title_names"
+
+_has_fts: "WeakKeyDictionary[Engine, bool]" = WeakKeyDictionary()
+# The highest title pk each index has read, so titles committed by another
+# process since show up as rows past it
+_seen_pks: "WeakKeyDictionary[TitleIndex, int]" = WeakKeyDictionary()
+
+
+def bind_title_index(session: Session, index: TitleIndex) -> None:
+    session.info[_INDEX] = index
+
+
+def stage_title_names(session: Session, names: Collection[str]) -> None:
+    """Hold names created in a transaction back from the index until it commits."""
+    session.info.setdefault(_PENDING, set()).update(names)
+
+
+def search_titles(session: Session, query: str, limit: int) -> list[str]:
+    index: TitleIndex = session.info.get(_INDEX, TITLE_INDEX)
+    if not index.loaded:
+        _seen_pks.pop(index, None)
+        _catch_up(session, index, force=True)
+        index.loaded = True
+
+    found = index.search(query, limit)
+    if len(found) < limit and _catch_up(session, index):
+        found = index.search(query, limit)
+    if not found and (found := _search_fts(session, query, limit)):
+        index.update(found)
+    return found
+
+
+def _catch_up(session: Session, index: TitleIndex, *, force: bool = False) -> bool:
+    """Index titles committed since ``index`` last read the table.
+
+    Unless ``force`` is set, skipped while the session holds titles of its own
+    that are not committed yet, so a rollback does not leave them in the index.
+    """
+    if not force and session.info.get(_PENDING):
+        return False
+    seen = _seen_pks.get(index, 0)
+    last = session.execute(select(func.max(TitleInDB.pk))).scalar() or 0
+    if last <= seen:
+        return False
+
+    statement = (
+        select(TitleInDB.name)
+        .where(TitleInDB.pk > seen, TitleInDB.pk <= last)
+        .execution_options(yield_per=10_000)
+    )
+    index.update(session.execute(statement).scalars())
+    _seen_pks[index] = last
+    return True
+
+
+def _search_fts(session: Session, query: str, limit: int) -> list[str]:
+    """Substring matches for queries the index finds nothing for.
+
+    The trigram tokenizer does not fold accents, so unlike the index "cafe"
+    never matches "Café" here.
+    """
+    bind = session.get_bind()
+    if not isinstance(bind, Engine) or bind.dialect.name != "sqlite":
+        return []
+    if (has_fts := _has_fts.get(bind)) is None:
+        has_fts = _has_fts[bind] = inspect(bind).has_table("titles_fts")
+    # Trigram tokens need at least three characters to match anything
+    words = [word for word in normalize_title(query).split() if len(word) >= 3]
+    if not has_fts or not words:
+        return []
+
+    statement = text(
+        "SELECT name FROM titles_fts WHERE titles_fts MATCH :match "
+        "ORDER BY rank LIMIT :limit"
+    )
+    match = " ".join(f'"{word}"' for word in words)
+    return list(session.execute(statement, {"match": match, "limit": limit}).scalars())
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_title_names(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    index: TitleIndex = session.info.get(_INDEX, TITLE_INDEX)
+    if pending and index.loaded:
+        index.update(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_title_names(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+@event.listens_for(TitleInDB, "after_delete")
+def _unindex_deleted_title(mapper: Any, connection: Any, target: TitleInDB) -> None:
+    if session := object_session(target):
+        session.info.get(_INDEX, TITLE_INDEX).remove(target.name)
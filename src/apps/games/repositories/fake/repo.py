@@ -1,15 +1,27 @@
+from collections import Counter
+from collections.abc import Collection
+from datetime import datetime, timedelta
 from typing import Any
 
 from pydantic import BaseModel
 
 from src.apps.core.types import BaseSession
 from src.apps.games.domain.expections import (
+    ClaimTooSoon,
     KeyAlreadyExists,
     KeyDoesNotExist,
+    NoKeyAvailable,
     TitleDoesNotExist,
 )
-from src.apps.games.domain.models import Game, Platform, Title
+from src.apps.games.domain.models import (
+    AvailableTitle,
+    Game,
+    GameRow,
+    Platform,
+    Title,
+)
 from src.apps.games.repositories.types import GameRepository
+from src.apps.games.utils.titlesearch import TitleIndex, title_key
 
 
 class FakeSession(BaseSession):
@@ -28,20 +40,24 @@ class FakeSession(BaseSession):
 
 
 class FakeRepository(GameRepository[FakeSession]):
-    titles: set[Title]
+    titles: dict[str, Title]
     games: set[Game]
+    guilds: dict[str, set[str]]
+    last_claims: dict[str, datetime]
 
     def __init__(
         self,
         session: FakeSession,
         *,
-        titles: set[Title] | None = None,
-        games: set[Game] | None = None,
+        guilds: dict[str, set[str]] | None = None,
     ) -> None:
         self.session = session
 
-        self.titles = set()
+        self.titles = {}
+        self.title_index = TitleIndex()
         self.games = set()
+        self.guilds = guilds or {}
+        self.last_claims = {}
 
     def init_objects(
         self,
@@ -57,15 +73,21 @@ class FakeRepository(GameRepository[FakeSession]):
         name: str,
         create: bool = True,
     ) -> Title:
-        title = Title(name=name)
-        if title not in self.titles:
-            if create:
-                self.titles.add(title)
-                self.session.add(title)
-            else:
-                raise TitleDoesNotExist()
+        key = title_key(name)
+        if title := self.titles.get(key):
+            return title
+
+        if not create:
+            raise TitleDoesNotExist()
+
+        title = self.titles[key] = Title(name=name)
+        self.title_index.add(name)
+        self.session.add(title)
         return title
 
+    def search_titles(self, *, query: str, limit: int = 25) -> list[str]:
+        return self.title_index.search(query, limit)
+
     def add_key(
         self,
         *,
@@ -82,6 +104,24 @@ class FakeRepository(GameRepository[FakeSession]):
         self.games.add(new_game)
         return new_game
 
+    def add_keys(
+        self,
+        *,
+        owner_id: str,
+        keys: Collection[tuple[str, Platform, str]],
+    ) -> list[str]:
+        added: list[str] = []
+        for title_name, platform, key in keys:
+            if not self.check_key_exists(key=key, owner_id=owner_id):
+                self.add_key(
+                    owner_id=owner_id,
+                    platform=platform,
+                    title_name=title_name,
+                    key=key,
+                )
+                added.append(key)
+        return added
+
     def remove_key(
         self,
         *,
@@ -98,3 +138,83 @@ class FakeRepository(GameRepository[FakeSession]):
             return game.title, game.key
         except StopIteration:
             raise KeyDoesNotExist()
+
+    def _visible_owners(self, member_id: str) -> set[str]:
+        owners = {
+            owner_id
+            for member_ids in self.guilds.values()
+            if member_id in member_ids
+            for owner_id in member_ids
+        }
+        owners.discard(member_id)
+        return owners
+
+    def get_available_titles(
+        self,
+        *,
+        member_id: str,
+        after: str | None = None,
+        limit: int = 25,
+    ) -> list[AvailableTitle]:
+        owners = self._visible_owners(member_id)
+
+        titles: dict[str, AvailableTitle] = {}
+        for game in sorted(self.games, key=lambda game: game.title):
+            name = game.title.name
+            if game.owner_id not in owners or (after is not None and name <= after):
+                continue
+            if not (title := titles.get(name)):
+                if len(titles) == limit:
+                    break
+                title = titles[name] = AvailableTitle(name=name, copies={})
+            title.copies[game.platform] = title.copies.get(game.platform, 0) + 1
+
+        return list(titles.values())
+
+    def list_games(self, *, member_id: str) -> list[GameRow]:
+        owners = self._visible_owners(member_id)
+        return sorted(
+            GameRow(game.title.name, game.platform, game.owner_id)
+            for game in self.games
+            if game.owner_id in owners
+        )
+
+    def get_guild_availability(
+        self, *, guild_id: str, title_name: str | None = None
+    ) -> dict[Platform, int]:
+        members = self.guilds.get(guild_id, set())
+        return dict(
+            Counter(
+                game.platform
+                for game in self.games
+                if game.owner_id in members
+                and (title_name is None or game.title == Title(name=title_name))
+            )
+        )
+
+    def claim_key(
+        self,
+        *,
+        member_id: str,
+        title_name: str,
+        platform: Platform | None = None,
+        wait_period: timedelta,
+    ) -> Game:
+        now = datetime.utcnow()
+        if (last_claim := self.last_claims.get(member_id)) and (
+            now - last_claim < wait_period
+        ):
+            raise ClaimTooSoon()
+
+        owners = self._visible_owners(member_id)
+        for game in self.games:
+            if (
+                game.title == Title(name=title_name)
+                and game.owner_id in owners
+                and platform in (None, game.platform)
+            ):
+                self.games.remove(game)
+                self.last_claims[member_id] = now
+                return game
+
+        raise NoKeyAvailable()
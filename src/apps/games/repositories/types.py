@@ -1,17 +1,27 @@
 from __future__ import annotations
 
+from collections.abc import Collection
+from datetime import timedelta
 from typing import TYPE_CHECKING, Protocol, TypeVar
 
-from src.apps.core.types import BaseRepository, BaseSession
+from src.apps.core.types import (
+    BaseAsyncRepository,
+    BaseAsyncSession,
+    BaseRepository,
+    BaseSession,
+)
 
 if TYPE_CHECKING:
     from src.apps.games.domain.models import (
+        AvailableTitle,
         Game,
+        GameRow,
         Platform,
         Title,
     )
 
 _S = TypeVar("_S", bound=BaseSession, covariant=True)
+_AS = TypeVar("_AS", bound=BaseAsyncSession, covariant=True)
 
 
 class GameRepository(BaseRepository[_S], Protocol):
@@ -26,6 +36,9 @@ class GameRepository(BaseRepository[_S], Protocol):
     ) -> Title:
         ...
 
+    def search_titles(self, *, query: str, limit: int = ...) -> list[str]:
+        ...
+
     def add_key(
         self,
         *,
@@ -36,6 +49,14 @@ class GameRepository(BaseRepository[_S], Protocol):
     ) -> Game:
         ...
 
+    def add_keys(
+        self,
+        *,
+        owner_id: str,
+        keys: Collection[tuple[str, Platform, str]],
+    ) -> list[str]:
+        ...
+
     def remove_key(
         self,
         *,
@@ -43,3 +64,99 @@ class GameRepository(BaseRepository[_S], Protocol):
         key: str,
     ) -> tuple[Title, str]:
         ...
+
+    def get_available_titles(
+        self,
+        *,
+        member_id: str,
+        after: str | None = ...,
+        limit: int = ...,
+    ) -> list[AvailableTitle]:
+        ...
+
+    def list_games(self, *, member_id: str) -> list[GameRow]:
+        ...
+
+    def get_guild_availability(
+        self, *, guild_id: str, title_name: str | None = ...
+    ) -> dict[Platform, int]:
+        ...
+
+    def claim_key(
+        self,
+        *,
+        member_id: str,
+        title_name: str,
+        platform: Platform | None = ...,
+        wait_period: timedelta,
+    ) -> Game:
+        ...
+
+
+class AsyncGameRepository(BaseAsyncRepository[_AS], Protocol):
+    async def check_key_exists(self, *, key: str, owner_id: str) -> bool:
+        ...
+
+    async def get_title(
+        self,
+        *,
+        name: str,
+        create: bool = ...,
+    ) -> Title:
+        ...
+
+    async def search_titles(self, *, query: str, limit: int = ...) -> list[str]:
+        ...
+
+    async def add_key(
+        self,
+        *,
+        owner_id: str,
+        platform: Platform,
+        title_name: str,
+        key: str,
+    ) -> Game:
+        ...
+
+    async def add_keys(
+        self,
+        *,
+        owner_id: str,
+        keys: Collection[tuple[str, Platform, str]],
+    ) -> list[str]:
+        ...
+
+    async def remove_key(
+        self,
+        *,
+        owner_id: str,
+        key: str,
+    ) -> tuple[Title, str]:
+        ...
+
+    async def get_available_titles(
+        self,
+        *,
+        member_id: str,
+        after: str | None = ...,
+        limit: int = ...,
+    ) -> list[AvailableTitle]:
+        ...
+
+    async def list_games(self, *, member_id: str) -> list[GameRow]:
+        ...
+
+    async def get_guild_availability(
+        self, *, guild_id: str, title_name: str | None = ...
+    ) -> dict[Platform, int]:
+        ...
+
+    async def claim_key(
+        self,
+        *,
+        member_id: str,
+        title_name: str,
+        platform: Platform | None = ...,
+        wait_period: timedelta,
+    ) -> Game:
+        ...
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.apps.discord.domain.async_services import join_guild
+from src.apps.discord.unit_of_work.async_db import (
+    AsyncDBUnitOfWork as AsyncDiscordDBUnitOfWork,
+)
+from src.apps.games.domain.async_services import (
+    add_key,
+    add_keys,
+    claim_key,
+    list_available_titles,
+)
+from src.apps.games.repositories.db.cache import TITLE_CACHE
+from src.apps.games.repositories.db.search import TITLE_INDEX
+from src.apps.games.unit_of_work.async_db import AsyncDBUnitOfWork
+
+GAME_NAME = "Game Name"
+
+
+async def _run_services(path: Path) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    session_factory = sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async with AsyncDiscordDBUnitOfWork(session_factory=session_factory) as uow:
+        for member_id in ["1", "2", "3"]:
+            await join_guild(member_id=member_id, guild_id="guild", uow=uow)
+
+        assert await uow.repo.count_guild_members("guild") == 3
+        pages = [
+            page async for page in uow.repo.iter_guild_members("guild", page_size=2)
+        ]
+        assert [[member.id for member in page] for page in pages] == [["1", "2"], ["3"]]
+
+    async with AsyncDBUnitOfWork(session_factory=session_factory) as uow:
+        game = await add_key(
+            owner_id="1",
+            title_name=GAME_NAME,
+            platform="steam",
+            key="AAAAA-AAAAA-AAAAA",
+            uow=uow,
+        )
+        assert game.title.name == GAME_NAME
+
+        await add_keys(
+            owner_id="1",
+            keys=[("Other Game", "BBBBB-BBBBB-BBBBB")],
+            uow=uow,
+        )
+
+    async def list_titles(member_id: str) -> list[str]:
+        async with AsyncDBUnitOfWork(session_factory=session_factory) as uow:
+            titles = await list_available_titles(member_id=member_id, uow=uow)
+            return [title.name for title in titles]
+
+    assert await asyncio.gather(list_titles("2"), list_titles("3")) == [
+        [GAME_NAME, "Other Game"],
+        [GAME_NAME, "Other Game"],
+    ]
+
+    async with AsyncDBUnitOfWork(session_factory=session_factory) as uow:
+        claimed = await claim_key(member_id="2", title_name=GAME_NAME, uow=uow)
+        assert claimed.key == "AAAAA-AAAAA-AAAAA"
+
+    await engine.dispose()
+
+
+def test_async_services(tmp_path: Path) -> None:
+    TITLE_CACHE.clear()
+    TITLE_INDEX.clear()
+    asyncio.run(_run_services(tmp_path / "keybot.db"))
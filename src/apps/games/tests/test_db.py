@@ -0,0 +1,716 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from pydantic import SecretStr
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session, SQLModel, select
+
+from src.apps.core.db import create_engine_from_settings
+from src.apps.core.metrics import METRICS
+from src.apps.discord.domain.services import join_guild, leave_guild
+from src.apps.discord.unit_of_work.db import DBUnitOfWork as DiscordDBUnitOfWork
+from src.apps.games.domain.expections import (
+    ClaimTooSoon,
+    KeyAlreadyExists,
+    NoKeyAvailable,
+)
+from src.apps.games.domain.models import Game, GameRow
+from src.apps.games.domain.services import (
+    add_key,
+    add_keys,
+    claim_key,
+    count_available_keys,
+    list_available_titles,
+    list_games,
+    search_titles,
+)
+from src.apps.games.repositories.db.cache import TITLE_CACHE
+from src.apps.games.repositories.db.counters import rebuild_counters
+from src.apps.games.repositories.db.dedupe import (
+    add_normalized_name_column,
+    create_normalized_name_index,
+    merge_duplicate_titles,
+)
+from src.apps.games.repositories.db.fingerprints import (
+    add_fingerprint_column,
+    create_fingerprint_index,
+    fill_fingerprints,
+)
+from src.apps.games.repositories.db.library import (
+    Format,
+    export_records,
+    import_records,
+    read_records,
+    write_records,
+)
+from src.apps.games.repositories.db.models import GameInDB, TitleInDB
+from src.apps.games.repositories.db.search import TITLE_INDEX
+from src.apps.games.unit_of_work.db import DBUnitOfWork
+from src.apps.games.utils.fingerprint import fingerprint_key, fingerprint_secret
+from src.apps.games.utils.titlesearch import title_key
+from src.config import DatabaseSettings, settings
+
+GAME_NAME = "Game Name"
+
+
+@pytest.fixture
+def session_factory() -> Iterator[sessionmaker[Session]]:
+    engine = create_engine_from_settings(DatabaseSettings(url="sqlite://"))
+    SQLModel.metadata.create_all(engine)
+    TITLE_CACHE.clear()
+    TITLE_INDEX.clear()
+    yield sessionmaker(bind=engine, class_=Session)
+    engine.dispose()
+
+
+def test_add_key_relies_on_unique_constraint(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        game = add_key(
+            owner_id="1",
+            title_name=GAME_NAME,
+            platform="steam",
+            key="123",
+            uow=uow,
+        )
+        assert game.title.name == GAME_NAME
+
+        with pytest.raises(KeyAlreadyExists):
+            add_key(
+                owner_id="1",
+                title_name=GAME_NAME,
+                platform="steam",
+                key="123",
+                uow=uow,
+            )
+
+        # Another owner may hold the same key
+        add_key(
+            owner_id="2",
+            title_name=GAME_NAME,
+            platform="steam",
+            key="123",
+            uow=uow,
+        )
+
+        assert uow.repo.check_key_exists(key="123", owner_id="1")
+        assert not uow.repo.check_key_exists(key="456", owner_id="1")
+
+
+def test_check_key_exists_uses_index(session_factory: sessionmaker[Session]) -> None:
+    with session_factory() as session:
+        plan = session.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT EXISTS "
+                "(SELECT 1 FROM games WHERE owner_id = '1' AND fingerprint = :value)"
+            ),
+            {"value": fingerprint_key("123", fingerprint_secret(session.connection()))},
+        ).all()
+
+    assert any("ix_games_owner_id_fingerprint" in row[-1] for row in plan)
+
+
+def test_keys_are_stored_with_their_fingerprint(
+    session_factory: sessionmaker[Session],
+) -> None:
+    key_a, key_b = "AAAAA-BBBBB-CCCCC", "DDDDD-EEEEE-FFFFF"
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        add_key(
+            owner_id="1", title_name=GAME_NAME, platform="steam", key=key_a, uow=uow
+        )
+        add_keys(owner_id="1", keys=[(GAME_NAME, key_b)], uow=uow)
+        uow.commit()
+
+    with session_factory() as session:
+        secret = fingerprint_secret(session.connection())
+        rows = session.exec(select(GameInDB.key, GameInDB.fingerprint)).all()
+        assert sorted(rows) == [
+            (key_a, fingerprint_key(key_a, secret)),
+            (key_b, fingerprint_key(key_b, secret)),
+        ]
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert uow.repo.check_key_exists(key=key_b, owner_id="1")
+        assert not uow.repo.check_key_exists(key=key_b, owner_id="2")
+        uow.repo.remove_key(key=key_b, owner_id="1")
+        assert not uow.repo.check_key_exists(key=key_b, owner_id="1")
+
+
+def test_fingerprints_are_filled_in(session_factory: sessionmaker[Session]) -> None:
+    with session_factory() as session:
+        # Recreate games as they were before keys were fingerprinted
+        connection = session.connection()
+        connection.execute(text("DROP TABLE games"))
+        connection.execute(
+            text(
+                "CREATE TABLE games (pk INTEGER PRIMARY KEY, owner_id VARCHAR, "
+                "key VARCHAR, platform VARCHAR, title_pk INTEGER)"
+            )
+        )
+        connection.execute(
+            text("CREATE UNIQUE INDEX ix_games_owner_id_key ON games (owner_id, key)")
+        )
+        connection.execute(
+            text(
+                "INSERT INTO games (owner_id, key, platform, title_pk) "
+                "VALUES (:owner_id, :key, 'steam', 1)"
+            ),
+            [{"owner_id": "1", "key": "A"}, {"owner_id": "2", "key": "B"}],
+        )
+
+        add_fingerprint_column(connection)
+        assert fill_fingerprints(session, chunk_size=1) == 2
+        create_fingerprint_index(session.connection())
+        session.commit()
+
+    with session_factory() as session:
+        indexes = {
+            index["name"]
+            for index in inspect(session.connection()).get_indexes("games")
+        }
+        assert indexes == {"ix_games_owner_id_fingerprint"}
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert uow.repo.check_key_exists(key="A", owner_id="1")
+        assert uow.repo.check_key_exists(key="B", owner_id="2")
+
+
+def test_removed_key_comes_back_with_its_title(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        add_key(owner_id="1", title_name=GAME_NAME, platform="steam", key="1", uow=uow)
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        with pytest.raises(InvalidRequestError):
+            uow.repo.get_title(name=GAME_NAME).games
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        title, _ = uow.repo.remove_key(owner_id="1", key="1")
+        statements = uow.metrics.total.statements
+        assert title.name == GAME_NAME
+        assert uow.metrics.total.statements == statements
+
+
+def test_can_add_keys(session_factory: sessionmaker[Session]) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        add_keys(
+            owner_id="1",
+            keys=[(GAME_NAME, "AAAAA-BBBBB-CCCCC")],
+            uow=uow,
+        )
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        reports = add_keys(
+            owner_id="1",
+            keys=[
+                (GAME_NAME, "AAAAA-BBBBB-CCCCC"),
+                (GAME_NAME, "AAAA-BBBB-CCCC"),
+                ("Other Game", "AAAA-BBBB-CCCC-DDDD"),
+                ("Other Game", "AAAA-BBBB-CCCC-DDDD"),
+                ("Bad Game", "not a key"),
+            ],
+            uow=uow,
+        )
+
+    assert [report.status for report in reports] == [
+        "duplicate",
+        "added",
+        "added",
+        "duplicate",
+        "rejected",
+    ]
+
+    with session_factory() as session:
+        titles = session.exec(select(TitleInDB.name)).all()
+        games = session.exec(select(GameInDB)).all()
+
+        assert sorted(titles) == [GAME_NAME, "Other Game"]
+        assert len(games) == 3
+        assert {game.title.name for game in games} == {GAME_NAME, "Other Game"}
+
+
+def test_title_cache_is_filled_on_commit(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with pytest.raises(RuntimeError):
+        with DBUnitOfWork(session_factory=session_factory) as uow:
+            uow.repo.get_title(name=GAME_NAME)
+            raise RuntimeError()
+
+    assert TITLE_CACHE.get(title_key(GAME_NAME)) is None
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        title = uow.repo.get_title(name=GAME_NAME)
+        assert title.pk is not None
+        assert TITLE_CACHE.get(title_key(GAME_NAME)) is None
+
+    assert TITLE_CACHE.get(title_key(GAME_NAME)) == title.pk
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        hits = TITLE_CACHE.stats().hits
+        assert uow.repo.get_title(name=GAME_NAME, create=False).pk == title.pk
+        assert TITLE_CACHE.stats().hits == hits + 1
+
+        uow.session.delete(uow.repo.get_title(name=GAME_NAME))
+        uow.session.flush()
+
+    assert TITLE_CACHE.get(title_key(GAME_NAME)) is None
+
+
+def test_cached_title_pks_skip_the_title_lookup(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        title_pk = uow.repo.get_title(name=GAME_NAME).pk
+
+    statements: list[str] = []
+    engine = session_factory.kw["bind"]
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert uow.repo.resolve_titles([GAME_NAME.upper()]) == {
+            GAME_NAME.upper(): title_pk
+        }
+    assert not statements
+
+
+def test_can_list_available_titles(session_factory: sessionmaker[Session]) -> None:
+    with DiscordDBUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="1", guild_id="guild-1", uow=uow)
+        join_guild(member_id="2", guild_id="guild-1", uow=uow)
+        join_guild(member_id="2", guild_id="guild-2", uow=uow)
+        join_guild(member_id="3", guild_id="guild-2", uow=uow)
+        join_guild(member_id="4", guild_id="guild-3", uow=uow)
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        add_keys(
+            owner_id="1",
+            keys=[("A Game", "AAAAA-AAAAA-AAAAA")],
+            uow=uow,
+        )
+        add_keys(
+            owner_id="2",
+            keys=[
+                ("B Game", "BBBBB-BBBBB-BBBBB"),
+                ("C Game", "CCCCC-CCCCC-CCCCC"),
+                ("C Game", "CCCC-CCCC-CCCC"),
+            ],
+            uow=uow,
+        )
+        add_keys(owner_id="3", keys=[("C Game", "DDDDD-DDDDD-DDDDD")], uow=uow)
+        add_keys(owner_id="4", keys=[("E Game", "EEEEE-EEEEE-EEEEE")], uow=uow)
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        first_page = list_available_titles(member_id="1", limit=1, uow=uow)
+        second_page = list_available_titles(
+            member_id="1", after=first_page[-1].name, limit=1, uow=uow
+        )
+        last_page = list_available_titles(
+            member_id="1", after=second_page[-1].name, uow=uow
+        )
+        shared = list_available_titles(member_id="3", uow=uow)
+        games = list_games(member_id="3", uow=uow)
+
+    assert [(t.name, t.copies) for t in first_page] == [("B Game", {"steam": 1})]
+    assert [(t.name, t.copies) for t in second_page] == [
+        ("C Game", {"playstation": 1, "steam": 1})
+    ]
+    assert last_page == []
+    assert [(t.name, t.copies) for t in shared] == [
+        ("B Game", {"steam": 1}),
+        ("C Game", {"playstation": 1, "steam": 1}),
+    ]
+    assert games == [
+        GameRow("B Game", "steam", "2"),
+        GameRow("C Game", "playstation", "2"),
+        GameRow("C Game", "steam", "2"),
+    ]
+
+
+@pytest.fixture
+def file_session_factory(tmp_path: Path) -> Iterator[sessionmaker[Session]]:
+    engine = create_engine_from_settings(
+        DatabaseSettings(
+            url=f"sqlite:///{tmp_path / 'keybot.db'}",
+            pool_size=20,
+            sqlite_busy_timeout=60_000,
+        )
+    )
+    SQLModel.metadata.create_all(engine)
+    TITLE_CACHE.clear()
+    TITLE_INDEX.clear()
+    yield sessionmaker(bind=engine, class_=Session)
+    engine.dispose()
+
+
+def _claim(
+    session_factory: sessionmaker[Session], member_id: str
+) -> Game | type[Exception]:
+    try:
+        with DBUnitOfWork(session_factory=session_factory) as uow:
+            return claim_key(member_id=member_id, title_name=GAME_NAME, uow=uow)
+    except (ClaimTooSoon, NoKeyAvailable) as e:
+        return type(e)
+
+
+def test_concurrent_claims_never_share_a_key(
+    file_session_factory: sessionmaker[Session],
+) -> None:
+    claimants = [f"claimant-{i}" for i in range(200)]
+    with DiscordDBUnitOfWork(session_factory=file_session_factory) as uow:
+        for member_id in ["owner", *claimants]:
+            join_guild(member_id=member_id, guild_id="guild", uow=uow)
+
+    with DBUnitOfWork(session_factory=file_session_factory) as uow:
+        add_keys(
+            owner_id="owner",
+            keys=[(GAME_NAME, f"{i:05}-AAAAA-AAAAA") for i in range(50)],
+            uow=uow,
+        )
+
+    with ThreadPoolExecutor(max_workers=len(claimants)) as pool:
+        results = list(
+            pool.map(
+                lambda member_id: _claim(file_session_factory, member_id), claimants
+            )
+        )
+
+    keys = [result.key for result in results if isinstance(result, Game)]
+    assert len(keys) == len(set(keys)) == 50
+    assert results.count(NoKeyAvailable) == 150
+
+
+def test_concurrent_claims_respect_wait_period(
+    file_session_factory: sessionmaker[Session],
+) -> None:
+    with DiscordDBUnitOfWork(session_factory=file_session_factory) as uow:
+        join_guild(member_id="owner", guild_id="guild", uow=uow)
+        join_guild(member_id="claimant", guild_id="guild", uow=uow)
+
+    with DBUnitOfWork(session_factory=file_session_factory) as uow:
+        add_keys(
+            owner_id="owner",
+            keys=[(GAME_NAME, f"{i:05}-AAAAA-AAAAA") for i in range(10)],
+            uow=uow,
+        )
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(
+            pool.map(lambda _: _claim(file_session_factory, "claimant"), range(20))
+        )
+
+    assert sum(isinstance(result, Game) for result in results) == 1
+    assert results.count(ClaimTooSoon) == 19
+
+
+def test_created_titles_become_searchable_on_commit(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        uow.repo.get_title(name="Hades")
+        assert search_titles(query="had", uow=uow) == ["Hades"]
+
+        uow.repo.get_title(name="Hades II")
+        uow.rollback()
+
+        uow.repo.get_title(name="Hollow Knight")
+        uow.commit()
+
+    assert len(TITLE_INDEX) == 2
+    assert "Hades II" not in TITLE_INDEX
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert search_titles(query="hollow", uow=uow) == ["Hollow Knight"]
+
+
+def test_search_falls_back_to_fts_for_unseen_titles(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert search_titles(query="anything", uow=uow) == []
+
+    # Inserted behind the index's back, as another process would
+    with session_factory() as session:
+        session.add(TitleInDB(name="The Witcher 3: Wild Hunt"))
+        session.commit()
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert search_titles(query="witcher", uow=uow) == ["The Witcher 3: Wild Hunt"]
+    assert "The Witcher 3: Wild Hunt" in TITLE_INDEX
+
+
+def test_search_only_asks_fts_when_the_index_finds_nothing(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        uow.repo.get_title(name="Hades")
+        uow.commit()
+        assert search_titles(query="hades", uow=uow) == ["Hades"]
+
+    statements: list[str] = []
+    engine = session_factory.kw["bind"]
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert search_titles(query="hades", uow=uow) == ["Hades"]
+    assert not any("titles_fts" in statement for statement in statements)
+
+    # Committed behind the index's back, as another process would
+    with session_factory() as session:
+        session.add(TitleInDB(name="Hades II"))
+        session.commit()
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert search_titles(query="hades", uow=uow) == ["Hades", "Hades II"]
+    assert not any("titles_fts" in statement for statement in statements)
+
+
+def test_titles_are_matched_on_their_normalized_name(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        title = uow.repo.get_title(name="Portal 2")
+        assert uow.repo.get_title(name="portal 2 ").pk == title.pk
+
+        add_keys(
+            owner_id="1",
+            keys=[("PORTAL 2", "AAAAA-AAAAA-AAAAA"), ("Pórtal-2", "BBBBB-BBBBB-BBBBB")],
+            uow=uow,
+        )
+
+    with session_factory() as session:
+        assert session.exec(select(TitleInDB.name)).all() == ["Portal 2"]
+        assert {game.title_pk for game in session.exec(select(GameInDB))} == {title.pk}
+
+
+def test_duplicate_titles_are_merged(session_factory: sessionmaker[Session]) -> None:
+    with session_factory() as session:
+        # Recreate titles as they were before normalized names were stored
+        connection = session.connection()
+        connection.execute(text("DROP TABLE titles"))
+        connection.execute(
+            text("CREATE TABLE titles (pk INTEGER PRIMARY KEY, name VARCHAR UNIQUE)")
+        )
+        connection.execute(
+            text("INSERT INTO titles (pk, name) VALUES (:pk, :name)"),
+            [
+                {"pk": 1, "name": "Portal 2"},
+                {"pk": 2, "name": "portal 2"},
+                {"pk": 3, "name": "Hades"},
+                {"pk": 4, "name": "Portal 2 "},
+            ],
+        )
+        connection.execute(
+            text(
+                "INSERT INTO games (owner_id, key, fingerprint, platform, title_pk) "
+                "VALUES (:owner_id, :key, :fingerprint, 'steam', :title_pk)"
+            ),
+            [
+                {"owner_id": owner_id, "key": key, "title_pk": title_pk}
+                | {"fingerprint": fingerprint_key(key, fingerprint_secret(connection))}
+                for owner_id, key, title_pk in [
+                    ("1", "A", 1),
+                    ("1", "B", 2),
+                    ("2", "A", 4),
+                    ("2", "C", 3),
+                ]
+            ],
+        )
+
+        add_normalized_name_column(connection)
+        merge = merge_duplicate_titles(session, chunk_size=1)
+        create_normalized_name_index(connection)
+        session.commit()
+
+    assert (merge.titles_merged, merge.games_moved) == (2, 2)
+
+    with session_factory() as session:
+        rows = session.exec(
+            select(TitleInDB.pk, TitleInDB.normalized_name).order_by(TitleInDB.pk)
+        ).all()
+        assert rows == [(1, "portal 2"), (3, "hades")]
+        assert sorted(session.exec(select(GameInDB.title_pk)).all()) == [1, 1, 1, 3]
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert uow.repo.get_title(name="PORTAL 2", create=False).pk == 1
+
+
+def test_units_of_work_record_metrics(session_factory: sessionmaker[Session]) -> None:
+    METRICS.reset()
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        add_key(owner_id="1", title_name=GAME_NAME, platform="steam", key="1", uow=uow)
+        add_key(owner_id="1", title_name=GAME_NAME, platform="steam", key="2", uow=uow)
+        assert uow.metrics.services["games.add_key"].calls == 2
+
+    snapshot = METRICS.snapshot()
+    assert snapshot["games.unit_of_work"].calls == 1
+    assert snapshot["games.add_key"].statements > 0
+    assert snapshot["games.add_key"].rows >= 2
+    assert (
+        snapshot["games.unit_of_work"].statements
+        >= snapshot["games.add_key"].statements
+    )
+
+
+@pytest.mark.parametrize("format", ["jsonl", "csv"])
+def test_library_round_trips(
+    session_factory: sessionmaker[Session], tmp_path: Path, format: Format
+) -> None:
+    with DiscordDBUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="1", guild_id="guild-1", uow=uow)
+        join_guild(member_id="2", guild_id="guild-1", uow=uow)
+        join_guild(member_id="2", guild_id="guild-2", uow=uow)
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        add_keys(
+            owner_id="1",
+            keys=[("A Game", "AAAAA-AAAAA-AAAAA"), ("B Game", "BBBBB-BBBBB-BBBBB")],
+            uow=uow,
+        )
+        add_keys(owner_id="2", keys=[("A Game", "AAAA-AAAA-AAAA")], uow=uow)
+        uow.commit()
+
+    path = tmp_path / f"library.{format}"
+    with session_factory() as session, path.open("w", newline="") as file:
+        written = write_records(export_records(session, chunk_size=2), file, format)
+    assert written == 2 + 2 + 2 + 3 + 3
+
+    # The title cache and index are per process and would still hold the
+    # source database's titles
+    TITLE_CACHE.clear()
+    TITLE_INDEX.clear()
+    target = create_engine_from_settings(DatabaseSettings(url="sqlite://"))
+    SQLModel.metadata.create_all(target)
+    target_factory = sessionmaker(bind=target, class_=Session)
+    with path.open(newline="") as file:
+        report = import_records(
+            target_factory, read_records(file, format), chunk_size=4
+        )
+    assert (report.chunks, report.records) == (3, written)
+
+    games = select(GameInDB.owner_id, GameInDB.key, GameInDB.fingerprint)
+    with session_factory() as source, target_factory() as copy:
+        assert list(export_records(copy)) == list(export_records(source))
+        assert copy.exec(games).all() == source.exec(games).all()
+
+
+def test_library_import_resumes_from_a_chunk(
+    session_factory: sessionmaker[Session],
+) -> None:
+    records = [{"type": "title", "title": "A Game"}] + [
+        {"type": "game", "title": "A Game", "owner_id": "1", "platform": "steam"}
+        | {"key": str(i)}
+        for i in range(5)
+    ]
+
+    import_records(session_factory, records[:3], chunk_size=2)
+    report = import_records(session_factory, records, start=1, chunk_size=2)
+    assert (report.chunks, report.records) == (3, 4)
+
+    with session_factory() as session:
+        keys = session.exec(select(GameInDB.key)).all()
+        assert sorted(keys) == ["0", "1", "2", "3", "4"]
+
+
+def test_availability_counters_follow_keys_and_members(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DiscordDBUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="1", guild_id="guild-1", uow=uow)
+        join_guild(member_id="1", guild_id="guild-2", uow=uow)
+        join_guild(member_id="3", guild_id="guild-1", uow=uow)
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        add_key(owner_id="1", title_name="A Game", platform="steam", key="1", uow=uow)
+        add_keys(
+            owner_id="2",
+            keys=[("A Game", "AAAAA-AAAAA-AAAAA"), ("B Game", "BBBBB-BBBBB-BBBBB")],
+            uow=uow,
+        )
+        uow.commit()
+    with DiscordDBUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="2", guild_id="guild-1", uow=uow)
+        join_guild(member_id="2", guild_id="guild-1", uow=uow)
+        leave_guild(member_id="1", guild_id="guild-2", uow=uow)
+
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        claim_key(
+            member_id="3",
+            title_name="B Game",
+            wait_period=timedelta(minutes=1),
+            uow=uow,
+        )
+        assert count_available_keys(guild_id="guild-1", uow=uow) == {"steam": 2}
+        assert count_available_keys(
+            guild_id="guild-1", title_name="a game", uow=uow
+        ) == {"steam": 2}
+        assert count_available_keys(guild_id="guild-2", uow=uow) == {}
+
+    with session_factory() as session:
+        assert rebuild_counters(session, repair=False).drifted == 0
+
+
+def test_roster_sync_counts_repeated_members_once(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DiscordDBUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="9", guild_id="g", uow=uow)
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        add_key(owner_id="1", title_name=GAME_NAME, platform="steam", key="1", uow=uow)
+        add_key(owner_id="9", title_name=GAME_NAME, platform="steam", key="9", uow=uow)
+
+    with DiscordDBUnitOfWork(session_factory=session_factory) as uow:
+        changes = uow.repo.sync_guild_members(
+            guild_id="g", member_ids=["1", "9", "1"], chunk_size=1
+        )
+
+    assert changes.joined == 1
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        assert count_available_keys(guild_id="g", uow=uow) == {"steam": 2}
+    with session_factory() as session:
+        assert rebuild_counters(session, repair=False).drifted == 0
+
+
+def test_counter_drift_is_reported_and_repaired(
+    session_factory: sessionmaker[Session],
+) -> None:
+    with DiscordDBUnitOfWork(session_factory=session_factory) as uow:
+        join_guild(member_id="1", guild_id="guild-1", uow=uow)
+    with DBUnitOfWork(session_factory=session_factory) as uow:
+        add_key(owner_id="1", title_name=GAME_NAME, platform="steam", key="1", uow=uow)
+
+    with session_factory() as session:
+        session.execute(text("UPDATE guild_availability SET copies = 5"))
+        check = rebuild_counters(session)
+        session.commit()
+
+    assert (check.counters, check.drifted) == (2, 2)
+    with session_factory() as session:
+        assert rebuild_counters(session, repair=False).drifted == 0
+
+
+def test_fingerprint_secret_follows_the_database_written(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    memory = create_engine_from_settings(DatabaseSettings(url="sqlite://"))
+    file = create_engine_from_settings(
+        DatabaseSettings(url=f"sqlite:///{tmp_path / 'keybot.db'}")
+    )
+
+    monkeypatch.setattr(settings.db, "key_fingerprint_secret", None)
+    assert fingerprint_secret(memory)
+    with pytest.raises(ValueError):
+        fingerprint_secret(file)
+
+    monkeypatch.setattr(settings.db, "key_fingerprint_secret", SecretStr("secret"))
+    assert fingerprint_secret(file) == b"secret"
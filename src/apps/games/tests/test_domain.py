@@ -1,9 +1,18 @@
+from datetime import timedelta
 from typing import Callable
 
 import pytest
 
+from src.apps.core.cooldown import CooldownTracker
+from src.apps.games.domain.expections import ClaimTooSoon, NoKeyAvailable
+from src.apps.games.domain.models import GameRow, Title
 from src.apps.games.domain.services import (
     add_key,
+    add_keys,
+    claim_key,
+    count_available_keys,
+    list_available_titles,
+    list_games,
     remove_key,
 )
 from src.apps.games.repositories.fake.repo import FakeSession
@@ -53,3 +62,150 @@ def test_can_remove_key(session_factory: Callable[..., FakeSession]) -> None:
         assert test_key == key
         assert len(uow.repo.games) == 0
         assert not uow.repo.check_key_exists(key=test_key, owner_id=member_id)
+
+
+def test_can_add_keys(session_factory: Callable[[], FakeSession]) -> None:
+    with FakeUnitOfWork(session_factory=session_factory) as uow:
+        member_id = "1"
+        uow.repo.add_key(
+            owner_id=member_id,
+            platform="steam",
+            title_name=GAME_NAME,
+            key="AAAAA-BBBBB-CCCCC",
+        )
+
+        reports = add_keys(
+            owner_id=member_id,
+            keys=[
+                (GAME_NAME, "AAAAA-BBBBB-CCCCC"),
+                ("Other Game", "AAAA-BBBB-CCCC"),
+                ("Other Game", "AAAA-BBBB-CCCC"),
+                ("Bad Game", "not a key"),
+                (None, "AAAA-BBBB-DDDD"),
+            ],
+            uow=uow,
+        )
+
+    assert [report.status for report in reports] == [
+        "duplicate",
+        "added",
+        "duplicate",
+        "rejected",
+        "rejected",
+    ]
+    assert reports[1].platform == "playstation"
+    assert len(uow.repo.games) == 2
+
+
+def test_can_list_available_titles(session_factory: Callable[[], FakeSession]) -> None:
+    with FakeUnitOfWork(session_factory=session_factory) as uow:
+        uow.repo.guilds = {"guild-1": {"1", "2"}, "guild-2": {"3"}}
+        for owner_id, title_name, key in [
+            ("1", "A Game", "own-key"),
+            ("2", "B Game", "1"),
+            ("2", "C Game", "2"),
+            ("2", "C Game", "3"),
+            ("3", "D Game", "4"),
+        ]:
+            uow.repo.add_key(
+                owner_id=owner_id, platform="steam", title_name=title_name, key=key
+            )
+
+        first_page = list_available_titles(member_id="1", limit=1, uow=uow)
+        second_page = list_available_titles(
+            member_id="1", after=first_page[-1].name, limit=1, uow=uow
+        )
+
+    assert [(t.name, t.copies) for t in first_page] == [("B Game", {"steam": 1})]
+    assert [(t.name, t.copies) for t in second_page] == [("C Game", {"steam": 2})]
+
+
+def test_can_list_games(session_factory: Callable[[], FakeSession]) -> None:
+    with FakeUnitOfWork(session_factory=session_factory) as uow:
+        uow.repo.guilds = {"guild-1": {"1", "2"}, "guild-2": {"3"}}
+        uow.repo.add_key(owner_id="1", platform="steam", title_name="A Game", key="1")
+        uow.repo.add_key(owner_id="2", platform="gog", title_name="B Game", key="2")
+        uow.repo.add_key(owner_id="3", platform="steam", title_name="C Game", key="3")
+
+        games = list_games(member_id="1", uow=uow)
+
+    assert games == [GameRow(title="B Game", platform="gog", owner_id="2")]
+
+
+def test_can_count_available_keys(
+    session_factory: Callable[[], FakeSession],
+) -> None:
+    with FakeUnitOfWork(session_factory=session_factory) as uow:
+        uow.repo.guilds = {"guild-1": {"1", "2"}}
+        uow.repo.add_key(owner_id="1", platform="steam", title_name="A Game", key="1")
+        uow.repo.add_key(owner_id="2", platform="gog", title_name="B Game", key="2")
+        uow.repo.add_key(owner_id="3", platform="gog", title_name="B Game", key="3")
+
+        total = count_available_keys(guild_id="guild-1", uow=uow)
+        by_title = count_available_keys(
+            guild_id="guild-1", title_name="B Game", uow=uow
+        )
+
+    assert total == {"steam": 1, "gog": 1}
+    assert by_title == {"gog": 1}
+
+
+def test_can_claim_key(session_factory: Callable[[], FakeSession]) -> None:
+    with FakeUnitOfWork(session_factory=session_factory) as uow:
+        uow.repo.guilds = {"guild-1": {"1", "2", "3"}}
+        uow.repo.add_key(owner_id="1", platform="steam", title_name=GAME_NAME, key="1")
+
+        game = claim_key(member_id="2", title_name=GAME_NAME, uow=uow)
+
+        assert (game.key, game.owner_id) == ("1", "1")
+        assert len(uow.repo.games) == 0
+
+        with pytest.raises(NoKeyAvailable):
+            claim_key(member_id="3", title_name=GAME_NAME, uow=uow)
+
+        uow.repo.add_key(owner_id="1", platform="steam", title_name=GAME_NAME, key="2")
+        with pytest.raises(ClaimTooSoon):
+            claim_key(member_id="2", title_name=GAME_NAME, uow=uow)
+
+
+def test_claim_key_uses_cooldowns(session_factory: Callable[[], FakeSession]) -> None:
+    cooldowns = CooldownTracker(timedelta(minutes=60))
+
+    with FakeUnitOfWork(session_factory=session_factory) as uow:
+        uow.repo.guilds = {"guild-1": {"1", "2"}}
+        for key in ["1", "2"]:
+            uow.repo.add_key(
+                owner_id="1", platform="steam", title_name=GAME_NAME, key=key
+            )
+
+        claim_key(
+            member_id="2",
+            title_name=GAME_NAME,
+            wait_period=timedelta(0),
+            cooldowns=cooldowns,
+            uow=uow,
+        )
+        assert not cooldowns.ready("2")
+
+        with pytest.raises(ClaimTooSoon):
+            claim_key(
+                member_id="2",
+                title_name=GAME_NAME,
+                wait_period=timedelta(0),
+                cooldowns=cooldowns,
+                uow=uow,
+            )
+        assert len(uow.repo.games) == 1
+
+
+def test_title_spellings_share_one_title(
+    session_factory: Callable[[], FakeSession]
+) -> None:
+    assert Title(name="Portal 2") == Title(name="portal 2 ")
+    assert hash(Title(name="Portal 2")) == hash(Title(name="PORTAL-2"))
+    assert not Title(name="Portal 2") < Title(name="portal 2")
+    assert sorted([Title(name="Zork"), Title(name="portal 2")])[0].name == "portal 2"
+
+    with FakeUnitOfWork(session_factory=session_factory) as uow:
+        title = uow.repo.get_title(name="Portal 2")
+        assert uow.repo.get_title(name="portal 2", create=False) is title
@@ -0,0 +1,33 @@
+import pytest
+
+from src.apps.games.utils.keyparse import BadKeyFormatError, parse_key, parse_keys
+
+
+@pytest.mark.parametrize(
+    "key, platform",
+    [
+        ("AAAAA-BBBBB-CCCCC-DDDDD", "gog"),
+        ("AAAAA-BBBBB-CCCCC", "steam"),
+        ("AAAAA-BBBBB-CCCCC-DDDDD-EEEEE", "steam"),
+        ("AAAA-BBBB-CCCC", "playstation"),
+        ("AAAA-BBBB-CCCC-DDDD-EEEE", "origin"),
+        ("AAAA-BBBB-CCCC-DDDD", "uplay"),
+        ("AAA-BBBB-CCCC-DDDD-EEEE", "uplay"),
+        ("https://example.com/redeem", "url"),
+    ],
+)
+def test_parse_key(key: str, platform: str) -> None:
+    assert parse_key(key) == platform
+
+
+def test_parse_key_rejects_unknown_format() -> None:
+    with pytest.raises(BadKeyFormatError):
+        parse_key("not-a-key")
+
+
+def test_parse_keys_reports_errors_per_item() -> None:
+    steam, bad, url = parse_keys(["AAAAA-BBBBB-CCCCC", "nope", "http://a"])
+
+    assert steam == "steam"
+    assert isinstance(bad, BadKeyFormatError)
+    assert url == "url"
@@ -0,0 +1,34 @@
+import io
+
+import pytest
+
+from src.apps.games.utils.keyscan import scan_keys
+
+PASTE = """\
+Humble Bundle
+Portal 2 — AAAAA-BBBBB-CCCCC
+<li><b>Celeste</b>: AAAA-BBBB-CCCC-DDDD</li>
+"Hades",https://store.example.com/redeem/XYZ
+not a key: ABCDE-12345
+AAAAA-BBBBB-CCCCC-DDDDD
+"""
+
+EXPECTED = [
+    ("Portal 2", "AAAAA-BBBBB-CCCCC", "steam"),
+    ("Celeste", "AAAA-BBBB-CCCC-DDDD", "uplay"),
+    ("Hades", "https://store.example.com/redeem/XYZ", "url"),
+    (None, "AAAAA-BBBBB-CCCCC-DDDDD", "gog"),
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 64 * 1024])
+def test_scan_keys_across_chunk_boundaries(chunk_size: int) -> None:
+    assert list(scan_keys(io.StringIO(PASTE), chunk_size=chunk_size)) == EXPECTED
+
+
+def test_scan_keys_without_delimiters_stays_bounded() -> None:
+    stream = io.StringIO("x" * 100_000 + " AAAAA-BBBBB-CCCCC")
+
+    assert [key for _, key, _ in scan_keys(stream, chunk_size=1024)] == [
+        "AAAAA-BBBBB-CCCCC"
+    ]
@@ -0,0 +1,70 @@
+from src.apps.games.utils.titlesearch import TitleIndex, normalize_title
+
+TITLES = [
+    "Half-Life",
+    "Half-Life 2",
+    "Halo: The Master Chief Collection",
+    "Hades",
+    "The Witcher 3: Wild Hunt",
+    "Pokémon Legends: Arceus",
+]
+
+
+def test_normalize_title() -> None:
+    assert normalize_title("  Pokémon   Legends: ARCEUS ") == "pokemon legends arceus"
+    assert normalize_title("Half-Life²") == "half life2"
+    assert normalize_title("!!!") == ""
+
+
+def test_prefix_matches_rank_first() -> None:
+    index = TitleIndex(TITLES)
+
+    assert index.search("half") == ["Half-Life", "Half-Life 2"]
+    assert index.search("ha", limit=3) == ["Hades", "Half-Life", "Half-Life 2"]
+    assert index.search("pokemon")[0] == "Pokémon Legends: Arceus"
+    assert index.search("") == []
+
+
+def test_fuzzy_matches_fill_remaining_slots() -> None:
+    index = TitleIndex(TITLES)
+
+    assert index.search("witcher")[0] == "The Witcher 3: Wild Hunt"
+    assert index.search("master chief")[0] == "Halo: The Master Chief Collection"
+    assert index.search("cheif master")[0] == "Halo: The Master Chief Collection"
+    assert index.search("half lief 2") == ["Half-Life 2"]
+
+
+def test_index_is_updated_incrementally() -> None:
+    index = TitleIndex()
+    index.add("Hades")
+    index.add("Hades")
+    assert len(index) == 1
+
+    index.update(["Hades II", "Hollow Knight"])
+    assert index.search("hades") == ["Hades", "Hades II"]
+
+    index.remove("Hades")
+    index.remove("Missing")
+    assert index.search("hades") == ["Hades II"]
+    assert "Hades" not in index
+
+
+def test_removed_titles_leave_nothing_behind() -> None:
+    index = TitleIndex(["Hades", "Hades II", "Hollow Knight"])
+    for name in ["Hades", "Hades II", "Hollow Knight"]:
+        index.remove(name)
+
+    assert not any(
+        [
+            index._names,
+            index._keys,
+            index._title_words,
+            index._ranks,
+            index._sorted,
+            index._postings,
+            index._vocabulary,
+            index._grams,
+        ]
+    )
+    index.add("Hades")
+    assert index.search("hades") == ["Hades"]
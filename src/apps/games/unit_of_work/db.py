@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from types import TracebackType
+
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session
+
+from src.apps.core.db import get_session_factory
+from src.apps.core.metrics import UnitOfWorkMetrics, bind_metrics
+from src.apps.games.repositories.db.repo import SQLModelRepository
+from src.apps.games.unit_of_work.types import GameUnitOfWork
+
+
+class DBUnitOfWork(GameUnitOfWork[Session]):
+    repo: SQLModelRepository
+
+    def __init__(self, session_factory: sessionmaker[Session] | None = None):
+        super().__init__(session_factory=session_factory)
+        self.session_factory = session_factory
+
+    def __enter__(self):
+        # The shared engine is only built once a unit of work is first used
+        session_factory = self.session_factory or get_session_factory()
+        self.session = session_factory()
+        self.metrics = UnitOfWorkMetrics("games.unit_of_work")
+        bind_metrics(self.session, self.metrics)
+        self.repo = SQLModelRepository(self.session)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        try:
+            if exc_type:
+                self.session.rollback()
+            else:
+                self.session.commit()
+        finally:
+            self.metrics.finish()
+
+    def commit(self) -> None:
+        self.session.commit()
+
+    def rollback(self) -> None:
+        self.session.rollback()
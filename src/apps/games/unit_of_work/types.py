@@ -1,10 +1,20 @@
 from typing import Protocol, TypeVar
 
-from src.apps.core.types import BaseSession, BaseUnitOfWork
-from src.apps.games.repositories.types import GameRepository
+from src.apps.core.types import (
+    BaseAsyncSession,
+    BaseAsyncUnitOfWork,
+    BaseSession,
+    BaseUnitOfWork,
+)
+from src.apps.games.repositories.types import AsyncGameRepository, GameRepository
 
 _S = TypeVar("_S", bound=BaseSession)
+_AS = TypeVar("_AS", bound=BaseAsyncSession)
 
 
 class GameUnitOfWork(BaseUnitOfWork[_S], Protocol):
     repo: GameRepository[_S]
+
+
+class AsyncGameUnitOfWork(BaseAsyncUnitOfWork[_AS], Protocol):
+    repo: AsyncGameRepository[_AS]
@@ -0,0 +1,35 @@
+import hashlib
+import hmac
+
+from sqlalchemy.engine import Connection, Engine
+
+from src.apps.core.db import is_in_memory
+from src.config import settings
+
+FINGERPRINT_SIZE = 16
+
+
+def fingerprint_secret(bind: Engine | Connection) -> bytes:
+    """The secret to fingerprint the keys stored through ``bind`` with.
+
+    DB_KEY_FINGERPRINT_SECRET has to be set for every database that outlives
+    the process. Only an in-memory database falls back to a public secret.
+    """
+    if (secret := settings.db.key_fingerprint_secret) is not None:
+        return secret.get_secret_value().encode()
+    if is_in_memory(bind.engine.url):
+        return b"keybot"
+    raise ValueError(
+        f"DB_KEY_FINGERPRINT_SECRET has to be set to store keys in {bind.engine.url}"
+    )
+
+
+def fingerprint_key(key: str, secret: bytes) -> bytes:
+    """A fixed width keyed hash of a key, used to index and match keys.
+
+    Being keyed, fingerprints say nothing about the keys to anyone without the
+    secret, so the raw key could be stored encrypted while lookups still go
+    through an index. Changing the secret means recomputing every fingerprint.
+    """
+    digest = hmac.new(secret, key.encode(), hashlib.sha256).digest()
+    return digest[:FINGERPRINT_SIZE]
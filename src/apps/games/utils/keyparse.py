@@ -1,6 +1,7 @@
 import re
+from collections.abc import Iterable
 
-from src.apps.discord.domain.models import Platform
+from src.apps.games.domain.models import Platform
 
 keyspace: dict[Platform, list[str]] = {
     "gog": [r"^[a-z,A-Z,0-9]{5}-[a-z,A-Z,0-9]{5}-[a-z,A-Z,0-9]{5}-[a-z,A-Z,0-9]{5}$"],
@@ -19,19 +20,54 @@ keyspace: dict[Platform, list[str]] = {
     "url": [r"^http"],
 }
 
-_compiled: dict[Platform, list[re.Pattern[str]]] = {
-    k: [re.compile(r) for r in v] for k, v in keyspace.items()
-}
-
 
 class BadKeyFormatError(Exception):
     ...
 
 
+class KeyClassifier:
+    """Decides the platform of a key with a single regex match.
+
+    Every pattern in the keyspace becomes a named group of one alternation, in
+    keyspace order, so the first pattern to match still wins.
+    """
+
+    def __init__(self, keyspace: dict[Platform, list[str]]) -> None:
+        self._platforms: dict[str, Platform] = {}
+        groups: list[str] = []
+        for platform, patterns in keyspace.items():
+            for i, pattern in enumerate(patterns):
+                group = f"{platform}_{i}"
+                self._platforms[group] = platform
+                groups.append(f"(?P<{group}>{pattern})")
+
+        self._match = re.compile("|".join(groups)).match
+
+    def classify(self, key: str) -> Platform:
+        if match := self._match(key):
+            return self._platforms[match.lastgroup]  # type: ignore
+
+        raise BadKeyFormatError(key)
+
+    def classify_many(self, keys: Iterable[str]) -> list[Platform | BadKeyFormatError]:
+        match, platforms = self._match, self._platforms
+        results: list[Platform | BadKeyFormatError] = []
+        for key in keys:
+            if found := match(key):
+                results.append(platforms[found.lastgroup])  # type: ignore
+            else:
+                results.append(BadKeyFormatError(key))
+
+        return results
+
+
+_classifier = KeyClassifier(keyspace)
+
+
 def parse_key(key: str) -> Platform:
-    for k, v in _compiled.items():
-        for r in v:
-            if r.match(key):
-                return k
+    return _classifier.classify(key)
+
 
-    raise BadKeyFormatError
+def parse_keys(keys: Iterable[str]) -> list[Platform | BadKeyFormatError]:
+    """Classify many keys, returning the error in place of each bad key."""
+    return _classifier.classify_many(keys)
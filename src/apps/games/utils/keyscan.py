@@ -0,0 +1,88 @@
+import html
+import re
+from collections.abc import Generator, Iterator
+from typing import TextIO
+
+from src.apps.games.domain.models import Platform
+from src.apps.games.utils.keyparse import BadKeyFormatError, parse_key
+
+CHUNK_SIZE = 64 * 1024
+
+# Longest token kept back between chunks when a chunk has no delimiter at all
+_MAX_CARRY = 2048
+# Longest stretch of text remembered in front of a key to guess its title
+_MAX_CONTEXT = 256
+
+_DELIMITERS = " \t\r\n<>\"',;|"
+
+_candidate = re.compile(
+    r"https?://[^\s<>\"',;|]+"
+    r"|(?<![A-Za-z0-9-])[A-Za-z0-9]{3,5}(?:-[A-Za-z0-9]{4,5}){2,4}(?![A-Za-z0-9-])"
+)
+_tag = re.compile(r"<[^>]*(?:>|$)")
+_whitespace = re.compile(r"\s+")
+
+KeyMatch = tuple[str | None, str, Platform]
+
+
+def _guess_title(context: str) -> str | None:
+    text = html.unescape(_tag.sub(" ", context))
+    text = _whitespace.sub(" ", text).strip(" -–—:|,;\"'")
+    return text or None
+
+
+def _safe_cut(buffer: str) -> int:
+    """Return how much of the buffer can be scanned without splitting a key."""
+    cut = max(buffer.rfind(delimiter) for delimiter in _DELIMITERS) + 1
+    if not cut and len(buffer) > _MAX_CARRY:
+        cut = len(buffer) - _MAX_CARRY
+    return cut
+
+
+def _scan(text: str, context: str) -> Generator[KeyMatch, None, str]:
+    pos = 0
+    for match in _candidate.finditer(text):
+        key = match.group()
+        if key.startswith("http"):
+            key = key.rstrip(".)")
+
+        try:
+            platform = parse_key(key)
+        except BadKeyFormatError:
+            continue
+
+        before = text[pos : match.start()]
+        if (newline := before.rfind("\n")) != -1:
+            context = before[newline + 1 :]
+        else:
+            context = (context + before)[-_MAX_CONTEXT:]
+
+        yield _guess_title(context), key, platform
+
+        context = ""
+        pos = match.end()
+
+    rest = text[pos:]
+    if (newline := rest.rfind("\n")) != -1:
+        return rest[newline + 1 :][-_MAX_CONTEXT:]
+    return (context + rest)[-_MAX_CONTEXT:]
+
+
+def scan_keys(stream: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[KeyMatch]:
+    """Yield ``(title_guess, key, platform)`` for every key found in a stream.
+
+    The stream is read ``chunk_size`` characters at a time and only the
+    unfinished token at the end of each chunk is carried over, so memory stays
+    flat however large the input is. The title guess is whatever text precedes
+    the key on its line, with HTML tags and separators stripped.
+    """
+    carry = ""
+    context = ""
+    while chunk := stream.read(chunk_size):
+        buffer = carry + chunk
+        cut = _safe_cut(buffer)
+        context = yield from _scan(buffer[:cut], context)
+        carry = buffer[cut:]
+
+    if carry:
+        yield from _scan(carry, context)
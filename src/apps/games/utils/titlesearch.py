@@ -0,0 +1,215 @@
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import Iterable
+from threading import Lock
+
+_word = re.compile(r"[^\W_]+")
+
+
+def normalize_title(name: str) -> str:
+    """Fold case, accents and punctuation so "Half-Life²" reads "half life2"."""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(_word.findall(text.casefold()))
+
+
+def title_key(name: str) -> str:
+    """The canonical form titles are told apart by.
+
+    "Portal 2", "portal 2" and "Portal 2 " all share one key, and a name made
+    only of punctuation falls back to its trimmed, case folded self.
+    """
+    return normalize_title(name) or name.strip().casefold()
+
+
+def _trigrams(word: str, *, partial: bool = False) -> set[str]:
+    """Trigrams of a word padded like pg_trgm, two spaces before, one after.
+
+    A ``partial`` word is left open at the end, since while typing it is
+    usually the prefix of a longer word.
+    """
+    padded = f"  {word}" if partial else f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """An in-memory index over title names for autocomplete.
+
+    Titles whose normalized name starts with the query rank first, in name
+    order. Remaining slots go to titles containing every query word, the last
+    one as a prefix, shortest name first. A word that matches nothing is
+    swapped for the ``max_expansions`` most similar words in the index by
+    trigram similarity, so a typo still finds its title. Lookups intersect per
+    word posting sets, rarest first, which keeps searches in the low
+    milliseconds at 100k titles.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str] = (),
+        *,
+        min_overlap: float = 0.5,
+        max_expansions: int = 3,
+    ):
+        self.min_overlap = min_overlap
+        self.max_expansions = max_expansions
+        self.loaded = False
+        self._lock = Lock()
+        self._clear()
+        self.update(names)
+
+    def _clear(self) -> None:
+        # Per title entries are keyed by a never reused id, so removing a title
+        # frees everything it held
+        self._next_id = 0
+        self._ids: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+        self._keys: dict[int, str] = {}
+        self._title_words: dict[int, frozenset[str]] = {}
+        # Shortest names first, then by name
+        self._ranks: dict[int, tuple[int, str]] = {}
+        self._sorted: list[tuple[str, int]] = []
+        self._postings: dict[str, set[int]] = {}
+        self._vocabulary: list[str] = []
+        self._grams: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._ids
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+            self.loaded = False
+
+    def add(self, name: str) -> None:
+        self.update([name])
+
+    def update(self, names: Iterable[str]) -> None:
+        with self._lock:
+            for name in names:
+                if name in self._ids:
+                    continue
+
+                key = normalize_title(name)
+                words = frozenset(key.split())
+                self._ids[name] = title_id = self._next_id
+                self._next_id += 1
+                self._names[title_id] = name
+                self._keys[title_id] = key
+                self._title_words[title_id] = words
+                self._ranks[title_id] = (len(key), key)
+                insort(self._sorted, (key, title_id))
+                for word in words:
+                    if (posting := self._postings.get(word)) is None:
+                        posting = self._postings[word] = set()
+                        insort(self._vocabulary, word)
+                        for gram in _trigrams(word):
+                            self._grams.setdefault(gram, set()).add(word)
+                    posting.add(title_id)
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            if (title_id := self._ids.pop(name, None)) is None:
+                return
+
+            key = self._keys.pop(title_id)
+            del self._names[title_id]
+            del self._ranks[title_id]
+            del self._sorted[bisect_left(self._sorted, (key, title_id))]
+            for word in self._title_words.pop(title_id):
+                posting = self._postings[word]
+                posting.discard(title_id)
+                if not posting:
+                    del self._postings[word]
+                    del self._vocabulary[bisect_left(self._vocabulary, word)]
+                    for gram in _trigrams(word):
+                        self._grams[gram].discard(word)
+                        if not self._grams[gram]:
+                            del self._grams[gram]
+
+    def search(self, query: str, limit: int = 25) -> list[str]:
+        if not (key := normalize_title(query)) or limit <= 0:
+            return []
+
+        with self._lock:
+            found = self._prefix_matches(key, limit)
+            if len(found) < limit:
+                found += self._word_matches(key, limit - len(found), set(found))
+
+            return [self._names[title_id] for title_id in found]
+
+    def _prefix_matches(self, key: str, limit: int) -> list[int]:
+        found: list[int] = []
+        for i in range(bisect_left(self._sorted, (key,)), len(self._sorted)):
+            title_key, title_id = self._sorted[i]
+            if len(found) == limit or not title_key.startswith(key):
+                break
+            found.append(title_id)
+        return found
+
+    def _prefixed(self, prefix: str) -> list[str]:
+        words: list[str] = []
+        for i in range(bisect_left(self._vocabulary, prefix), len(self._vocabulary)):
+            if not (word := self._vocabulary[i]).startswith(prefix):
+                break
+            words.append(word)
+        return words
+
+    def _similar(self, term: str, *, partial: bool) -> list[str]:
+        grams = _trigrams(term, partial=partial)
+        shared = Counter(word for gram in grams for word in self._grams.get(gram, ()))
+        need = math.ceil(len(grams) * self.min_overlap)
+
+        # A word of n letters has n + 2 padded trigrams
+        scored = [
+            (-count / (len(grams) + len(word) + 2 - count), word)
+            for word, count in shared.items()
+            if count >= need
+        ]
+        return [word for _, word in heapq.nsmallest(self.max_expansions, scored)]
+
+    def _word_matches(self, key: str, limit: int, exclude: set[int]) -> list[int]:
+        terms = key.split()
+        expansions: list[tuple[int, list[str]]] = []
+        for i, term in enumerate(terms):
+            partial = i == len(terms) - 1
+            if partial:
+                words = self._prefixed(term)
+            else:
+                words = [term] if term in self._postings else []
+            if not words:
+                words = self._similar(term, partial=partial)
+            # A word matching nothing at all is left out rather than
+            # emptying the results
+            if words:
+                size = sum(len(self._postings[word]) for word in words)
+                expansions.append((size, words))
+
+        if not expansions:
+            return []
+
+        expansions.sort(key=lambda expansion: expansion[0])
+        _, words = expansions[0]
+        candidates = set().union(*(self._postings[word] for word in words)) - exclude
+        for size, words in expansions[1:]:
+            if not candidates:
+                break
+            if size <= 4 * len(candidates):
+                candidates &= set().union(*(self._postings[word] for word in words))
+            else:
+                # Cheaper to check what is left than to build a huge union
+                matching = set(words)
+                candidates = {
+                    title_id
+                    for title_id in candidates
+                    if not matching.isdisjoint(self._title_words[title_id])
+                }
+
+        return heapq.nsmallest(limit, candidates, key=self._ranks.__getitem__)
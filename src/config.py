@@ -1,4 +1,9 @@
-from pydantic import BaseSettings, Field
+from typing import Literal
+
+from pydantic import BaseSettings, Field, SecretStr
+from sqlalchemy.engine import make_url
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
 
 
 class DatabaseSettings(BaseSettings):
@@ -7,6 +12,42 @@ class DatabaseSettings(BaseSettings):
 
     url: str = "sqlite:///:memory:"
     echo: bool = False
+    pool_size: int = Field(5, description="Connections kept open in the pool")
+    max_overflow: int = Field(
+        10, description="Extra connections opened when the pool is exhausted"
+    )
+    pool_pre_ping: bool = Field(
+        False, description="Test connections for liveness on checkout"
+    )
+    pool_recycle: int = Field(
+        -1, description="Replace connections older than this many seconds"
+    )
+    sqlite_wal: bool = Field(True, description="Use write-ahead logging for SQLite")
+    sqlite_synchronous: str = Field("NORMAL", description="SQLite synchronous pragma")
+    sqlite_busy_timeout: int = Field(
+        5000, description="Milliseconds SQLite waits on a locked database"
+    )
+    n_plus_one_threshold: int = Field(
+        20, description="Identical statements in one unit of work before warning"
+    )
+    relationship_loading: Literal["select", "raise"] = Field(
+        "select",
+        description="How relationships a query did not ask for load; raise in tests",
+    )
+    key_fingerprint_secret: SecretStr | None = Field(
+        None,
+        description="Secret the key fingerprints are hashed with; "
+        "required unless the database is in memory",
+    )
+    title_cache_size: int = Field(
+        4096, description="Number of title name to pk mappings kept per process"
+    )
+
+    @property
+    def async_url(self) -> str:
+        url = make_url(self.url)
+        drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+        return str(url.set(drivername=drivername))
 
 
 class DiscordSettings(BaseSettings):
@@ -16,6 +57,12 @@ class DiscordSettings(BaseSettings):
     wait_period: int = Field(
         60, description="Wait time between successful claims in minutes"
     )
+    identity_cache_size: int = Field(
+        10_000, description="Number of member and guild pks kept by the identity cache"
+    )
+    identity_cache_ttl: float = Field(
+        300, description="Seconds a cached member or guild pk is trusted for"
+    )
 
 
 class AppSettings(BaseSettings):
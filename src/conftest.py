@@ -0,0 +1,10 @@
+from pydantic import SecretStr
+
+from src.config import settings
+
+# Relationships have to be asked for by the query loading them, so a lazy load
+# slipping into a repository fails its tests
+settings.db.relationship_loading = "raise"
+
+# Tests write throwaway file databases, which refuse to store keys without one
+settings.db.key_fingerprint_secret = SecretStr("test")
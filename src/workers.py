@@ -0,0 +1,43 @@
+"""Run the discord membership services in guild-sharded worker processes.
+
+    with start_workers(4) as router:
+        router.submit(GuildEvent("guild-1", "discord.join_guild", {...}))
+"""
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from src.apps.core.db import get_session_factory
+from src.apps.core.sharding import GuildEvent, Handler, ShardRouter
+from src.apps.discord.domain import services as discord
+from src.apps.discord.repositories.db.cache import IDENTITY_CACHE
+from src.apps.discord.unit_of_work.db import DBUnitOfWork as DiscordDBUnitOfWork
+from src.config import DatabaseSettings
+
+# Results never make it back from a worker, so claims and reads, which are
+# only worth their result, run in the caller instead. So do adding and removing
+# keys: the caller has to hear about a duplicate or a missing key, and they are
+# keyed by owner, so routing them by guild would not keep one owner's in order
+SERVICES: dict[str, Callable[..., Any]] = {
+    "discord.join_guild": discord.join_guild,
+    "discord.leave_guild": discord.leave_guild,
+    "discord.sync_guild_members": discord.sync_guild_members,
+}
+
+
+def service_handler(shard: int, db: DatabaseSettings | None = None) -> Handler:
+    """Runs each event's service in a unit of work of this worker's own."""
+    session_factory = get_session_factory(db)
+
+    def handle(event: GuildEvent) -> None:
+        service = SERVICES[event.service]
+        with DiscordDBUnitOfWork(session_factory, identity_cache=IDENTITY_CACHE) as uow:
+            service(**event.kwargs, uow=uow)
+
+    return handle
+
+
+def start_workers(workers: int, db: DatabaseSettings | None = None) -> ShardRouter:
+    return ShardRouter(
+        partial(service_handler, db=db), workers=workers, services=SERVICES
+    )